@@ -0,0 +1,273 @@
+"""
+Precomputed answer store for high-frequency questions.
+An offline build runs the full RAG pipeline once per canonical question (a curated list, or the most frequent
+questions of a query log) and stores the question embedding, answer, sources and confidence, tagged with a hash
+of every source the answer used. At request time a close enough question gets the stored answer, without
+retrieval or generation. Entries whose sources changed or were removed since the build are stale: they stop
+matching straight away and the app rebuilds them in the background on startup.
+Run from repo root: python3 -m app.answer_store --questions app/seed_data/canonical_questions.json
+From a query log (one question per line): python3 -m app.answer_store --from-log queries.txt --top 50
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from app import config
+from app.cache import SemanticAnswerCache, normalize_query
+from app.ingestion import iter_records
+
+
+def source_hash(record: dict) -> str:
+    """Hash of what an answer built from this help content record depends on."""
+    payload = "\x1f".join([str(record.get("category", "")), str(record.get("title", "")), str(record.get("content", ""))])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def source_hashes(path: str) -> dict[str, str]:
+    """Source id -> source_hash for every record of the help content."""
+    return {str(record["id"]).strip(): source_hash(record) for record in iter_records(path)}
+
+
+def load_questions(path: str) -> list[dict[str, str | None]]:
+    """Canonical questions from a JSON array of strings or {question, category} objects."""
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    return [{"question": item, "category": None} if isinstance(item, str) else {"question": item["question"], "category": item.get("category")} for item in items]
+
+
+def mine_questions(log_path: str, top: int) -> list[dict[str, str | None]]:
+    """The `top` most frequent questions of a log with one question per line (counted after normalize_query)."""
+    counts: Counter[str] = Counter()
+    first_seen: dict[str, str] = {}
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                key = normalize_query(line)
+                counts[key] += 1
+                first_seen.setdefault(key, line.strip())
+    return [{"question": first_seen[key], "category": None} for key, _ in counts.most_common(top)]
+
+
+def entry_key(question: str, category: str | None) -> str:
+    # Categories are normalised like validate_category does, so "Baggage " and "baggage" are the same entry
+    return f"{(category or '').strip().lower()}\x1f{normalize_query(question)}"
+
+
+@asynccontextmanager
+async def rebuild_lock(path: str, poll_seconds: float = 1.0):
+    """
+    Exclusive lock (flock on `path`.lock) held while entries are built, so with several workers on a host only one
+    makes the LLM calls and writes the store at a time. Waits by polling, so a waiting task can still be cancelled.
+    """
+    import fcntl
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(poll_seconds)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class AnswerStore:
+    """
+    Stored answers, persisted as one JSON file and searched with the same embedding matrix lookup as the answer cache.
+    Only fresh entries (every source unchanged, same embedding model) are searched, stale ones wait to be rebuilt.
+    """
+
+    def __init__(self, path: str, similarity_threshold: float):
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self.entries: dict[str, dict] = {} # entry_key -> entry, fresh and stale
+        self.stale: set[str] = set()
+        self._index = SemanticAnswerCache(max_size=1, similarity_threshold=similarity_threshold)
+        self._lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def load(self) -> int:
+        """Read the entries saved by save(), returns how many were loaded."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.entries = {entry_key(entry["question"], entry["category"]): entry for entry in json.load(f)}
+        self.stale = set()
+        self._reindex()
+        return len(self.entries)
+
+    def save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # A unique temp file in the same directory, so concurrent writers never share one and the replace is atomic
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(self.path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(list(self.entries.values()), f, indent=1)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _reindex(self) -> None:
+        fresh = [entry for key, entry in self.entries.items() if key not in self.stale]
+        index = SemanticAnswerCache(max_size=max(1, len(fresh)), similarity_threshold=self.similarity_threshold)
+        for entry in fresh:
+            index.put(entry["embedding"], entry["category"], entry, entry["sources"])
+        with self._lock:
+            self._index = index
+
+    def refresh(self, current_hashes: dict[str, str], embedding_model: str) -> list[dict]:
+        """Mark entries built from sources that changed since (or with another embedding model) stale, and return them."""
+        self.stale = {
+            key for key, entry in self.entries.items()
+            if entry.get("embedding_model") != embedding_model
+            or any(current_hashes.get(source_id) != hashed for source_id, hashed in entry["source_hashes"].items())
+        }
+        self._reindex()
+        return [self.entries[key] for key in sorted(self.stale)]
+
+    def put(self, entry: dict) -> None:
+        """Add or replace the entry for its question, it is searchable straight away."""
+        key = entry_key(entry["question"], entry["category"])
+        self.entries[key] = entry
+        self.stale.discard(key)
+        self._reindex()
+
+    def remove(self, question: str, category: str | None) -> None:
+        key = entry_key(question, category)
+        self.entries.pop(key, None)
+        self.stale.discard(key)
+        self._reindex()
+
+    def get_exact(self, question: str, category: str | None) -> dict | None:
+        """The fresh entry for this exact question (after normalize_query), found without an embedding."""
+        key = entry_key(question, category)
+        entry = self.entries.get(key) if key not in self.stale else None
+        if entry is not None:
+            self.hits += 1 # a miss here still gets the embedding lookup, counted there
+        return entry
+
+    def get(self, embedding: list[float], category: str | None) -> dict | None:
+        """The stored entry for the closest fresh question with the same category, or None."""
+        with self._lock:
+            index = self._index
+        entry = index.get(embedding, category) if len(index) else None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def stats(self) -> dict[str, float]:
+        return {"size": len(self.entries) - len(self.stale), "stale": len(self.stale), "hits": self.hits, "misses": self.misses}
+
+
+async def build_entry(question: str, category: str | None, current_hashes: dict[str, str]) -> dict | None:
+    """
+    Run the full pipeline (guardrails, embedding, retrieval, generation, no caches) for one question.
+    None when it wouldn't be worth storing: gated by the guardrails or answered with the fallback (no sources).
+    """
+    from app import main as app_main
+
+    vs = app_main.get_vector_store()
+    category_lower = app_main.validate_category(category)
+    if config.GUARDRAILS and await app_main.screen_query(question) is not None:
+        return None
+    embedding = await vs.aembed_query(question)
+    search_results = await vs.asearch(query=question, category=category_lower)
+    # No query embedding, so the answer isn't added to the answer cache as well
+    response = await app_main.generate_answer(question, search_results, None, category_lower)
+    if not response.sources:
+        return None
+    return {
+        "question": question,
+        "category": category_lower,
+        "embedding_model": config.EMBEDDING_MODEL,
+        "embedding": embedding,
+        "answer": response.answer,
+        "sources": response.sources,
+        "confidence": response.confidence,
+        "source_hashes": {source_id: current_hashes[source_id] for source_id in response.sources if source_id in current_hashes},
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+async def build_entries(store: AnswerStore, questions: list[dict[str, str | None]], concurrency: int) -> dict[str, int]:
+    """Build (or rebuild) the entries for `questions` into the store, up to `concurrency` at once, then save it."""
+    current_hashes = source_hashes(config.HELP_CONTENT_PATH)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    stats = {"stored": 0, "skipped": 0, "failed": 0}
+
+    async def build(question: dict[str, str | None]) -> None:
+        async with slots:
+            try:
+                entry = await build_entry(question["question"], question["category"], current_hashes)
+            except Exception as e:
+                print(f"❌ {question['question']!r}: {type(e).__name__}: {e}")
+                stats["failed"] += 1
+                return
+        if entry is None:
+            # Not answerable from the help content (any more), an old entry for it must not be served
+            store.remove(question["question"], question["category"])
+            stats["skipped"] += 1
+        else:
+            store.put(entry)
+            stats["stored"] += 1
+
+    await asyncio.gather(*(build(question) for question in questions))
+    store.save()
+    return stats
+
+
+async def run_build(questions: list[dict[str, str | None]], path: str, concurrency: int) -> dict[str, int]:
+    """Open the vector store like the app does (without its lifespan, so no startup rebuild) and build the entries."""
+    from app import main as app_main
+
+    app_main.vs = await asyncio.to_thread(app_main.load_vector_store)
+    store = AnswerStore(path, config.ANSWER_STORE_SIMILARITY)
+    try:
+        async with rebuild_lock(path): # not at the same time as a worker rebuilding stale entries
+            store.load()
+            return await build_entries(store, questions, concurrency)
+    finally:
+        await app_main.get_client().close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=None, help="JSON array of questions or {question, category} objects")
+    parser.add_argument("--from-log", default=None, help="query log with one question per line, its most frequent questions are used")
+    parser.add_argument("--top", type=int, default=50, help="with --from-log, how many of the most frequent questions to build")
+    parser.add_argument("--output", default=config.ANSWER_STORE_PATH)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    if not args.questions and not args.from_log:
+        parser.error("pass --questions and/or --from-log")
+    questions = load_questions(args.questions) if args.questions else []
+    if args.from_log:
+        questions += mine_questions(args.from_log, args.top)
+    # One build per question, a curated question also mined from the log is only answered once
+    questions = list({entry_key(question["question"], question["category"]): question for question in questions}.values())
+
+    print(f"🏗️ Building {len(questions)} stored answers into {args.output}")
+    stats = asyncio.run(run_build(questions, args.output, args.concurrency))
+    print(f"📦 {stats['stored']} stored, {stats['skipped']} skipped (gated or not answerable), {stats['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Cross-request micro-batching.
+Concurrent requests submit single items, the batcher waits a short window (or until the batch is full)
+and processes everything collected in one call, e.g. one embeddings API call or one CrossEncoder.predict.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects items for up to `max_wait_ms` or `max_batch_size` items, then runs `process_batch` once for all of them."""
+
+    def __init__(self, process_batch: Callable[[list[T]], Awaitable[list[R]]], max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max_wait_ms / 1000
+        self._pending: list[tuple[T, asyncio.Future, float]] = [] # (item, future, enqueued_at)
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set() # the event loop only keeps weak references to tasks
+
+        self.batches: int = 0
+        self.items: int = 0
+        self.largest_batch: int = 0
+        self.total_queue_wait_seconds: float = 0.0
+        self.max_queue_wait_seconds: float = 0.0
+
+    async def submit(self, item: T) -> R:
+        """Queue one item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Take up to max_batch_size pending items and process them in the background."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if self._pending:
+            # Leftovers start a new window straight away
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_seconds, self._flush)
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        waits = [started - enqueued_at for _, _, enqueued_at in batch]
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.total_queue_wait_seconds += sum(waits)
+        self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, max(waits))
+
+        try:
+            results = await self.process_batch([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            # The waiting request may have given up (e.g. reranker latency budget), its result is dropped
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict[str, float]:
+        """Batch size and queue wait metrics."""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "mean_queue_wait_ms": self.total_queue_wait_seconds / self.items * 1000 if self.items else 0.0,
+            "max_queue_wait_ms": self.max_queue_wait_seconds * 1000,
+        }
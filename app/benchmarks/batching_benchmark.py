@@ -0,0 +1,101 @@
+"""
+Benchmark of cross-request micro-batching with 50 concurrent users.
+- Query embeddings: one embeddings call per request vs micro-batched calls (against the local OpenAI stub).
+- Cross-encoder scoring: one CrossEncoder.predict per request vs micro-batched predict, reported as pairs/second of CPU.
+  Needs sentence-transformers installed, skipped otherwise.
+Run from repo root: python3 -m app.benchmarks.batching_benchmark --users 50
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# Settings are read at import time, so the environment must point at the stub before importing the app
+STUB_PORT = int(os.getenv("STUB_PORT", "8901"))
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+os.environ["OPENAI_API_KEY"] = "stub-key"
+os.environ.setdefault("CHROMA_PATH", tempfile.mkdtemp(prefix="chroma_bench_"))
+# Stub embeddings aren't calibrated like real ones, the guardrail score gate would skip generation for some queries
+os.environ.setdefault("GUARDRAIL_MIN_SCORE", "0")
+
+from app import config
+from app.batching import MicroBatcher
+from app.benchmarks import stub_openai
+from app.vector_store import VectorStoreService
+
+
+def make_batcher(process_batch) -> MicroBatcher:
+    return MicroBatcher(process_batch, max_batch_size=config.MICRO_BATCH_MAX_SIZE, max_wait_ms=config.MICRO_BATCH_WINDOW_MS)
+
+
+async def bench_embeddings(vs: VectorStoreService, users: int, rounds: int, batched: bool) -> dict[str, float]:
+    """Each round, `users` concurrent requests embed one (uncached) query each."""
+    vs.embedding_batcher = make_batcher(vs._embed_batch) if batched else None
+    vs.embedding_cache.clear()
+
+    start = time.perf_counter()
+    for round_index in range(rounds):
+        await asyncio.gather(*(vs.aembed_query(f"benchmark question {round_index} {user}") for user in range(users)))
+    elapsed = time.perf_counter() - start
+
+    calls = vs.embedding_batcher.stats()["batches"] if batched else users * rounds
+    result = {"requests_per_s": round(users * rounds / elapsed, 1), "api_calls": calls}
+    if batched:
+        stats = vs.embedding_batcher.stats()
+        result.update(mean_batch_size=round(stats["mean_batch_size"], 1), mean_queue_wait_ms=round(stats["mean_queue_wait_ms"], 2))
+    return result
+
+
+async def bench_rerank(vs: VectorStoreService, users: int, rounds: int, candidates: int, batched: bool) -> dict[str, float]:
+    """Each round, `users` concurrent requests rerank `candidates` (uncached) chunks each."""
+    vs.rerank_batcher = make_batcher(vs._score_pair_batch) if batched else None
+    vs.rerank_cache.clear()
+    results = [{"text": f"Help article {i} about baggage, seats and check-in.", "source_id": f"doc_{i}", "score": 0.5} for i in range(candidates)]
+
+    start = time.perf_counter()
+    for round_index in range(rounds):
+        await asyncio.gather(*(vs.arerank_results(f"question {round_index} {user}", results) for user in range(users)))
+    elapsed = time.perf_counter() - start
+
+    result = {"pairs_per_s": round(users * rounds * candidates / elapsed, 1), "requests_per_s": round(users * rounds / elapsed, 1)}
+    if batched:
+        stats = vs.rerank_batcher.stats()
+        result.update(predict_calls=stats["batches"], mean_batch_size=round(stats["mean_batch_size"], 1), mean_queue_wait_ms=round(stats["mean_queue_wait_ms"], 2))
+    else:
+        result["predict_calls"] = users * rounds
+    return result
+
+
+async def run(args: argparse.Namespace) -> None:
+    vs = VectorStoreService()
+
+    for batched in (False, True):
+        print(f"embeddings  batched={batched!s:5}", await bench_embeddings(vs, args.users, args.rounds, batched))
+
+    try:
+        await asyncio.to_thread(vs.warm_reranker)
+    except ImportError:
+        print("sentence-transformers not installed, skipping the cross-encoder benchmark")
+        return
+
+    # The latency budget would turn slow requests into fallbacks, this measures raw scoring throughput
+    config.RERANK_BUDGET_MS = 600_000
+    for batched in (False, True):
+        print(f"cross-encoder batched={batched!s:5}", await bench_rerank(vs, args.users, args.rounds, args.candidates, batched))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=config.RERANK_CANDIDATES)
+    args = parser.parse_args()
+
+    stub_openai.start_in_thread(STUB_PORT)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cold start benchmark.
+- Import time of app.main, measured in fresh interpreters, and which heavy modules the import pulled in.
+- Time until the lifespan reports ready, on an empty index (every document embedded) and on an existing one.
+Startup runs against the local OpenAI stub, so no API key or network is needed.
+Run from repo root: python3 -m app.benchmarks.cold_start --runs 5 --max-import-ms 1500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Settings are read at import time, so the environment must point at the stub before importing the app
+STUB_PORT = int(os.getenv("STUB_PORT", "8902"))
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+os.environ["OPENAI_API_KEY"] = "stub-key"
+os.environ["CHROMA_PATH"] = tempfile.mkdtemp(prefix="chroma_cold_start_")
+
+# Modules that should only be imported once they are used
+HEAVY_MODULES = ["chromadb", "sentence_transformers", "torch"]
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "heavy_modules": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_import(runs: int) -> dict[str, object]:
+    """Import app.main in `runs` fresh interpreters and return the median import time."""
+    timings: list[float] = []
+    heavy_modules: set[str] = set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        heavy_modules.update(result["heavy_modules"])
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "max_ms": round(max(timings) * 1000, 1),
+        "heavy_modules_imported": sorted(heavy_modules),
+    }
+
+
+async def measure_ready() -> dict[str, float]:
+    """Run the lifespan twice on the same index: first on an empty index, then with nothing left to embed."""
+    from app import main as app_main
+
+    timings: dict[str, float] = {}
+    for label in ("empty_index_s", "existing_index_s"):
+        app_main.vs = None
+        start = time.perf_counter()
+        async with app_main.lifespan(app_main.app):
+            timings[label] = round(time.perf_counter() - start, 2)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None, help="exit with status 1 if the median import time is above this")
+    args = parser.parse_args()
+
+    import_stats = measure_import(args.runs)
+    print("import app.main", import_stats)
+
+    from app.benchmarks import stub_openai
+    stub_openai.start_in_thread(STUB_PORT)
+    print("time to ready  ", asyncio.run(measure_ready()))
+
+    if import_stats["heavy_modules_imported"]:
+        print(f"❌ Heavy modules imported with app.main: {', '.join(import_stats['heavy_modules_imported'])}")
+        sys.exit(1)
+    if args.max_import_ms is not None and import_stats["median_ms"] > args.max_import_ms:
+        print(f"❌ Median import time {import_stats['median_ms']}ms is above {args.max_import_ms}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
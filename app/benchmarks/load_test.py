@@ -0,0 +1,119 @@
+"""
+Load test comparing the old sync /help-assistant handler with the async pipeline.
+Both run against the local OpenAI stub, so no API key or network is needed.
+Every request sends a different question and the answer cache, answer store and single-flight are off,
+so both handlers do the full retrieval + generation work; pass --with-caches to measure with them on.
+Run from repo root: python3 -m app.benchmarks.load_test --requests 400 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+# Settings are read at import time, so the environment must point at the stub before importing the app
+STUB_PORT = int(os.getenv("STUB_PORT", "8900"))
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+os.environ["OPENAI_API_KEY"] = "stub-key"
+os.environ.setdefault("CHROMA_PATH", tempfile.mkdtemp(prefix="chroma_bench_"))
+# Stub embeddings aren't calibrated like real ones, the guardrail score gate would skip generation for some queries
+os.environ.setdefault("GUARDRAIL_MIN_SCORE", "0")
+# The stub has no quota or concurrency limit, the upstream limits would turn high load into 503s
+os.environ.setdefault("OPENAI_CHAT_RPM", "0")
+os.environ.setdefault("OPENAI_EMBEDDING_RPM", "0")
+os.environ.setdefault("OPENAI_MAX_IN_FLIGHT", "10000")
+
+import httpx
+from fastapi import FastAPI
+from openai import OpenAI
+from app import config
+from app.benchmarks import stub_openai
+from app.prompt import generate_prompt
+from app.schemas import HelpResponse, TravelQuery
+
+QUERY = "What is the customer support number?"
+
+
+def build_sync_app(vs) -> FastAPI:
+    """Previous implementation: sync def handler, blocking OpenAI client, runs in Starlette's threadpool."""
+    sync_app = FastAPI()
+    sync_client = OpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL)
+
+    @sync_app.post("/help-assistant", response_model=HelpResponse)
+    def help_assistant(query: TravelQuery) -> HelpResponse:
+        search_results = vs.search(query=query.query)
+        retrieved_context = "\n\n---\n\n".join(entry["text"] for entry in search_results)
+        completion = sync_client.chat.completions.create(
+            model=config.CHAT_MODEL,
+            messages=[{"role": "user", "content": generate_prompt(query.query, retrieved_context)}],
+            max_tokens=250,
+        )
+        sources = list(dict.fromkeys(entry["source_id"] for entry in search_results))
+        return HelpResponse(answer=completion.choices[0].message.content, sources=sources, confidence=search_results[0]["score"] * 100)
+
+    return sync_app
+
+
+async def run_load(target_app: FastAPI, label: str, total_requests: int, concurrency: int) -> dict[str, float]:
+    """Send total_requests POSTs with at most `concurrency` in flight and return throughput/latency stats.
+    Each request gets its own question (tagged with `label`), so no run is served from another's cache."""
+    latencies: list[float] = []
+    errors = 0
+    slots = asyncio.Semaphore(concurrency)
+
+    transport = httpx.ASGITransport(app=target_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+
+        async def one_request(i: int) -> None:
+            nonlocal errors
+            async with slots:
+                start = time.perf_counter()
+                response = await http.post("/help-assistant", json={"query": f"{QUERY} ({label} request {i})"})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total_requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+async def main(total_requests: int, concurrency: int, with_caches: bool) -> None:
+    if not with_caches:
+        config.ANSWER_CACHE_ENABLED = False
+        config.ANSWER_STORE = False
+        config.SINGLE_FLIGHT = False
+
+    from app import main as app_main
+
+    sync_app = build_sync_app(app_main.get_vector_store())
+
+    print(f"Stub latency: chat {stub_openai.CHAT_LATENCY_MS}ms, embeddings {stub_openai.EMBED_LATENCY_MS}ms")
+    print("sync  (threadpool):", await run_load(sync_app, "sync", total_requests, concurrency))
+
+    async with app_main.lifespan(app_main.app):
+        print("async (pipeline)  :", await run_load(app_main.app, "async", total_requests, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync vs async /help-assistant load test")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--with-caches", action="store_true", help="keep the answer cache, answer store and single-flight on")
+    args = parser.parse_args()
+
+    stub_openai.start_in_thread(STUB_PORT)
+    asyncio.run(main(args.requests, args.concurrency, args.with_caches))
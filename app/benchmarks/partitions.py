@@ -0,0 +1,78 @@
+"""
+Category partition benchmark: filtered queries on one global index (Chroma `where` / numpy masks) vs per-category partitions.
+Categories of the synthetic corpus are skewed, so the smallest ones are a small fraction of the corpus, which is
+where a filtered HNSW walk loses recall. Recall@k is against exact filtered search.
+No OpenAI calls, embeddings are synthetic.
+Run from repo root: python3 -m app.benchmarks.partitions --size 20000 --backends chroma numpy
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from app.benchmarks.retriever_benchmark import ingest, percentile_ms, recall_at_k, time_queries
+from app.benchmarks.synthetic import make_corpus, make_queries
+from app.retrievers import NumpyRetriever, create_backend
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--categories", type=int, default=20, help="categories in the corpus (sizes fall off as 1/rank)")
+    parser.add_argument("--queries", type=int, default=100, help="queries per category")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", choices=["chroma", "numpy"], default=["chroma", "numpy"])
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    print(f"Building synthetic corpus of {args.size} chunks in {args.categories} categories")
+    corpus = make_corpus(args.size, dim=args.dim, num_categories=args.categories)
+    queries, _ = make_queries(corpus, args.queries)
+    category_counts: dict[str, int] = {}
+    for meta in corpus["metadatas"]:
+        category_counts[meta["category"]] = category_counts.get(meta["category"], 0) + 1
+    # Largest, median and smallest category
+    by_size = sorted(category_counts, key=category_counts.get, reverse=True)
+    categories = [by_size[0], by_size[len(by_size) // 2], by_size[-1]]
+
+    exact = NumpyRetriever()
+    ingest(exact, corpus)
+    truth = {category: time_queries(exact, queries, args.top_k, category)[0] for category in categories}
+
+    results: list[dict] = []
+    print(f"{'backend':<8} {'index':<11} {'category':<12} {'share':>6} {'p50 ms':>7} {'p95 ms':>7} {f'recall@{args.top_k}':>9}")
+    for backend_name in args.backends:
+        for partitioned in (False, True):
+            start = time.perf_counter()
+            backend = create_backend(backend_name, tempfile.mkdtemp(prefix="partition_bench_") if backend_name == "chroma" else None, partitioned=partitioned)
+            ingest_s = ingest(backend, corpus)
+            index = "partitions" if partitioned else "global"
+            print(f"{backend_name:<8} {index:<11} ingest {ingest_s:.1f}s (opened in {time.perf_counter() - start - ingest_s:.1f}s)")
+            for category in categories:
+                time_queries(backend, queries[:5], args.top_k, category) # warm up
+                result_ids, latencies = time_queries(backend, queries, args.top_k, category)
+                result = {
+                    "backend": backend_name,
+                    "index": index,
+                    "category": category,
+                    "share": round(category_counts[category] / args.size, 4),
+                    "ingest_s": round(ingest_s, 1),
+                    "p50_ms": percentile_ms(latencies, 50),
+                    "p95_ms": percentile_ms(latencies, 95),
+                    f"recall@{args.top_k}": recall_at_k(result_ids, truth[category]),
+                }
+                print(
+                    f"{backend_name:<8} {index:<11} {category:<12} {result['share']:>6.1%} {result['p50_ms']:>7.2f} "
+                    f"{result['p95_ms']:>7.2f} {result[f'recall@{args.top_k}']:>9}"
+                )
+                results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"size": args.size, "dim": args.dim, "categories": category_counts, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Quantized vector storage benchmark: float32 vs float16 vs int8 first-pass search, with and without rescoring.
+For each precision it reports the memory the index keeps resident for search, search latency per query,
+and recall@k against exact float32 search. Quantized indexes keep their float32 vectors memory-mapped on disk,
+only the candidates of each query are read from it.
+No OpenAI calls, embeddings are synthetic.
+Run from repo root: python3 -m app.benchmarks.quantization --size 50000 --rescore-factors 1 4
+"""
+
+import argparse
+import json
+import tempfile
+from app.benchmarks.retriever_benchmark import ingest, percentile_ms, recall_at_k, time_queries
+from app.benchmarks.synthetic import make_corpus, make_queries
+from app.retrievers import NumpyRetriever
+
+
+def resident_mb(retriever: NumpyRetriever) -> float:
+    """Vector bytes search keeps in memory: the quantized codes and scales, or the float32 matrix."""
+    if retriever._codes is None:
+        return retriever._vectors.nbytes / 2**20
+    scales = retriever._scales.nbytes if retriever._scales is not None else 0
+    return (retriever._codes.nbytes + scales) / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--precisions", nargs="+", choices=["float32", "float16", "int8"], default=["float32", "float16", "int8"])
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[1, 4], help="candidates rescored per result (1 = first pass order only)")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    print(f"Building synthetic corpus of {args.size} chunks")
+    corpus = make_corpus(args.size)
+    queries, _ = make_queries(corpus, args.queries)
+    exact_ids: list[list[str]] | None = None
+
+    results: list[dict] = []
+    print(f"{'precision':<9} {'rescore':>7} {'resident MB':>11} {'p50 ms':>7} {'p95 ms':>7} {f'recall@{args.top_k}':>9}")
+    for precision in args.precisions:
+        # One index per precision, the rescore factor is only a query time setting
+        retriever = NumpyRetriever(path=tempfile.mkdtemp(prefix=f"quantization_bench_{precision}_"), precision=precision)
+        ingest(retriever, corpus)
+        for rescore_factor in (args.rescore_factors if precision != "float32" else [1]):
+            retriever.rescore_factor = rescore_factor
+            time_queries(retriever, queries[:10], args.top_k, None) # page in the mapped vectors before timing
+            result_ids, latencies = time_queries(retriever, queries, args.top_k, None)
+            if precision == "float32":
+                exact_ids = result_ids # exact float32 search is the ground truth for recall
+            result = {
+                "precision": precision,
+                "rescore_factor": rescore_factor,
+                "resident_mb": round(resident_mb(retriever), 1),
+                "p50_ms": percentile_ms(latencies, 50),
+                "p95_ms": percentile_ms(latencies, 95),
+                f"recall@{args.top_k}": recall_at_k(result_ids, exact_ids) if exact_ids is not None else None,
+            }
+            recall = result[f"recall@{args.top_k}"]
+            print(
+                f"{precision:<9} {rescore_factor:>7} {result['resident_mb']:>11.1f} {result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f} "
+                f"{recall if recall is not None else 'n/a':>9}"
+            )
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"size": args.size, "queries": args.queries, "top_k": args.top_k, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
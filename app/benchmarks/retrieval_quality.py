@@ -0,0 +1,232 @@
+"""
+Retrieval quality and latency benchmark, without the LLM and without network.
+Runs VectorStoreService.search for labelled queries (app/evaluation/retrieval_labels.json, query -> expected source ids)
+and reports recall@k, MRR, nDCG@k and search latency percentiles for every configuration in the sweep.
+Embeddings come from a file recorded once with the real embeddings API (--record), or without one from the stub's
+feature hashing embedding. That one is a lexical proxy: fine for catching regressions, not for absolute scores.
+Run from repo root: python3 -m app.benchmarks.retrieval_quality --backends chroma numpy --hybrid off on --category off on
+Record real embeddings (needs OPENAI_API_KEY): python3 -m app.benchmarks.retrieval_quality --record retrieval_embeddings.npz
+Use them: python3 -m app.benchmarks.retrieval_quality --embeddings retrieval_embeddings.npz
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+import numpy as np
+
+LABELS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "evaluation", "retrieval_labels.json")
+
+# Text -> embedding
+Embedder = Callable[[str], list[float]]
+
+
+def load_labels(path: str = LABELS_PATH) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ranked_sources(results: list[dict[str, object]]) -> list[str]:
+    """Parent source ids in result order, a source with several chunks in the results counts once (at its best rank)."""
+    return list(dict.fromkeys(str(result["source_id"]) for result in results))
+
+
+def recall_at_k(ranked: list[str], relevant: set[str], k: int) -> float:
+    return len(relevant.intersection(ranked[:k])) / len(relevant)
+
+
+def reciprocal_rank(ranked: list[str], relevant: set[str]) -> float:
+    return next((1 / rank for rank, source_id in enumerate(ranked, start=1) if source_id in relevant), 0.0)
+
+
+def ndcg_at_k(ranked: list[str], relevant: set[str], k: int) -> float:
+    """Binary relevance nDCG, the ideal ranking puts every relevant source first."""
+    dcg = sum(1 / math.log2(rank + 1) for rank, source_id in enumerate(ranked[:k], start=1) if source_id in relevant)
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal
+
+
+class PrecomputedEmbeddings:
+    """Stands in for the OpenAI client during ingestion, answering embeddings.create from an Embedder."""
+
+    def __init__(self, embed: Embedder):
+        self.embed = embed
+        self.embeddings = self
+
+    def create(self, model, input):
+        import openai
+        return openai.types.CreateEmbeddingResponse(
+            object="list",
+            model=model,
+            data=[{"object": "embedding", "index": i, "embedding": self.embed(text)} for i, text in enumerate(input)],
+            usage={"prompt_tokens": 0, "total_tokens": 0},
+        )
+
+
+def corpus_texts(labels: list[dict]) -> list[str]:
+    """Every text the benchmark embeds: the chunk documents of the help content, then the label queries."""
+    from app import config
+    from app.ingestion import chunk_record, iter_records
+
+    documents = [
+        document
+        for record in iter_records(config.HELP_CONTENT_PATH)
+        for _, document, _ in chunk_record(record, config.CHUNK_SIZE, config.CHUNK_OVERLAP)
+    ]
+    return documents + [label["query"] for label in labels]
+
+
+def record_embeddings(path: str, labels: list[dict]) -> None:
+    """Embed the corpus and queries with the real API once, so later runs are offline."""
+    from app import config
+    from app.ingestion import embed_with_retries
+    from app.llm import create_client
+
+    client = create_client(max_retries=0)
+    texts = corpus_texts(labels)
+    vectors: list[list[float]] = []
+    for offset in range(0, len(texts), config.EMBEDDING_BATCH_SIZE):
+        embeddings, _ = embed_with_retries(client, texts[offset:offset + config.EMBEDDING_BATCH_SIZE], config.INGEST_MAX_RETRIES, config.INGEST_BACKOFF_SECONDS)
+        vectors.extend(embeddings)
+    np.savez_compressed(path, model=config.EMBEDDING_MODEL, texts=np.array(texts), vectors=np.array(vectors, dtype=np.float32))
+    print(f"Recorded {len(texts)} {config.EMBEDDING_MODEL} embeddings to {path}")
+
+
+def load_embedder(path: str | None) -> tuple[Embedder, str]:
+    """Embedder backed by a recorded file, or the stub's feature hashing embedding when path is None."""
+    if path is None:
+        from app.benchmarks.stub_openai import fake_embedding
+        return fake_embedding, "hashed"
+
+    from app import config
+    recorded = np.load(path)
+    if str(recorded["model"]) != config.EMBEDDING_MODEL:
+        sys.exit(f"{path} was recorded with {recorded['model']}, EMBEDDING_MODEL is {config.EMBEDDING_MODEL}")
+    lookup = {str(text): vector for text, vector in zip(recorded["texts"], recorded["vectors"])}
+
+    def embed(text: str) -> list[float]:
+        if text not in lookup:
+            raise KeyError(f"No recorded embedding for {text[:60]!r}, the help content or labels changed: record again with --record")
+        return lookup[text].tolist()
+
+    return embed, os.path.basename(path)
+
+
+def build_store(backend_name: str, embed: Embedder):
+    """Fresh VectorStoreService on `backend_name` with the help content ingested through the normal path."""
+    from app.retrievers import create_backend
+    from app.vector_store import VectorStoreService
+
+    vs = VectorStoreService()
+    vs.backend = create_backend(backend_name, tempfile.mkdtemp(prefix="retrieval_bench_") if backend_name == "chroma" else None, vs.embedding_function)
+    vs.collection = getattr(vs.backend, "collection", None)
+    vs._ingest_client = PrecomputedEmbeddings(embed)
+    vs.load_help_content()
+    return vs
+
+
+def evaluate_config(vs, labels: list[dict], ks: list[int], use_category: bool) -> dict:
+    """Search every label query once and average the quality metrics, latency is per search call."""
+    top_k = max(ks)
+    sums: dict[str, float] = {f"recall@{k}": 0.0 for k in ks} | {f"ndcg@{k}": 0.0 for k in ks} | {"mrr": 0.0}
+    latencies_ms: list[float] = []
+    misses: list[str] = []
+
+    for label in labels:
+        relevant = set(label["source_ids"])
+        start = time.perf_counter()
+        results = vs.search(label["query"], top_k=top_k, category=label.get("category") if use_category else None)
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        ranked = ranked_sources(results)
+        for k in ks:
+            sums[f"recall@{k}"] += recall_at_k(ranked, relevant, k)
+            sums[f"ndcg@{k}"] += ndcg_at_k(ranked, relevant, k)
+        sums["mrr"] += reciprocal_rank(ranked, relevant)
+        if not relevant.intersection(ranked[:top_k]):
+            misses.append(label["query"])
+
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        **{name: round(total / len(labels), 3) for name, total in sums.items()},
+        "latency_ms": {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)},
+        "misses": misses,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default=LABELS_PATH)
+    parser.add_argument("--embeddings", default=None, help="recorded embeddings file (default: feature hashing embeddings)")
+    parser.add_argument("--record", metavar="PATH", help="record real embeddings for the corpus and labels to PATH, then exit")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--backends", nargs="+", default=None, help="retriever backends (default: RETRIEVER_BACKEND)")
+    parser.add_argument("--hybrid", nargs="+", choices=["off", "on"], default=["off"], help="BM25 + dense fusion")
+    parser.add_argument("--category", nargs="+", choices=["off", "on"], default=["off"], help="filter on the label's category")
+    parser.add_argument("--reranker", nargs="+", choices=["off", "on"], default=["off"], help="cross-encoder reranker (needs sentence-transformers)")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the labels per config, for steadier latency")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--min-recall", type=float, default=None, help="exit 1 when any config's recall@max k is below this")
+    args = parser.parse_args()
+
+    # Settings are read at import time: no persisted embedding cache, and the service must not touch ./chroma_data
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    os.environ.setdefault("CHROMA_PATH", tempfile.mkdtemp(prefix="chroma_retrieval_bench_"))
+    labels = load_labels(args.labels)
+    if args.record:
+        record_embeddings(args.record, labels)
+        return
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark") # never used, every embedding is precomputed
+
+    from app import config
+    embed, embeddings_name = load_embedder(args.embeddings)
+
+    results: list[dict] = []
+    top_k = max(args.k)
+    print(f"{len(labels)} labelled queries, {embeddings_name} embeddings")
+    print(f"{'backend':<8} {'hybrid':<6} {'cat':<4} {'rerank':<6} {f'recall@{top_k}':>9} {'mrr':>6} {f'ndcg@{top_k}':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for backend_name in args.backends or [config.RETRIEVER_BACKEND]:
+        vs = build_store(backend_name, embed)
+        # Query embeddings are precomputed into the cache, so search() never calls the API
+        for label in labels:
+            vs.embedding_cache.put(vs._embedding_cache_key(label["query"]), embed(label["query"]))
+
+        for hybrid, category, reranker in itertools.product(args.hybrid, args.category, args.reranker):
+            vs.use_hybrid = hybrid == "on"
+            vs.use_reranker = reranker == "on"
+            vs.rerank_cache.clear()
+            if vs.use_reranker:
+                vs.warm_reranker()
+
+            runs = [evaluate_config(vs, labels, args.k, category == "on") for _ in range(args.repeat)]
+            result = {
+                "backend": backend_name, "hybrid": hybrid, "category": category, "reranker": reranker,
+                **runs[-1], # quality is the same every pass (the rerank cache only changes latency)
+                "latency_ms": {pct: round(float(np.median([run["latency_ms"][pct] for run in runs])), 3) for pct in ("p50", "p95", "p99")},
+            }
+            print(
+                f"{backend_name:<8} {hybrid:<6} {category:<4} {reranker:<6} {result[f'recall@{top_k}']:>9.3f} {result['mrr']:>6.3f} "
+                f"{result[f'ndcg@{top_k}']:>8.3f} {result['latency_ms']['p50']:>8.3f} {result['latency_ms']['p95']:>8.3f}"
+            )
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"embeddings": embeddings_name, "labels": len(labels), "k": args.k, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.min_recall is not None:
+        failing = [result for result in results if result[f"recall@{top_k}"] < args.min_recall]
+        for result in failing:
+            print(f"❌ recall@{top_k} {result[f'recall@{top_k}']} < {args.min_recall}: {result['backend']} hybrid={result['hybrid']} category={result['category']} reranker={result['reranker']}")
+            print(f"   missed: {result['misses']}")
+        sys.exit(1 if failing else 0)
+
+
+if __name__ == "__main__":
+    main()
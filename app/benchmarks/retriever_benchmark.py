@@ -0,0 +1,97 @@
+"""
+Benchmark of the retriever backends (Chroma HNSW vs NumPy exact search) on a synthetic corpus.
+No OpenAI calls, embeddings are synthetic.
+Run from repo root: python3 -m app.benchmarks.retriever_benchmark --size 50000
+"""
+
+import argparse
+import tempfile
+import time
+import numpy as np
+from app.benchmarks.synthetic import make_corpus, make_queries
+from app.retrievers import ChromaRetriever, NumpyRetriever, RetrieverBackend
+
+
+def percentile_ms(latencies: list[float], pct: float) -> float:
+    return round(float(np.percentile(latencies, pct)) * 1000, 2)
+
+
+def ingest(backend: RetrieverBackend, corpus: dict, batch_size: int = 5000) -> float:
+    """Insert the corpus in batches and return the elapsed seconds."""
+    start = time.perf_counter()
+    for offset in range(0, len(corpus["ids"]), batch_size):
+        end = offset + batch_size
+        backend.upsert(
+            corpus["ids"][offset:end],
+            corpus["documents"][offset:end],
+            corpus["metadatas"][offset:end],
+            corpus["embeddings"][offset:end].tolist(),
+        )
+    backend.flush()
+    return time.perf_counter() - start
+
+
+def time_queries(backend: RetrieverBackend, queries: np.ndarray, top_k: int, category: str | None) -> tuple[list[list[str]], list[float]]:
+    """Run queries one at a time (like the API does) and return (result ids, latencies)."""
+    result_ids: list[list[str]] = []
+    latencies: list[float] = []
+    for query in queries:
+        start = time.perf_counter()
+        results = backend.query([query.tolist()], top_k=top_k, category=category)[0]
+        latencies.append(time.perf_counter() - start)
+        result_ids.append([entry["source_id"] for entry in results])
+    return result_ids, latencies
+
+
+def recall_at_k(results: list[list[str]], exact: list[list[str]]) -> float:
+    """Fraction of the exact top-k neighbours found, averaged over queries."""
+    overlaps = [len(set(found) & set(truth)) / len(truth) for found, truth in zip(results, exact) if truth]
+    return round(float(np.mean(overlaps)), 4) if overlaps else 0.0
+
+
+def main(size: int, num_queries: int, top_k: int) -> None:
+    print(f"Building synthetic corpus of {size} chunks")
+    corpus = make_corpus(size)
+    queries, _ = make_queries(corpus, num_queries)
+
+    # Smallest category, where post-filtered HNSW search is hardest
+    category_counts: dict[str, int] = {}
+    for meta in corpus["metadatas"]:
+        category_counts[meta["category"]] = category_counts.get(meta["category"], 0) + 1
+    small_category = min(category_counts, key=category_counts.get)
+
+    backends: dict[str, RetrieverBackend] = {
+        "numpy": NumpyRetriever(path=None),
+        "chroma": ChromaRetriever(path=tempfile.mkdtemp(prefix="chroma_bench_"), collection_name="bench"),
+    }
+
+    exact: dict[str | None, list[list[str]]] = {}
+    for name, backend in backends.items():
+        ingest_s = ingest(backend, corpus)
+        print(f"\n[{name}] ingest: {ingest_s:.1f}s")
+
+        for category in (None, small_category):
+            label = "unfiltered" if category is None else f"filtered ({category}, {category_counts[category]} chunks)"
+            result_ids, latencies = time_queries(backend, queries, top_k, category)
+            if name == "numpy":
+                exact[category] = result_ids # exact search is the ground truth for recall
+            print(
+                f"[{name}] {label}: p50 {percentile_ms(latencies, 50)}ms, p95 {percentile_ms(latencies, 95)}ms, "
+                f"recall@{top_k} {recall_at_k(result_ids, exact[category])}"
+            )
+
+    # NumPy can also answer many queries with one matrix multiply
+    numpy_backend = backends["numpy"]
+    start = time.perf_counter()
+    numpy_backend.query(queries.tolist(), top_k=top_k)
+    batched_s = time.perf_counter() - start
+    print(f"\n[numpy] batched {num_queries} queries in one call: {batched_s * 1000:.1f}ms ({num_queries / batched_s:.0f} queries/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chroma vs NumPy retriever benchmark")
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+    main(args.size, args.queries, args.top_k)
@@ -0,0 +1,124 @@
+"""
+Multi-worker memory and startup benchmark: private index copies vs the shared read-only index.
+Starts N worker processes at once, each opens the index and runs queries over it (so every vector page is touched),
+then, with all workers alive, reports per worker startup time, RSS and PSS. PSS splits shared pages between
+the processes mapping them, so it shows what a worker really costs (RSS counts shared pages in full for everyone).
+Modes:
+- numpy: every worker loads its own copy (NumpyRetriever.load)
+- shared: every worker memory-maps the same build (SharedIndexRetriever)
+- chroma: every worker opens the same Chroma collection (needs a build, slow for large sizes)
+No OpenAI calls, embeddings are synthetic.
+Run from repo root: python3 -m app.benchmarks.shared_index --size 20000 --workers 1 8
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from app.benchmarks.retriever_benchmark import ingest
+from app.benchmarks.synthetic import make_corpus, make_queries
+from app.retrievers import ChromaRetriever, NumpyRetriever, write_shared_index
+
+WORKER_SCRIPT = """
+import json, sys, time
+import numpy as np
+from app.retrievers import ChromaRetriever, NumpyRetriever, SharedIndexRetriever
+
+mode, path = sys.argv[1], sys.argv[2]
+queries = np.load(sys.argv[3])
+start = time.perf_counter()
+backend = {"numpy": NumpyRetriever, "shared": SharedIndexRetriever, "chroma": ChromaRetriever}[mode](path)
+opened = time.perf_counter() - start
+for query in queries:
+    backend.query([query.tolist()], top_k=5)
+ready = time.perf_counter() - start
+
+print("ready", flush=True)
+sys.stdin.readline() # wait until every worker is up, PSS depends on who else maps the pages
+
+memory = {}
+with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+        name, _, value = line.partition(":")
+        if name in ("Rss", "Pss"):
+            memory[name.lower() + "_mb"] = int(value.split()[0]) / 1024
+print(json.dumps({"open_s": opened, "ready_s": ready, **memory}), flush=True)
+"""
+
+
+def run_workers(mode: str, path: str, queries_path: str, workers: int) -> dict[str, float]:
+    """Start `workers` processes at once and return median per worker startup and memory."""
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT, mode, path, queries_path], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        if process.stdout.readline().strip() != "ready":
+            raise RuntimeError(f"{mode} worker failed to start")
+    all_ready = time.perf_counter() - started
+
+    results: list[dict[str, float]] = []
+    for process in processes:
+        process.stdin.write("measure\n")
+        process.stdin.flush()
+    for process in processes:
+        results.append(json.loads(process.stdout.readline()))
+        process.wait()
+
+    return {
+        "workers": workers,
+        "all_ready_s": round(all_ready, 2),
+        **{name: round(statistics.median(result[name] for result in results), 3 if name.endswith("_s") else 1) for name in results[0]},
+        "total_pss_mb": round(sum(result["pss_mb"] for result in results), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000, help="chunks in the synthetic index")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--modes", nargs="+", choices=["numpy", "shared", "chroma"], default=["numpy", "shared"])
+    parser.add_argument("--queries", type=int, default=20, help="queries each worker runs before measuring")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.size, dim=args.dim)
+    queries, _ = make_queries(corpus, args.queries)
+    workdir = tempfile.mkdtemp(prefix="shared_index_bench_")
+    queries_path = f"{workdir}/queries.npy"
+    np.save(queries_path, queries)
+
+    # Each mode's index is built once, workers only open it
+    paths = {"numpy": f"{workdir}/numpy", "shared": f"{workdir}/shared", "chroma": f"{workdir}/chroma"}
+    numpy_index = NumpyRetriever(path=paths["numpy"])
+    ingest(numpy_index, corpus)
+    write_shared_index(paths["shared"], numpy_index, "synthetic")
+    if "chroma" in args.modes:
+        ingest(ChromaRetriever(path=paths["chroma"]), corpus)
+    print(f"{args.size} chunks x {args.dim} dims, vectors {corpus['embeddings'].nbytes / 2**20:.0f} MB")
+
+    results: list[dict] = []
+    print(f"{'mode':<7} {'workers':>7} {'open s':>7} {'ready s':>8} {'all ready s':>11} {'rss MB':>8} {'pss MB':>8} {'total pss MB':>12}")
+    for mode in args.modes:
+        for workers in args.workers:
+            result = {"mode": mode, **run_workers(mode, paths[mode], queries_path, workers)}
+            print(
+                f"{mode:<7} {workers:>7} {result['open_s']:>7.3f} {result['ready_s']:>8.3f} {result['all_ready_s']:>11.2f} "
+                f"{result['rss_mb']:>8.1f} {result['pss_mb']:>8.1f} {result['total_pss_mb']:>12.1f}"
+            )
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"size": args.size, "dim": args.dim, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
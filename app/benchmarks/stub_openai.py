@@ -0,0 +1,208 @@
+"""
+Local stand-in for the OpenAI chat-completions and embeddings APIs, used by the benchmarks.
+Run from repo root: python3 -m app.benchmarks.stub_openai --port 8900
+Then point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+Fault injection: STUB_FAILURE_RATE=0.3 STUB_FAILURE_STATUS=429 python3 -m app.benchmarks.stub_openai
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBEDDING_DIM = 1536
+
+# Simulated upstream latency in milliseconds
+CHAT_LATENCY_MS: float = float(os.getenv("STUB_CHAT_LATENCY_MS", "800"))
+EMBED_LATENCY_MS: float = float(os.getenv("STUB_EMBED_LATENCY_MS", "50"))
+# Streaming mode: delay before the first token, then per token
+STREAM_FIRST_TOKEN_MS: float = float(os.getenv("STUB_STREAM_FIRST_TOKEN_MS", "300"))
+STREAM_TOKEN_MS: float = float(os.getenv("STUB_STREAM_TOKEN_MS", "25"))
+
+# Latency distribution around those means: "fixed", "uniform" (mean ± jitter) or "lognormal" (sigma = jitter, long right tail)
+LATENCY_DISTRIBUTION: str = os.getenv("STUB_LATENCY_DISTRIBUTION", "fixed").lower()
+LATENCY_JITTER: float = float(os.getenv("STUB_LATENCY_JITTER", "0.3"))
+# Seeded so a benchmark run sees the same sequence of latencies every time
+_latency_rng = random.Random(int(os.getenv("STUB_SEED", "0")))
+
+# Fault injection: this fraction of chat / embeddings requests fail with FAILURE_STATUS (429s carry a Retry-After of
+# FAILURE_RETRY_AFTER seconds). FAIL_NEXT fails the next N requests whatever the rate, tests set it directly
+FAILURE_RATE: float = float(os.getenv("STUB_FAILURE_RATE", "0"))
+FAILURE_STATUS: int = int(os.getenv("STUB_FAILURE_STATUS", "500"))
+FAILURE_RETRY_AFTER: str = os.getenv("STUB_FAILURE_RETRY_AFTER", "0.05")
+FAIL_NEXT: int = 0
+_failure_rng = random.Random(int(os.getenv("STUB_SEED", "0")))
+# Requests received per endpoint ("chat", "embeddings"), failed ones included
+request_counts: dict[str, int] = {"chat": 0, "embeddings": 0}
+
+STUB_ANSWER = "Customer service is available 24/7. Call +44 344 874 7747 for UK customers. (Source: contact_001)"
+
+stub_app = FastAPI()
+
+
+def sample_latency_ms(mean_ms: float) -> float:
+    """Draw one latency from the configured distribution (with the given mean)."""
+    if mean_ms <= 0 or LATENCY_DISTRIBUTION == "fixed":
+        return max(mean_ms, 0.0)
+    if LATENCY_DISTRIBUTION == "uniform":
+        return mean_ms * _latency_rng.uniform(1 - LATENCY_JITTER, 1 + LATENCY_JITTER)
+    if LATENCY_DISTRIBUTION == "lognormal":
+        # mu chosen so the distribution's mean is mean_ms
+        return _latency_rng.lognormvariate(math.log(mean_ms) - LATENCY_JITTER ** 2 / 2, LATENCY_JITTER)
+    raise ValueError(f"Unknown STUB_LATENCY_DISTRIBUTION '{LATENCY_DISTRIBUTION}', expected fixed, uniform or lognormal")
+
+
+def injected_failure(kind: str) -> JSONResponse | None:
+    """Count the request, and return the error response when this one is to fail."""
+    global FAIL_NEXT
+    request_counts[kind] += 1
+    if FAIL_NEXT > 0:
+        FAIL_NEXT -= 1
+    elif not (FAILURE_RATE > 0 and _failure_rng.random() < FAILURE_RATE):
+        return None
+    headers = {"retry-after": FAILURE_RETRY_AFTER} if FAILURE_STATUS == 429 else None
+    error = {"message": f"Injected {FAILURE_STATUS} from the stub", "type": "rate_limit_exceeded" if FAILURE_STATUS == 429 else "server_error"}
+    return JSONResponse(status_code=FAILURE_STATUS, content={"error": error}, headers=headers)
+
+
+def _token_index(token: str) -> tuple[int, float]:
+    """Hash a token to a (dimension, sign) pair."""
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    index = int.from_bytes(digest[:4], "little") % EMBEDDING_DIM
+    sign = 1.0 if digest[4] % 2 == 0 else -1.0
+    return index, sign
+
+
+def fake_embedding(text: str) -> list[float]:
+    """
+    Deterministic embedding using feature hashing over lowercase word tokens.
+    Texts sharing words end up with a higher cosine similarity, which keeps retrieval results meaningful.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    tokens = re.findall(r"[a-z0-9£+]+", text.lower()) or [text]
+    for token in tokens:
+        index, sign = _token_index(token)
+        vector[index] += sign
+
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector.tolist()
+
+
+@stub_app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    failure = injected_failure("embeddings")
+    if failure is not None:
+        return failure
+    body = await request.json()
+    inputs = body["input"]
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    await asyncio.sleep(sample_latency_ms(EMBED_LATENCY_MS) / 1000)
+    return {
+        "object": "list",
+        "model": body.get("model", "text-embedding-3-small"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": sum(len(text.split()) for text in inputs), "total_tokens": sum(len(text.split()) for text in inputs)},
+    }
+
+
+async def _stream_chunks(model: str, include_usage: bool = False):
+    """Yield the stub answer as OpenAI-style chat.completion.chunk events."""
+    await asyncio.sleep(sample_latency_ms(STREAM_FIRST_TOKEN_MS) / 1000)
+    words = STUB_ANSWER.split(" ")
+    for i, word in enumerate(words):
+        delta = word if i == 0 else " " + word
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(STREAM_TOKEN_MS / 1000)
+
+    final = {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    if include_usage:
+        # Sent last with no choices, like the real API with stream_options={"include_usage": True}
+        usage = {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)}
+        yield f"data: {json.dumps({**final, 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@stub_app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    failure = injected_failure("chat")
+    if failure is not None:
+        return failure
+    body = await request.json()
+    if body.get("stream"):
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(_stream_chunks(body.get("model", "gpt-4o"), include_usage), media_type="text/event-stream")
+
+    await asyncio.sleep(sample_latency_ms(CHAT_LATENCY_MS) / 1000)
+
+    prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in body.get("messages", []))
+    # One word per token, cut at max_tokens like the real API
+    words = STUB_ANSWER.split()
+    max_tokens = body.get("max_tokens") or len(words)
+    content = " ".join(words[:max_tokens])
+    completion_tokens = min(len(words), max_tokens)
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "length" if max_tokens < len(words) else "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def start_in_thread(port: int) -> uvicorn.Server:
+    """Start the stub server in a background thread and wait until it accepts requests."""
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI stub server")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+    uvicorn.run(stub_app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,251 @@
+"""
+Benchmark suite, results are written as JSON so runs can be compared between commits.
+- api: /help-assistant at fixed concurrency levels, throughput and p50/p95/p99 latency overall and per stage
+  (stages come from the Server-Timing header: queue, embed, cache, retrieve, generate).
+- retrieval: VectorStoreService.search alone over synthetic corpora (1k/10k/100k chunks by default), unfiltered and category filtered.
+Everything runs against the local OpenAI stub, so no API key or network is needed.
+Run from repo root: python3 -m app.benchmarks.suite --output bench.json
+Compare two runs:   python3 -m app.benchmarks.suite --compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+STUB_PORT = int(os.getenv("STUB_PORT", "8904"))
+
+QUERIES = [
+    "What is the customer support number?",
+    "What is the baggage allowance for international economy passengers?",
+    "How much do excess baggage charges cost on international flights?",
+    "Can I change my flight booking after purchase?",
+    "What is the cancellation policy for economy tickets?",
+    "When does online checkin open and close for international flights?",
+    "What documents do I need for airport checkin?",
+    "Are special meals available on flights",
+]
+
+
+def percentiles_ms(samples_ms: list[float]) -> dict[str, float]:
+    if not samples_ms:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+
+async def bench_api(concurrency_levels: list[int], requests_per_level: int) -> list[dict]:
+    """Drive /help-assistant in-process (httpx ASGI transport) at each concurrency level."""
+    import httpx
+    from app import main as app_main
+    from app.timing import parse_server_timing
+
+    results: list[dict] = []
+    async with app_main.lifespan(app_main.app):
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as http:
+            # Warm up connections and lazy initialisation outside the measured runs
+            await http.post("/help-assistant", json={"query": QUERIES[0]})
+
+            for concurrency in concurrency_levels:
+                latencies_ms: list[float] = []
+                stage_samples: dict[str, list[float]] = {}
+                errors = 0
+                slots = asyncio.Semaphore(concurrency)
+
+                async def one_request(i: int) -> None:
+                    nonlocal errors
+                    # Unique text per request, so caches don't turn the run into a cache benchmark
+                    query = f"{QUERIES[i % len(QUERIES)]} (request {concurrency}-{i})"
+                    async with slots:
+                        start = time.perf_counter()
+                        response = await http.post("/help-assistant", json={"query": query})
+                        latencies_ms.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        errors += 1
+                        return
+                    for name, duration in parse_server_timing(response.headers.get("server-timing", "")).items():
+                        stage_samples.setdefault(name, []).append(duration)
+
+                start = time.perf_counter()
+                await asyncio.gather(*(one_request(i) for i in range(requests_per_level)))
+                elapsed = time.perf_counter() - start
+
+                result = {
+                    "concurrency": concurrency,
+                    "requests": requests_per_level,
+                    "errors": errors,
+                    "throughput_rps": round(requests_per_level / elapsed, 2),
+                    "latency_ms": percentiles_ms(latencies_ms),
+                    "stages_ms": {name: percentiles_ms(samples) for name, samples in stage_samples.items()},
+                }
+                print(f"api concurrency={concurrency}: {result['throughput_rps']} rps, latency {result['latency_ms']}")
+                results.append(result)
+    return results
+
+
+def bench_retrieval(sizes: list[int], backends: list[str], num_queries: int, top_k: int, dim: int) -> list[dict]:
+    """VectorStoreService.search over synthetic corpora, query embeddings are pre-cached so no API call is timed."""
+    from app.benchmarks.synthetic import make_corpus, make_queries
+    from app.retrievers import create_backend
+    from app.vector_store import VectorStoreService
+
+    results: list[dict] = []
+    for size in sizes:
+        corpus = make_corpus(size, dim=dim)
+        queries, _ = make_queries(corpus, num_queries)
+        category_counts: dict[str, int] = {}
+        for meta in corpus["metadatas"]:
+            category_counts[meta["category"]] = category_counts.get(meta["category"], 0) + 1
+        small_category = min(category_counts, key=category_counts.get)
+
+        for backend_name in backends:
+            # "<backend>-partitioned" runs the same backend behind a PartitionedRetriever
+            base_name, _, variant = backend_name.partition("-")
+            vs = VectorStoreService()
+            # Fresh index per run (in memory for numpy)
+            vs.backend = create_backend(
+                base_name, tempfile.mkdtemp(prefix="bench_") if base_name == "chroma" else None, vs.embedding_function,
+                partitioned=variant == "partitioned",
+            )
+            vs.collection = getattr(vs.backend, "collection", None)
+
+            start = time.perf_counter()
+            for offset in range(0, size, 5000):
+                end = offset + 5000
+                vs.backend.upsert(corpus["ids"][offset:end], corpus["documents"][offset:end], corpus["metadatas"][offset:end], corpus["embeddings"][offset:end].tolist())
+            vs.backend.flush()
+            ingest_s = time.perf_counter() - start
+
+            query_texts = [f"synthetic query {i}" for i in range(num_queries)]
+            for text, vector in zip(query_texts, queries):
+                vs.embedding_cache.put(vs._embedding_cache_key(text), vector.tolist())
+
+            result: dict = {"backend": backend_name, "size": size, "dim": dim, "ingest_s": round(ingest_s, 2)}
+            for label, category in (("unfiltered", None), ("filtered", small_category)):
+                latencies_ms: list[float] = []
+                for text in query_texts:
+                    start = time.perf_counter()
+                    vs.search(text, top_k=top_k, category=category)
+                    latencies_ms.append((time.perf_counter() - start) * 1000)
+                result[label] = {**percentiles_ms(latencies_ms), "qps": round(1000 * len(latencies_ms) / sum(latencies_ms), 1)}
+            result["filtered"]["category_size"] = category_counts[small_category]
+            print(f"retrieval {backend_name} size={size}: unfiltered {result['unfiltered']}, filtered {result['filtered']}")
+            results.append(result)
+            del vs
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path: str, after_path: str, threshold: float) -> bool:
+    """Print the change between two result files, returns True if any p95 or throughput got worse by more than threshold."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+
+    regressed = False
+
+    def report(label: str, old: float, new: float, higher_is_better: bool) -> None:
+        nonlocal regressed
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = "❌" if worse > threshold else "  "
+        regressed = regressed or worse > threshold
+        print(f"{flag} {label}: {old} -> {new} ({change:+.1%})")
+
+    old_api = {entry["concurrency"]: entry for entry in before.get("api", [])}
+    for entry in after.get("api", []):
+        old = old_api.get(entry["concurrency"])
+        if old:
+            report(f"api c={entry['concurrency']} throughput_rps", old["throughput_rps"], entry["throughput_rps"], True)
+            report(f"api c={entry['concurrency']} p95_ms", old["latency_ms"]["p95"], entry["latency_ms"]["p95"], False)
+
+    old_retrieval = {(entry["backend"], entry["size"]): entry for entry in before.get("retrieval", [])}
+    for entry in after.get("retrieval", []):
+        old = old_retrieval.get((entry["backend"], entry["size"]))
+        if old:
+            for label in ("unfiltered", "filtered"):
+                report(f"retrieval {entry['backend']} {entry['size']} {label} p95_ms", old[label]["p95"], entry[label]["p95"], False)
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128], help="concurrency levels for the api benchmark")
+    parser.add_argument("--requests", type=int, default=256, help="requests per concurrency level")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="synthetic corpus sizes for the retrieval benchmark")
+    parser.add_argument("--backends", nargs="+", default=None, help="retriever backends for the retrieval benchmark, e.g. chroma chroma-partitioned numpy (default: RETRIEVER_BACKEND)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--with-caches", action="store_true", help="keep the semantic answer cache on")
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--skip-retrieval", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported as a regression by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+
+    # Settings are read at import time, so the environment must point at the stub before importing the app
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub-key"
+    os.environ.setdefault("CHROMA_PATH", tempfile.mkdtemp(prefix="chroma_bench_"))
+    # Stub embeddings aren't calibrated like real ones, the guardrail score gate would skip generation for some queries
+    os.environ.setdefault("GUARDRAIL_MIN_SCORE", "0")
+    # The stub has no quota or concurrency limit, the upstream limits would turn high load into 503s
+    os.environ.setdefault("OPENAI_CHAT_RPM", "0")
+    os.environ.setdefault("OPENAI_EMBEDDING_RPM", "0")
+    os.environ.setdefault("OPENAI_MAX_IN_FLIGHT", "10000")
+    if not args.with_caches:
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+
+    from app import config
+    from app.benchmarks import stub_openai
+    stub_openai.start_in_thread(STUB_PORT)
+
+    results: dict = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "retriever_backend": config.RETRIEVER_BACKEND,
+            "answer_cache": config.ANSWER_CACHE_ENABLED,
+            "stub": {
+                "chat_latency_ms": stub_openai.CHAT_LATENCY_MS,
+                "embed_latency_ms": stub_openai.EMBED_LATENCY_MS,
+                "distribution": stub_openai.LATENCY_DISTRIBUTION,
+                "jitter": stub_openai.LATENCY_JITTER,
+            },
+        },
+    }
+    if not args.skip_api:
+        results["api"] = asyncio.run(bench_api(args.levels, args.requests))
+    if not args.skip_retrieval:
+        results["retrieval"] = bench_retrieval(args.sizes, args.backends or [config.RETRIEVER_BACKEND], args.queries, args.top_k, args.dim)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Synthetic corpora for retrieval benchmarks.
+Vectors are grouped around random topic centres so nearest neighbours are meaningful (pure random vectors are all equally far apart).
+"""
+
+import numpy as np
+
+EMBEDDING_DIM = 1536
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def make_corpus(size: int, dim: int = EMBEDDING_DIM, num_categories: int = 10, num_topics: int = 200, seed: int = 0) -> dict:
+    """
+    Build `size` chunks with ids, documents, metadatas and unit-normalised float32 embeddings.
+    Category sizes are skewed (category i gets weight 1/(i+1)) so some categories are a small fraction of the corpus.
+    """
+    rng = np.random.default_rng(seed)
+    topic_centres = _normalise(rng.standard_normal((num_topics, dim)))
+    topics = rng.integers(0, num_topics, size=size)
+    # Noise with norm ~1, so a chunk has cosine ~0.7 with its topic centre
+    noise = rng.standard_normal((size, dim)).astype(np.float32) / np.sqrt(dim)
+    embeddings = _normalise(topic_centres[topics] + noise)
+
+    weights = 1.0 / np.arange(1, num_categories + 1)
+    categories = rng.choice(num_categories, size=size, p=weights / weights.sum())
+
+    ids = [f"chunk_{i:07d}" for i in range(size)]
+    return {
+        "ids": ids,
+        "documents": [f"Synthetic help chunk {i} about topic {topics[i]}" for i in range(size)],
+        "metadatas": [
+            {"source_id": ids[i], "title": f"Chunk {i}", "category": f"category_{categories[i]}"}
+            for i in range(size)
+        ],
+        "embeddings": embeddings,
+    }
+
+
+def make_queries(corpus: dict, num_queries: int, noise: float = 0.5, seed: int = 1) -> tuple[np.ndarray, list[str]]:
+    """Queries are noisy copies of random corpus chunks. Returns (query vectors, id of the chunk each query was made from)."""
+    rng = np.random.default_rng(seed)
+    embeddings: np.ndarray = corpus["embeddings"]
+    rows = rng.integers(0, len(embeddings), size=num_queries)
+    dim = embeddings.shape[1]
+    queries = _normalise(embeddings[rows] + noise * rng.standard_normal((num_queries, dim)).astype(np.float32) / np.sqrt(dim))
+    return queries, [corpus["ids"][row] for row in rows]
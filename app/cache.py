@@ -0,0 +1,236 @@
+"""
+In-process caches used by the retrieval pipeline.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, TypeVar
+import numpy as np
+
+V = TypeVar("V")
+
+
+def normalize_query(query: str) -> str:
+    """Normalise a query for cache lookups (lowercase, collapse whitespace, drop trailing punctuation)."""
+    normalized = re.sub(r"\s+", " ", query.strip().lower())
+    return normalized.rstrip("?!. ")
+
+
+class LRUTTLCache(Generic[V]):
+    """
+    Bounded LRU cache with an optional time-to-live per entry.
+    Thread safe, since sync search runs in worker threads.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float | None = None):
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None # None = entries never expire
+        self._entries: OrderedDict[str, tuple[float, V]] = OrderedDict() # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> V | None:
+        """Return the cached value (and mark it recently used), or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if self._is_expired(stored_at, now):
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: V, stored_at: float | None = None) -> None:
+        """Add or refresh an entry, evicting the least recently used one when full."""
+        with self._lock:
+            self._entries[key] = (stored_at if stored_at is not None else time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: str) -> V | None:
+        """Remove an entry and return its value if present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, float]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def save(self, path: str) -> None:
+        """Write non-expired entries to a JSON file (atomic replace so a crash can't leave a half written file)."""
+        now = time.time()
+        with self._lock:
+            entries = [
+                [key, stored_at, value]
+                for key, (stored_at, value) in self._entries.items()
+                if not self._is_expired(stored_at, now)
+            ]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """Load entries saved by save(), skipping expired ones. Returns the number of entries loaded."""
+        if not os.path.exists(path):
+            return 0
+
+        with open(path, "r") as f:
+            entries = json.load(f)
+
+        now = time.time()
+        loaded = 0
+        for key, stored_at, value in entries: # saved in LRU order, so the most recent ones stay on eviction
+            if not self._is_expired(stored_at, now):
+                self.put(key, value, stored_at=stored_at)
+                loaded += 1
+        return loaded
+
+
+class SemanticAnswerCache:
+    """
+    Cache of full answers keyed on query embedding + category filter.
+    A lookup hits when a cached query with the same category is within the cosine similarity threshold.
+    Vectors live in one preallocated matrix, so a lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, max_size: int, similarity_threshold: float):
+        self.max_size = max(1, max_size)
+        self.similarity_threshold = similarity_threshold
+
+        self._vectors: np.ndarray | None = None # (max_size, dim), allocated on first put
+        # Categories are stored as small int codes so the filter is a vectorised comparison (-1 = empty slot)
+        self._category_codes: dict[str | None, int] = {}
+        self._slot_category = np.full(self.max_size, -1, dtype=np.int32)
+        self._free_slots: list[int] = list(range(self.max_size - 1, -1, -1))
+        self._entries: OrderedDict[int, tuple[object, set[str]]] = OrderedDict() # slot -> (answer, source_ids), LRU order
+        self._lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+
+    @staticmethod
+    def _normalise(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def _remove_slot(self, slot: int) -> None:
+        self._entries.pop(slot, None)
+        self._slot_category[slot] = -1
+        self._free_slots.append(slot)
+
+    def get(self, embedding: list[float], category: str | None) -> object | None:
+        """Return the cached answer for the closest matching query, or None on a miss."""
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                self.misses += 1
+                return None
+
+            code = self._category_codes.get(category)
+            candidates = self._slot_category == code if code is not None else None
+            if candidates is None or not candidates.any():
+                self.misses += 1
+                return None
+
+            similarities = np.where(candidates, self._vectors @ self._normalise(embedding), -np.inf)
+            best_slot = int(np.argmax(similarities))
+            if similarities[best_slot] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_slot)
+            self.hits += 1
+            return self._entries[best_slot][0]
+
+    def put(self, embedding: list[float], category: str | None, answer: object, source_ids: list[str]) -> None:
+        """Store an answer, evicting the least recently used entry when full."""
+        vector = self._normalise(embedding)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+            if not self._free_slots:
+                oldest_slot = next(iter(self._entries))
+                self._remove_slot(oldest_slot)
+                self.evictions += 1
+
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._slot_category[slot] = self._category_codes.setdefault(category, len(self._category_codes))
+            self._entries[slot] = (answer, set(source_ids))
+
+    def invalidate_sources(self, source_ids: list[str] | set[str]) -> int:
+        """Drop every cached answer that used any of the given source ids. Returns the number removed."""
+        changed = set(source_ids)
+        with self._lock:
+            stale_slots = [slot for slot, (_, sources) in self._entries.items() if sources & changed]
+            for slot in stale_slots:
+                self._remove_slot(slot)
+            self.invalidations += len(stale_slots)
+            return len(stale_slots)
+
+    def clear(self) -> None:
+        with self._lock:
+            for slot in list(self._entries):
+                self._remove_slot(slot)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, float]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,126 @@
+"""
+Single-flight request coalescing.
+While a call for a key is running, callers with the same key don't start their own: they wait for the running one
+and share its result (or its exception). Streams are shared the same way, a late subscriber first gets the events
+sent so far and then follows along live. Nothing is kept once the call finishes, this is not a cache.
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Generic, TypeVar
+
+R = TypeVar("R")
+
+
+class SharedStream:
+    """Events of one in-flight stream, replayed to subscribers that join late."""
+
+    def __init__(self):
+        self.events: list[str] = []
+        self.finished: bool = False
+        self.error: BaseException | None = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event() # waiters hold the old (now set) event, later waiters get a fresh one
+
+    def publish(self, event: str) -> None:
+        self.events.append(event)
+        self._notify()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.finished = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            if position < len(self.events):
+                position += 1
+                yield self.events[position - 1]
+            elif self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
+
+
+class SingleFlight(Generic[R]):
+    """
+    Runs at most one call (or stream) per key at a time, concurrent callers with the same key share it.
+    The shared work runs in its own task, so the caller that started it can disconnect without failing the others,
+    and every flight has a deadline of `timeout_seconds` after which all its callers get a TimeoutError.
+    """
+
+    def __init__(self, timeout_seconds: float | None = None):
+        self.timeout_seconds = timeout_seconds
+        self._calls: dict[str, asyncio.Task] = {}
+        self._streams: dict[str, SharedStream] = {}
+        self._pumps: set[asyncio.Task] = set() # the event loop only keeps weak references to tasks
+
+        self.flights: int = 0
+        self.coalesced: int = 0
+        self.errors: int = 0
+        self.timeouts: int = 0
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None: # also marks the exception as retrieved
+            self.errors += 1
+            if isinstance(task.exception(), TimeoutError):
+                self.timeouts += 1
+
+    async def do(self, key: str, call: Callable[[], Awaitable[R]]) -> R:
+        """Result of `call()`, run once for every caller with this key that arrives before it finishes."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(asyncio.wait_for(call(), self.timeout_seconds))
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self._calls[key] = task
+            self.flights += 1
+        else:
+            self.coalesced += 1
+        # Shielded, a caller that goes away doesn't cancel the work the others are waiting for
+        return await asyncio.shield(task)
+
+    async def _pump(self, key: str, shared: SharedStream, events: AsyncIterator[str]) -> None:
+        try:
+            async with asyncio.timeout(self.timeout_seconds):
+                async for event in events:
+                    shared.publish(event)
+            shared.finish()
+        except Exception as e:
+            self.errors += 1
+            if isinstance(e, TimeoutError):
+                self.timeouts += 1
+            shared.finish(e)
+        finally:
+            await events.aclose()
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+    async def stream(self, key: str, make_events: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Events of `make_events()`, generated once for every subscriber with this key that arrives before it ends."""
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = SharedStream()
+            pump = asyncio.get_running_loop().create_task(self._pump(key, shared, make_events()))
+            self._pumps.add(pump)
+            pump.add_done_callback(self._pumps.discard)
+            self.flights += 1
+        else:
+            self.coalesced += 1
+        async for event in shared.subscribe():
+            yield event
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
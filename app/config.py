@@ -0,0 +1,164 @@
+"""
+Runtime settings for the help assistant.
+All values can be overridden with environment variables (or the .env file).
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _get_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return value.lower() in ("1", "true", "yes") if value not in (None, "") else default
+
+
+def _get_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY")
+# Optional override, mostly used to point the app at the local stub server in app/benchmarks
+OPENAI_BASE_URL: str | None = os.getenv("OPENAI_BASE_URL") or None
+
+CHAT_MODEL: str = os.getenv("CHAT_MODEL", "gpt-4o")
+EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+# Answer length budget (max_tokens) when model routing is off, and for routing rules without their own
+MAX_TOKENS: int = _get_int("MAX_TOKENS", 250)
+
+# Model routing (app/routing.py): the model and max_tokens of each answer come from the first rule matching its retrieval
+# signals (top score, distinct sources, context tokens). Rules are a JSON file (empty = the built-in rules).
+# ROUTING_FORCE_ROUTE sends every answer through one named rule, used to compare routes in the eval.
+# Off until `python3 -m app.evaluation.eval --compare-routes` has been run against the real models and the results recorded
+MODEL_ROUTING: bool = _get_bool("MODEL_ROUTING", False)
+ROUTING_RULES_PATH: str | None = os.getenv("ROUTING_RULES_PATH") or None
+ROUTING_FORCE_ROUTE: str | None = os.getenv("ROUTING_FORCE_ROUTE") or None
+
+# Retriever backend: "chroma" (persistent HNSW collection), "numpy" (in-process exact search)
+# or "shared" (prebuilt read-only numpy index, memory-mapped so workers share it)
+RETRIEVER_BACKEND: str = os.getenv("RETRIEVER_BACKEND", "chroma").lower()
+CHROMA_PATH: str = os.getenv("CHROMA_PATH", "./chroma_data")
+NUMPY_INDEX_PATH: str = os.getenv("NUMPY_INDEX_PATH", "./numpy_index")
+# Read-only index for multi-worker deployments ("shared" backend), built once with python3 -m app.ingestion --build-shared-index
+SHARED_INDEX_PATH: str = os.getenv("SHARED_INDEX_PATH", "./shared_index")
+# numpy / shared backends: precision of the vectors searched first ("float32", "float16" or "int8"). Below float32,
+# the best top_k x RESCORE_FACTOR candidates are rescored with the float32 vectors (memory-mapped from disk)
+VECTOR_PRECISION: str = os.getenv("VECTOR_PRECISION", "float32").lower()
+RESCORE_FACTOR: int = _get_int("RESCORE_FACTOR", 4)
+# One sub-index per category next to the global one, category filtered queries search only their partition.
+# Off by default (it doubles the vectors stored), worth turning on for Chroma where filtered HNSW walks are slow
+CATEGORY_PARTITIONS: bool = _get_bool("CATEGORY_PARTITIONS", False)
+
+# Help content to ingest, a JSON array or JSONL file of {id, title, category, content} records
+HELP_CONTENT_PATH: str = os.getenv("HELP_CONTENT_PATH", os.path.join(os.path.dirname(__file__), "seed_data", "help_content.json"))
+
+# Chunks per embeddings API call during ingestion, and how many of those calls run at once
+EMBEDDING_BATCH_SIZE: int = _get_int("EMBEDDING_BATCH_SIZE", 256)
+INGEST_CONCURRENCY: int = _get_int("INGEST_CONCURRENCY", 4)
+INGEST_MAX_RETRIES: int = _get_int("INGEST_MAX_RETRIES", 6) # retries per batch on rate limits / server errors
+INGEST_BACKOFF_SECONDS: float = _get_float("INGEST_BACKOFF_SECONDS", 1.0) # first retry delay, doubled per attempt
+
+# Chunking, in characters. Content up to CHUNK_SIZE stays one chunk (and keeps its source id as chunk id)
+CHUNK_SIZE: int = _get_int("CHUNK_SIZE", 1500)
+CHUNK_OVERLAP: int = _get_int("CHUNK_OVERLAP", 200)
+
+# Max number of /help-assistant requests running the pipeline at once, extra requests wait for a slot
+MAX_CONCURRENT_REQUESTS: int = _get_int("MAX_CONCURRENT_REQUESTS", 200)
+
+# Connection pool for the shared AsyncOpenAI client
+HTTP_MAX_CONNECTIONS: int = _get_int("HTTP_MAX_CONNECTIONS", 200)
+HTTP_MAX_KEEPALIVE_CONNECTIONS: int = _get_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", 50)
+HTTP_KEEPALIVE_EXPIRY_SECONDS: float = _get_float("HTTP_KEEPALIVE_EXPIRY_SECONDS", 30.0)
+HTTP_TIMEOUT_SECONDS: float = _get_float("HTTP_TIMEOUT_SECONDS", 30.0)
+
+# Resilience around the OpenAI calls made while serving (app/resilience.py). Requests per minute allowed per call kind,
+# set to the account's quota (0 = no limit), with bursts of up to OPENAI_RATE_BURST_SECONDS worth of requests
+OPENAI_CHAT_RPM: float = _get_float("OPENAI_CHAT_RPM", 500)
+OPENAI_EMBEDDING_RPM: float = _get_float("OPENAI_EMBEDDING_RPM", 3000)
+OPENAI_RATE_BURST_SECONDS: float = _get_float("OPENAI_RATE_BURST_SECONDS", 2.0)
+# Calls sent at once, a call that can't get a slot (or a rate limit token) within the queue timeout is a 503 with Retry-After
+OPENAI_MAX_IN_FLIGHT: int = _get_int("OPENAI_MAX_IN_FLIGHT", 64)
+OPENAI_QUEUE_TIMEOUT_SECONDS: float = _get_float("OPENAI_QUEUE_TIMEOUT_SECONDS", 2.0)
+OPENAI_MAX_RETRIES: int = _get_int("OPENAI_MAX_RETRIES", 2) # retries on rate limits, timeouts, connection errors and 5xx
+OPENAI_BACKOFF_SECONDS: float = _get_float("OPENAI_BACKOFF_SECONDS", 0.25) # first retry delay, doubled per attempt, with jitter
+OPENAI_MAX_BACKOFF_SECONDS: float = _get_float("OPENAI_MAX_BACKOFF_SECONDS", 4.0) # also caps the API's Retry-After
+# Circuit breaker: after this many failed calls in a row, answer with the fallback without calling OpenAI (0 = off),
+# then let one call through every CIRCUIT_RESET_SECONDS to check whether it's back
+CIRCUIT_FAILURE_THRESHOLD: int = _get_int("CIRCUIT_FAILURE_THRESHOLD", 5)
+CIRCUIT_RESET_SECONDS: float = _get_float("CIRCUIT_RESET_SECONDS", 30.0)
+
+# Query embedding cache (normalised query text -> embedding)
+EMBEDDING_CACHE_SIZE: int = _get_int("EMBEDDING_CACHE_SIZE", 10000)
+EMBEDDING_CACHE_TTL_SECONDS: float = _get_float("EMBEDDING_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+# Set to a file path to keep the cache across restarts, empty = memory only
+EMBEDDING_CACHE_PATH: str | None = os.getenv("EMBEDDING_CACHE_PATH") or None
+
+# Semantic answer cache: reuse a full HelpResponse when a new query is this close (cosine) to a cached one
+ANSWER_CACHE_ENABLED: bool = _get_bool("ANSWER_CACHE_ENABLED", True)
+ANSWER_CACHE_SIZE: int = _get_int("ANSWER_CACHE_SIZE", 1000)
+ANSWER_CACHE_SIMILARITY: float = _get_float("ANSWER_CACHE_SIMILARITY", 0.95)
+
+# Precomputed answers for high-frequency questions (app/answer_store.py), built offline and checked before the answer cache.
+# Entries whose sources changed are rebuilt in the background on startup (ANSWER_STORE_REBUILD, costs one LLM call each)
+ANSWER_STORE: bool = _get_bool("ANSWER_STORE", True)
+ANSWER_STORE_PATH: str = os.getenv("ANSWER_STORE_PATH", "./answer_store.json")
+ANSWER_STORE_SIMILARITY: float = _get_float("ANSWER_STORE_SIMILARITY", 0.95)
+ANSWER_STORE_REBUILD: bool = _get_bool("ANSWER_STORE_REBUILD", True)
+
+# /help-assistant/batch limits
+BATCH_MAX_SIZE: int = _get_int("BATCH_MAX_SIZE", 500)
+BATCH_MAX_CONCURRENCY: int = _get_int("BATCH_MAX_CONCURRENCY", 16)
+
+# Hybrid retrieval: BM25 results fused with dense results using reciprocal rank fusion
+HYBRID_SEARCH: bool = _get_bool("HYBRID_SEARCH", False)
+HYBRID_CANDIDATES: int = _get_int("HYBRID_CANDIDATES", 20) # candidates per ranking before fusion
+RRF_K: int = _get_int("RRF_K", 60)
+# Answer exact-term matches from BM25 alone (no query embedding) when the top hit covers every query term
+# and scores at least LEXICAL_FAST_PATH_MARGIN times the runner up
+LEXICAL_FAST_PATH: bool = _get_bool("LEXICAL_FAST_PATH", False)
+LEXICAL_FAST_PATH_MARGIN: float = _get_float("LEXICAL_FAST_PATH_MARGIN", 1.5)
+
+# Cross-encoder reranker
+USE_RERANKER: bool = _get_bool("USE_RERANKER", False)
+RERANKER_MODEL: str = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES: int = _get_int("RERANK_CANDIDATES", 20) # candidates fetched from the vector store before reranking to top_k
+RERANK_CACHE_SIZE: int = _get_int("RERANK_CACHE_SIZE", 10000)
+RERANK_BUDGET_MS: float = _get_float("RERANK_BUDGET_MS", 150) # past this, vector order is returned
+
+# Cross-request micro-batching: concurrent query embeddings / rerank pairs are collected for up to
+# MICRO_BATCH_WINDOW_MS (or MICRO_BATCH_MAX_SIZE items) and sent as one call
+MICRO_BATCHING: bool = _get_bool("MICRO_BATCHING", True)
+MICRO_BATCH_WINDOW_MS: float = _get_float("MICRO_BATCH_WINDOW_MS", 5)
+MICRO_BATCH_MAX_SIZE: int = _get_int("MICRO_BATCH_MAX_SIZE", 64)
+
+# Load the help content in the background after startup, /health/ready reports 503 until it's done.
+# Off by default: the server only starts accepting requests once everything is loaded
+BACKGROUND_STARTUP: bool = _get_bool("BACKGROUND_STARTUP", False)
+
+# Context packing: chunks scoring below CONTEXT_MIN_RELATIVE_SCORE x the top chunk's score are dropped, overlapping chunks
+# are deduplicated and the rest is fitted to CONTEXT_TOKEN_BUDGET tokens (in rank order)
+CONTEXT_PACKING: bool = _get_bool("CONTEXT_PACKING", True)
+CONTEXT_TOKEN_BUDGET: int = _get_int("CONTEXT_TOKEN_BUDGET", 1500)
+CONTEXT_MIN_RELATIVE_SCORE: float = _get_float("CONTEXT_MIN_RELATIVE_SCORE", 0.5)
+
+# Guardrail gate (app/guardrails.py): abusive, injection, confidential and gibberish queries, and queries whose best
+# retrieved chunk scores under GUARDRAIL_MIN_SCORE (cosine), get the refusal / fallback answer without an LLM call
+GUARDRAILS: bool = _get_bool("GUARDRAILS", True)
+GUARDRAIL_MIN_SCORE: float = _get_float("GUARDRAIL_MIN_SCORE", 0.2) # for text-embedding-3-small, tune with app/benchmarks/retrieval_quality
+# Optional local text classifier (a Hugging Face model id, empty = off), flags queries whose top label is in
+# GUARDRAIL_CLASSIFIER_LABELS with at least GUARDRAIL_CLASSIFIER_THRESHOLD
+GUARDRAIL_CLASSIFIER_MODEL: str | None = os.getenv("GUARDRAIL_CLASSIFIER_MODEL") or None
+GUARDRAIL_CLASSIFIER_LABELS: set[str] = {label.strip().lower() for label in os.getenv("GUARDRAIL_CLASSIFIER_LABELS", "injection,toxic").split(",") if label.strip()}
+GUARDRAIL_CLASSIFIER_THRESHOLD: float = _get_float("GUARDRAIL_CLASSIFIER_THRESHOLD", 0.9)
+
+# Single-flight coalescing: identical questions (normalised query + category) arriving while one is being answered
+# wait for that answer (or stream) instead of running the pipeline again. Every shared run has this deadline
+SINGLE_FLIGHT: bool = _get_bool("SINGLE_FLIGHT", True)
+SINGLE_FLIGHT_TIMEOUT_SECONDS: float = _get_float("SINGLE_FLIGHT_TIMEOUT_SECONDS", 60.0)
@@ -0,0 +1,133 @@
+"""
+Context packing: decides which retrieved chunks go into the prompt.
+Chunks scoring far below the top chunk are cut, overlapping chunks of the same source are trimmed (or dropped when
+one contains the other), and what's left is added in rank order until the token budget is used up.
+Tokens are counted with tiktoken when it's installed, otherwise estimated from the character count.
+"""
+
+from functools import lru_cache
+from app import config
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# Shortest suffix/prefix match treated as chunk overlap (shorter matches are likely coincidence)
+MIN_OVERLAP_CHARS = 30
+
+# Used when tiktoken isn't available, roughly right for English text
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken encoding for the chat model, None when tiktoken (or its encoding files) can't be loaded."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(config.CHAT_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base") # unknown model name, use the current OpenAI encoding
+    except Exception as e:
+        print(f"⚠️ tiktoken unavailable ({type(e).__name__}), estimating tokens as characters / {CHARS_PER_TOKEN}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+def format_entry(entry: dict[str, object]) -> str:
+    """One context entry, labelled with its source id so the model can cite it."""
+    return f"[{entry['source_id']}]\n{entry['text']}"
+
+
+def format_context(entries: list[dict[str, object]]) -> str:
+    return CONTEXT_SEPARATOR.join(format_entry(entry) for entry in entries)
+
+
+def _overlap_length(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is also a prefix of `second` (0 below MIN_OVERLAP_CHARS)."""
+    if len(second) < MIN_OVERLAP_CHARS:
+        return 0
+    probe = second[:MIN_OVERLAP_CHARS]
+    start = first.find(probe, max(0, len(first) - len(second)))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return len(first) - start
+        start = first.find(probe, start + 1)
+    return 0
+
+
+def _split_title(text: str) -> tuple[str, str]:
+    """Chunk documents are "title\\n\\ncontent", every chunk of a source repeats the title."""
+    title, separator, body = text.partition("\n\n")
+    return (title + separator, body) if separator else ("", text)
+
+
+def _dedupe(entries: list[dict[str, object]]) -> list[dict[str, object]]:
+    """
+    Drop chunks already contained in a higher ranked chunk of the same source, and trim the part of a chunk
+    that overlaps one (chunking overlaps neighbouring chunks by CHUNK_OVERLAP characters).
+    """
+    kept: list[dict[str, object]] = []
+    for entry in entries:
+        title, body = _split_title(str(entry["text"]))
+        for previous in kept:
+            if previous["source_id"] != entry["source_id"]:
+                continue
+            _, previous_body = _split_title(str(previous["text"]))
+            if body in previous_body:
+                body = ""
+                break
+            body = body[_overlap_length(previous_body, body):] # previous chunk runs into this one
+            tail = _overlap_length(body, previous_body) # this chunk runs into the previous one
+            body = body[:len(body) - tail].strip()
+        if body:
+            kept.append({**entry, "text": title + body.strip()})
+    return kept
+
+
+def pack_context(entries: list[dict[str, object]], token_budget: int, min_relative_score: float) -> tuple[list[dict[str, object]], dict[str, int]]:
+    """
+    Entries (in rank order) that go into the prompt, and token/chunk counts before and after packing.
+    Entries with a score below min_relative_score x the best score are cut (entries without a score, e.g. BM25 only, are kept).
+    The top entry is always kept, truncated when it doesn't fit the budget by itself.
+    """
+    scores = [float(entry["score"]) for entry in entries if entry.get("score") is not None]
+    cutoff = max(scores) * min_relative_score if scores else 0.0
+    candidates = [
+        entry for rank, entry in enumerate(entries)
+        if rank == 0 or entry.get("score") is None or float(entry["score"]) >= cutoff
+    ]
+
+    packed: list[dict[str, object]] = []
+    used_tokens = 0
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+    for entry in _dedupe(candidates):
+        entry_tokens = count_tokens(format_entry(entry)) + (separator_tokens if packed else 0)
+        if used_tokens + entry_tokens > token_budget:
+            if not packed:
+                # Never send an empty context because the best chunk alone is over budget
+                label_tokens = count_tokens(format_entry({**entry, "text": ""}))
+                packed.append({**entry, "text": truncate_tokens(str(entry["text"]), max(token_budget - label_tokens, 1))})
+                used_tokens = count_tokens(format_entry(packed[0]))
+            continue # a later, shorter chunk may still fit
+        packed.append(entry)
+        used_tokens += entry_tokens
+
+    stats = {
+        "chunks_before": len(entries),
+        "chunks_after": len(packed),
+        "tokens_before": count_tokens(format_context(entries)),
+        "tokens_after": count_tokens(format_context(packed)),
+    }
+    return packed, stats
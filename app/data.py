@@ -1,5 +1,6 @@
 import json
 import os
+from functools import lru_cache
 
 SEED_DATA_DIR = os.path.join(os.path.dirname(__file__), "seed_data")
 
@@ -8,4 +9,14 @@ def load_json(filename):
         return json.load(f)
 
 
-help_content = load_json("help_content.json")
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_help_content():
+    """Help content records, parsed on first use instead of at import."""
+    return load_json("help_content.json")
+
+
+def __getattr__(name):
+    # Keeps `from app.data import help_content` working without parsing the file at import
+    if name == "help_content":
+        return get_help_content()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
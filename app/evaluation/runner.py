@@ -0,0 +1,152 @@
+"""
+Eval runner: runs questions through the pipeline with bounded concurrency and records each response.
+Responses are appended to a JSONL file keyed by question + config hash, one line per response, so an interrupted run
+resumes where it stopped and metrics can be recomputed from the recorded responses without calling the pipeline again.
+Nothing here imports RAGAS, scoring lives in app/evaluation/eval.py.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Awaitable, Callable
+from app import config
+from app.routing import routing_rules
+from app.timing import collect_timings
+
+# Runs one question through the pipeline, returns {"answer": ..., "sources": [...], "confidence": ...}
+AnswerFn = Callable[[str], Awaitable[dict]]
+
+PROMPT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompt.py")
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def pipeline_config() -> dict[str, object]:
+    """Settings that change what the pipeline answers, plus the prompt and help content they run on."""
+    return {
+        "chat_model": config.CHAT_MODEL,
+        "max_tokens": config.MAX_TOKENS,
+        "model_routing": config.MODEL_ROUTING,
+        "routing_rules": routing_rules() if config.MODEL_ROUTING else None,
+        "routing_force_route": config.ROUTING_FORCE_ROUTE if config.MODEL_ROUTING else None,
+        "embedding_model": config.EMBEDDING_MODEL,
+        "retriever_backend": config.RETRIEVER_BACKEND,
+        "vector_precision": config.VECTOR_PRECISION,
+        "rescore_factor": config.RESCORE_FACTOR,
+        "category_partitions": config.CATEGORY_PARTITIONS,
+        "chunk_size": config.CHUNK_SIZE,
+        "chunk_overlap": config.CHUNK_OVERLAP,
+        "hybrid_search": config.HYBRID_SEARCH,
+        "hybrid_candidates": config.HYBRID_CANDIDATES,
+        "rrf_k": config.RRF_K,
+        "lexical_fast_path": config.LEXICAL_FAST_PATH,
+        "lexical_fast_path_margin": config.LEXICAL_FAST_PATH_MARGIN,
+        "use_reranker": config.USE_RERANKER,
+        "reranker_model": config.RERANKER_MODEL,
+        "rerank_candidates": config.RERANK_CANDIDATES,
+        "rerank_budget_ms": config.RERANK_BUDGET_MS,
+        "answer_cache": config.ANSWER_CACHE_ENABLED,
+        "answer_cache_similarity": config.ANSWER_CACHE_SIMILARITY,
+        "answer_store": config.ANSWER_STORE,
+        "context_packing": config.CONTEXT_PACKING,
+        "context_token_budget": config.CONTEXT_TOKEN_BUDGET,
+        "context_min_relative_score": config.CONTEXT_MIN_RELATIVE_SCORE,
+        "guardrails": config.GUARDRAILS,
+        "guardrail_min_score": config.GUARDRAIL_MIN_SCORE,
+        "guardrail_classifier_model": config.GUARDRAIL_CLASSIFIER_MODEL,
+        "guardrail_classifier_labels": sorted(config.GUARDRAIL_CLASSIFIER_LABELS),
+        "guardrail_classifier_threshold": config.GUARDRAIL_CLASSIFIER_THRESHOLD,
+        "prompt": _file_hash(PROMPT_PATH),
+        "help_content": _file_hash(config.HELP_CONTENT_PATH),
+    }
+
+
+def config_hash(settings: dict[str, object] | None = None) -> str:
+    settings = pipeline_config() if settings is None else settings
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def response_key(question: str, config_id: str) -> str:
+    return hashlib.sha256(f"{config_id}\x1f{question}".encode("utf-8")).hexdigest()
+
+
+def load_recorded(path: str) -> dict[str, dict]:
+    """Recorded responses by key. A truncated last line (run killed mid-write) is skipped and re-run."""
+    recorded: dict[str, dict] = {}
+    if not os.path.exists(path):
+        return recorded
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            recorded[record["key"]] = record
+    return recorded
+
+
+def recorded_for(questions: list[str], recorded: dict[str, dict], config_id: str) -> tuple[list[dict], list[str]]:
+    """Recorded responses for the questions (in question order) under one config, and the questions still missing."""
+    found: list[dict] = []
+    missing: list[str] = []
+    for question in questions:
+        record = recorded.get(response_key(question, config_id))
+        if record is None:
+            missing.append(question)
+        else:
+            found.append(record)
+    return found, missing
+
+
+async def record_responses(questions: list[str], answer: AnswerFn, path: str, config_id: str, concurrency: int = 4) -> dict[str, int]:
+    """
+    Run every question without a recorded response for this config, at most `concurrency` at a time.
+    Each response is appended (and flushed) as soon as it arrives. Failed questions aren't recorded, so the next run retries them.
+    """
+    recorded = load_recorded(path)
+    _, pending = recorded_for(questions, recorded, config_id)
+    pending = list(dict.fromkeys(pending))
+    stats = {"questions": len(questions), "already_recorded": len(questions) - len(pending), "recorded": 0, "failed": 0}
+    if not pending:
+        return stats
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    slots = asyncio.Semaphore(concurrency)
+    with open(path, "a", encoding="utf-8") as f:
+
+        async def run_one(question: str) -> None:
+            async with slots:
+                start = time.perf_counter()
+                try:
+                    # Each task has its own context, so the stage timings don't mix between questions
+                    with collect_timings() as stages_ms:
+                        response = await answer(question)
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"❌ {question!r} failed: {e}")
+                    return
+                latency_ms = (time.perf_counter() - start) * 1000
+
+            record = {
+                "key": response_key(question, config_id),
+                "config_hash": config_id,
+                "question": question,
+                **response,
+                "latency_ms": round(latency_ms, 1),
+                "stages_ms": {name: round(duration, 1) for name, duration in stages_ms.items()},
+            }
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            stats["recorded"] += 1
+            print(f"✅ {stats['already_recorded'] + stats['recorded']}/{len(questions)} {latency_ms:.0f}ms {question!r}")
+
+        await asyncio.gather(*(run_one(question) for question in pending))
+    return stats
@@ -0,0 +1,116 @@
+"""
+Local guardrail gate, run before the LLM so queries that can only get a canned answer don't cost a chat completion.
+- check_query (before retrieval): prompt injection, abuse and confidential data requests (regex / word lists),
+  gibberish, and optionally a small local text classifier (GUARDRAIL_CLASSIFIER_MODEL)
+- check_results (after retrieval): the best similarity score is below GUARDRAIL_MIN_SCORE, nothing relevant was found
+Each check returns a reason (None lets the query through), answer_for maps it to the refusal or the fallback answer.
+"""
+
+import re
+from functools import lru_cache
+from app import config
+from app.lexical import STOPWORDS
+from app.prompt import FALLBACK_ANSWER, REFUSAL_ANSWER
+
+# Reasons answered with the refusal, every other reason gets the "not enough information" fallback
+REFUSAL_REASONS = {"injection", "abuse", "confidential", "classifier"}
+
+# Anchored to phrasing that targets the assistant's own instructions, so "forget the rules about baggage"
+# or "pretend to be more concise" get through
+INJECTION_PATTERN = re.compile(
+    r"\b(ignore|disregard|forget|override|bypass)\s+((all|any|the|of)\s+)*"
+    r"((previous|prior|above|earlier|preceding|original|your|system)\s+(instructions?|rules?|requirements?|commands?|prompts?|guidelines?|context)"
+    r"|(instructions?|prompts?|guidelines?))\b"
+    r"|\b(your|the)\s+(system|hidden|initial)\s+(prompt|instructions?)\b|\b(system|hidden)\s+prompt\b"
+    r"|\b(reveal|show|print|repeat|output)\b.{0,20}\b(system|hidden|initial)\s+message\b"
+    r"|\b(you are now|pretend to be|pretend you are|roleplay as)\s+(a|an|the|my|dan|someone|somebody)\b"
+    r"|\b(jailbreak|developer mode|dan mode)\b"
+)
+
+ABUSE_PATTERN = re.compile(
+    r"\b(f+u+c+k\w*|shit|shite|shitty|bullshit|cunts?|bitch\w*|bastards?|assholes?|arseholes?|dickheads?|wankers?|twats?|motherf\w*)\b"
+)
+
+# Only the assistant's own secrets: a customer's password, card or booking is a normal help question
+CONFIDENTIAL_PATTERN = re.compile(
+    r"\b(api[\s_-]?keys?|secret[\s_-]?keys?|access[\s_-]?tokens?)\b"
+    r"|\b(admin|system|database|server)\s+(passwords?|credentials)\b"
+    r"|\byour\s+(credentials|secrets)\b"
+)
+
+# Word tokens in any script (\w is Unicode), plus the £ and + the help content uses in prices and phone numbers
+WORD_PATTERN = re.compile(r"[\w£+]+")
+
+VOWELS = set("aeiouy")
+
+
+def _looks_random(token: str) -> bool:
+    """Token that isn't a word, number, price or unit: long letter/digit mixes and long consonant runs (Latin script only)."""
+    if len(token) < 6 or not token.isascii() or token.isdigit() or token[0] in "£+":
+        return False
+    letters = sum(char.isalpha() for char in token)
+    digits = sum(char.isdigit() for char in token)
+    if len(token) >= 8 and letters and digits and not re.fullmatch(r"\d+[a-z]{1,3}", token): # 23kg, 50lbs, covid19 are fine
+        return True
+    consonant_run = 0
+    for char in token:
+        consonant_run = consonant_run + 1 if char.isalpha() and char not in VOWELS else 0
+        if consonant_run >= 6:
+            return True
+    return False
+
+
+def looks_like_gibberish(query: str) -> bool:
+    """
+    More than half of the (non stopword) tokens with letters look random. Queries without letters (a phone number,
+    a booking reference) and words in non-Latin scripts are never gibberish, retrieval decides whether they're answerable.
+    """
+    words = [token for token in WORD_PATTERN.findall(query.lower()) if token not in STOPWORDS and any(char.isalpha() for char in token)]
+    return bool(words) and sum(_looks_random(token) for token in words) * 2 > len(words)
+
+
+@lru_cache(maxsize=1)
+def _classifier():
+    """Local text classification pipeline (transformers is only imported when a classifier is configured)."""
+    from transformers import pipeline
+    return pipeline("text-classification", model=config.GUARDRAIL_CLASSIFIER_MODEL)
+
+
+def warm_classifier() -> None:
+    if config.GUARDRAIL_CLASSIFIER_MODEL:
+        _classifier()
+
+
+def classifier_flags(query: str) -> bool:
+    """True when the classifier's top label is one of GUARDRAIL_CLASSIFIER_LABELS with at least GUARDRAIL_CLASSIFIER_THRESHOLD."""
+    prediction = _classifier()(query, truncation=True)[0]
+    return prediction["label"].lower() in config.GUARDRAIL_CLASSIFIER_LABELS and prediction["score"] >= config.GUARDRAIL_CLASSIFIER_THRESHOLD
+
+
+def check_query(query: str) -> str | None:
+    """Reason to answer the query without retrieval or the LLM, None to let it through. The classifier call is blocking."""
+    text = query.lower()
+    if INJECTION_PATTERN.search(text):
+        return "injection"
+    if ABUSE_PATTERN.search(text):
+        return "abuse"
+    if CONFIDENTIAL_PATTERN.search(text):
+        return "confidential"
+    if looks_like_gibberish(query):
+        return "gibberish"
+    if config.GUARDRAIL_CLASSIFIER_MODEL and classifier_flags(query):
+        return "classifier"
+    return None
+
+
+def check_results(search_results: list[dict[str, object]]) -> str | None:
+    """Reason "low_score" when the best similarity score is under GUARDRAIL_MIN_SCORE.
+    Only cosine scores count: results without a score (BM25 only) and lexical fast path results (normalised BM25) are skipped."""
+    scores = [float(entry["score"]) for entry in search_results if entry.get("score") is not None and not entry.get("lexical")]
+    if scores and max(scores) < config.GUARDRAIL_MIN_SCORE:
+        return "low_score"
+    return None
+
+
+def answer_for(reason: str) -> str:
+    return REFUSAL_ANSWER if reason in REFUSAL_REASONS else FALLBACK_ANSWER
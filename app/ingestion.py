@@ -0,0 +1,237 @@
+"""
+Streaming ingestion of help content.
+Records are read one at a time from a JSON array or JSONL file, split into overlapping chunks and embedded
+in bounded batches with several embeddings calls in flight. Only a few batches are held in memory at once,
+so memory doesn't grow with the size of the content (only with the number of chunk ids).
+Run from repo root: python3 -m app.ingestion [path] --concurrency 4
+Build the read-only index shared by multi-worker deployments: RETRIEVER_BACKEND=numpy python3 -m app.ingestion --build-shared-index
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+from typing import Iterable, Iterator
+import openai
+from app import config
+from app.resilience import RETRYABLE_ERRORS, retry_after_seconds
+
+# A chunk is (chunk id, document text, metadata)
+Chunk = tuple[str, str, dict[str, object]]
+
+
+def content_hash(document: str, title: str, category: str) -> str:
+    """Hash of everything that ends up in the index for a chunk, plus the embedding model (a new model needs re-embedding)."""
+    payload = "\x1f".join([config.EMBEDDING_MODEL, category, title, document])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def iter_records(path: str, read_size: int = 1 << 16) -> Iterator[dict]:
+    """
+    Yield records from a JSONL file (one object per line) or a JSON array file.
+    Arrays are decoded one element at a time from a rolling buffer instead of json.load-ing the whole file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer, pos, eof, in_array = "", 0, False, False
+        while True:
+            # Skip whitespace and separators between elements
+            while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ",")):
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError(f"{path}: unexpected end of file, expected ']'")
+                buffer, pos = buffer[pos:] + f.read(read_size), 0
+                eof = pos == len(buffer)
+                continue
+
+            if not in_array:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON array or a .jsonl file")
+                in_array = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element continues past the buffer, read more and try again
+                if eof:
+                    raise
+                more = f.read(read_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield record
+
+
+def chunk_spans(text: str, chunk_size: int, overlap: int) -> list[tuple[int, int]]:
+    """
+    Split text into (start, end) character spans of at most chunk_size, each overlapping the previous one by about `overlap`.
+    Spans end and start on word boundaries where possible.
+    """
+    if len(text) <= chunk_size:
+        return [(0, len(text))]
+
+    spans: list[tuple[int, int]] = []
+    start = 0
+    while True:
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            boundary = text.rfind(" ", start + chunk_size // 2, end)
+            if boundary != -1:
+                end = boundary
+        spans.append((start, end))
+        if end == len(text):
+            return spans
+
+        next_start = max(end - overlap, start + 1)
+        if text[next_start - 1] != " ":
+            # Mid word, move forward to the start of the next word
+            space = text.find(" ", next_start, end)
+            if space != -1:
+                next_start = space + 1
+        start = next_start
+
+
+def chunk_record(record: dict, chunk_size: int, overlap: int) -> list[Chunk]:
+    """
+    Split one help content record into chunks. The metadata source_id is the parent record's id (that's what answers cite),
+    chunk_start/chunk_end are offsets into the record content.
+    Content that fits in one chunk keeps the record id as its chunk id.
+    """
+    source_id = str(record["id"]).strip()
+    title = str(record["title"]).strip()
+    category = str(record["category"]).strip().lower() # Keeping all category values lowercase
+    content = str(record["content"]).strip()
+
+    spans = chunk_spans(content, chunk_size, overlap)
+    chunks: list[Chunk] = []
+    for chunk_index, (start, end) in enumerate(spans):
+        chunk_id = source_id if len(spans) == 1 else f"{source_id}#{chunk_index}"
+        document = f"{title}\n\n{content[start:end].strip()}" # Text/documents will be title + content
+        chunks.append((chunk_id, document, {
+            "source_id": source_id,
+            "title": title,
+            "category": category,
+            "content_hash": content_hash(document, title, category),
+            "chunk_index": chunk_index,
+            "chunk_start": start,
+            "chunk_end": end,
+        }))
+    return chunks
+
+
+def embed_with_retries(client: openai.OpenAI, texts: list[str], max_retries: int, backoff_seconds: float) -> tuple[list[list[float]], int]:
+    """
+    One embeddings call for a batch, retried with exponential backoff (plus jitter) on rate limits and transient errors.
+    Returns the embeddings in input order and the number of tokens used.
+    """
+    attempt = 0
+    while True:
+        try:
+            response = client.embeddings.create(model=config.EMBEDDING_MODEL, input=texts)
+            embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            return embeddings, response.usage.prompt_tokens if response.usage else 0
+        except RETRYABLE_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            delay = retry_after_seconds(e) or backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.0)
+            attempt += 1
+            print(f"⏳ Embeddings call failed ({type(e).__name__}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+class IngestProgress:
+    """Running totals for an ingestion run, printed every `every_seconds` when enabled."""
+
+    def __init__(self, enabled: bool = False, every_seconds: float = 2.0):
+        self.enabled = enabled
+        self.every_seconds = every_seconds
+        self.started = time.perf_counter()
+        self._last_printed = self.started
+        self.docs: int = 0
+        self.chunks: int = 0
+        self.embedded: int = 0
+        self.tokens: int = 0
+
+    def stats(self) -> dict[str, float]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "docs": self.docs,
+            "chunks": self.chunks,
+            "embedded_chunks": self.embedded,
+            "tokens": self.tokens,
+            "seconds": round(elapsed, 2),
+            "docs_per_s": round(self.docs / elapsed, 1),
+            "tokens_per_s": round(self.tokens / elapsed, 1),
+        }
+
+    def maybe_print(self) -> None:
+        now = time.perf_counter()
+        if self.enabled and now - self._last_printed >= self.every_seconds:
+            self._last_printed = now
+            print(self.summary())
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (
+            f"📥 {stats['docs']} docs, {stats['chunks']} chunks ({stats['embedded_chunks']} embedded) in {stats['seconds']}s - "
+            f"{stats['docs_per_s']} docs/s, {stats['tokens_per_s']} tokens/s"
+        )
+
+
+def iter_chunks(records: Iterable[dict], progress: IngestProgress, chunk_size: int, overlap: int) -> Iterator[Chunk]:
+    """Chunks of every record, counting docs and chunks as they stream past."""
+    for record in records:
+        progress.docs += 1
+        for chunk in chunk_record(record, chunk_size, overlap):
+            progress.chunks += 1
+            yield chunk
+        progress.maybe_print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest help content into the vector store")
+    parser.add_argument("path", nargs="?", default=config.HELP_CONTENT_PATH, help="JSON array or JSONL file")
+    parser.add_argument("--batch-size", type=int, default=config.EMBEDDING_BATCH_SIZE, help="chunks per embeddings call")
+    parser.add_argument("--concurrency", type=int, default=config.INGEST_CONCURRENCY, help="embeddings calls in flight")
+    parser.add_argument("--keep-missing", action="store_true", help="don't delete indexed documents missing from this file")
+    parser.add_argument(
+        "--build-shared-index", metavar="PATH", nargs="?", const=config.SHARED_INDEX_PATH, default=None,
+        help="after ingesting, write the index as a read-only build for RETRIEVER_BACKEND=shared workers (default PATH: SHARED_INDEX_PATH)"
+    )
+    args = parser.parse_args()
+    if config.RETRIEVER_BACKEND == "shared":
+        parser.error("RETRIEVER_BACKEND=shared is read-only, ingest with the chroma or numpy backend (and --build-shared-index)")
+
+    from app.retrievers import write_shared_index
+    from app.vector_store import VectorStoreService
+
+    vs = VectorStoreService()
+    # The BM25 index lives in the serving process and is rebuilt there, skipping it keeps memory flat here
+    vs.ingest_records(
+        iter_records(args.path),
+        delete_missing=not args.keep_missing,
+        index_lexical=False,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        show_progress=True,
+    )
+    print(json.dumps(vs.ingest_stats))
+    if args.build_shared_index:
+        build_path = write_shared_index(args.build_shared_index, vs.backend, config.EMBEDDING_MODEL)
+        print(f"📦 Shared index written to {build_path} ({vs.count()} chunks)")
+
+
+if __name__ == "__main__":
+    main()
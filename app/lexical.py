@@ -0,0 +1,150 @@
+"""
+In-memory BM25 inverted index for exact-term lookups ("+44 number", "exit row", "23kg"),
+plus reciprocal rank fusion to combine lexical and dense rankings.
+"""
+
+import math
+import re
+from collections import Counter
+
+# Keeps phone prefixes (+44), prices (£65) and units (23kg) as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9£+]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "if", "in",
+    "is", "it", "me", "my", "of", "on", "or", "the", "to", "what", "when", "where", "which", "who", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    BM25 (Okapi) index with postings lists and precomputed IDF.
+    Documents can be upserted/deleted individually, only their postings change. IDF is recomputed on the
+    next query after a write, so a run of small writes (e.g. ingestion batches) pays for it once.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, int]] = {} # term -> {doc_id: term frequency}
+        self._doc_lengths: dict[str, int] = {}
+        self._doc_terms: dict[str, Counter] = {}
+        self._documents: dict[str, str] = {}
+        self._metadatas: dict[str, dict[str, str]] = {}
+        self._idf: dict[str, float] = {}
+        self._idf_stale: bool = False
+        self._total_length: int = 0
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def _remove(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        self._documents.pop(doc_id, None)
+        self._metadatas.pop(doc_id, None)
+
+    def _current_idf(self) -> dict[str, float]:
+        if self._idf_stale:
+            self._recompute_idf()
+            self._idf_stale = False
+        return self._idf
+
+    def _recompute_idf(self) -> None:
+        num_docs = len(self._doc_lengths)
+        self._idf = {
+            term: math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict[str, str]]) -> None:
+        """Add or replace documents."""
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            self._remove(doc_id)
+            terms = Counter(tokenize(document))
+            self._doc_terms[doc_id] = terms
+            self._doc_lengths[doc_id] = sum(terms.values())
+            self._total_length += self._doc_lengths[doc_id]
+            self._documents[doc_id] = document
+            self._metadatas[doc_id] = metadata
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+        self._idf_stale = True
+
+    def delete(self, ids: list[str]) -> None:
+        for doc_id in ids:
+            self._remove(doc_id)
+        self._idf_stale = True
+
+    def max_score(self, query: str) -> float:
+        """Upper bound of any document's BM25 score for the query (every indexed term at saturated frequency), to scale scores to 0-1."""
+        idf = self._current_idf()
+        return sum(idf.get(term, 0.0) for term in set(tokenize(query))) * (self.k1 + 1)
+
+    def search(self, query: str, top_k: int, category: str | None = None) -> list[dict[str, object]]:
+        """
+        Return up to top_k {text, source_id, score, bm25, coverage} dicts ordered by BM25 score.
+        coverage is the fraction of query terms found in the document, score is None (no cosine similarity).
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or not self._doc_lengths:
+            return []
+
+        term_idf = self._current_idf()
+        average_length = self._total_length / len(self._doc_lengths)
+        scores: dict[str, float] = {}
+        matched_terms: Counter = Counter()
+        for term in query_terms:
+            idf = term_idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, frequency in self._postings[term].items():
+                if category is not None and self._metadatas[doc_id].get("category") != category:
+                    continue
+                length_norm = 1 - self.b + self.b * self._doc_lengths[doc_id] / average_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                matched_terms[doc_id] += 1
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [
+            {
+                "text": self._documents[doc_id],
+                "source_id": self._metadatas[doc_id]["source_id"],
+                "score": None,
+                "bm25": bm25_score,
+                "coverage": matched_terms[doc_id] / len(query_terms),
+            }
+            for doc_id, bm25_score in ranked
+        ]
+
+
+def reciprocal_rank_fusion(rankings: list[list[dict[str, object]]], top_k: int, k: int = 60) -> list[dict[str, object]]:
+    """
+    Fuse several ranked result lists: each result scores sum(1 / (k + rank)) over the lists it appears in.
+    Results are matched on their text (one chunk = one text), the first list's entry wins so dense cosine scores are kept.
+    """
+    fused_scores: dict[str, float] = {}
+    entries: dict[str, dict[str, object]] = {}
+    for ranking in rankings:
+        for rank, entry in enumerate(ranking, start=1):
+            key = str(entry["text"])
+            fused_scores[key] = fused_scores.get(key, 0.0) + 1.0 / (k + rank)
+            entries.setdefault(key, {"text": entry["text"], "source_id": entry["source_id"], "score": entry["score"]})
+
+    ordered = sorted(fused_scores, key=lambda key: fused_scores[key], reverse=True)[:top_k]
+    return [entries[key] for key in ordered]
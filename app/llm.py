@@ -0,0 +1,47 @@
+"""
+Shared OpenAI client setup.
+One AsyncOpenAI client (and its HTTP connection pool) is created per process and reused by every request.
+"""
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from app import config
+
+
+def create_async_client() -> AsyncOpenAI:
+    """
+    Create an AsyncOpenAI client backed by a tuned httpx connection pool.
+    The SDK doesn't retry, calls are retried (and rate limited) by the Upstream guard in app/resilience.py.
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT_SECONDS),
+    )
+    return AsyncOpenAI(
+        api_key=config.OPENAI_API_KEY,
+        base_url=config.OPENAI_BASE_URL,
+        http_client=http_client,
+        max_retries=0,
+    )
+
+
+def create_client(max_retries: int = 2) -> OpenAI:
+    """Create a blocking OpenAI client (ingestion, scripts). Thread safe, so one client can be shared by a thread pool."""
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT_SECONDS),
+    )
+    return OpenAI(
+        api_key=config.OPENAI_API_KEY,
+        base_url=config.OPENAI_BASE_URL,
+        http_client=http_client,
+        max_retries=max_retries,
+    )
@@ -1,27 +1,290 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from app.schemas import TravelQuery, HelpResponse
-from app.prompt import generate_prompt
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from app.schemas import TravelQuery, HelpResponse, BatchTravelQuery, BatchHelpItem, BatchHelpResponse
+from app.prompt import FALLBACK_ANSWER, SYSTEM_PROMPT, generate_prompt
+from openai import AsyncOpenAI
+from app import config
+from app.llm import create_async_client
+from app.answer_store import AnswerStore, build_entries, rebuild_lock, source_hashes
+from app.cache import normalize_query
+from app.coalescing import SingleFlight
+from app.context import count_tokens, format_context, pack_context
+from app.guardrails import answer_for, check_query, check_results, warm_classifier
+from app.metrics import CONTEXT_TOKENS, ERRORS, FALLBACKS, GUARDRAIL_BLOCKS, LLM_TOKENS, MODEL_ROUTES, REGISTRY, ROUTE_SECONDS, TRUNCATED_ANSWERS
+from app.resilience import CircuitOpenError, Overloaded, create_upstream
+from app.routing import route_for, routing_rules
+from app.timing import StageTimingMiddleware, stage
 from app.vector_store import VectorStoreService
 import logging
 
-# Load environment variables from .env file
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Vector store, loaded by the lifespan (or on first use when the lifespan isn't run, e.g. direct calls from eval)
+vs: VectorStoreService | None = None
+
+# Readiness, separate from liveness: the process can be up while the help content is still being loaded
+# status is "not_started" (no lifespan), "starting", "ready" or "failed"
+readiness: dict[str, object] = {"status": "not_started", "error": None, "startup_seconds": None}
+
+# Precomputed answers, loaded by the lifespan (None when ANSWER_STORE is off), and the background rebuild of stale ones
+answer_store: AnswerStore | None = None
+answer_store_rebuild: asyncio.Task | None = None
+
+# Shared OpenAI client, created in the lifespan (or on first use when the lifespan isn't run, e.g. direct calls from eval)
+client: AsyncOpenAI | None = None
+
+# Bounds how many requests run the pipeline at once, instead of the threadpool size
+request_slots = asyncio.Semaphore(config.MAX_CONCURRENT_REQUESTS)
+
+# Rate limits, in-flight limit, retries and circuit breaker shared by every chat and embeddings call (app/resilience.py)
+upstream = create_upstream()
+
+# Identical questions in flight at the same time share one pipeline run, separately for answers and streams
+answer_flights: SingleFlight[HelpResponse] = SingleFlight(timeout_seconds=config.SINGLE_FLIGHT_TIMEOUT_SECONDS)
+stream_flights: SingleFlight[str] = SingleFlight(timeout_seconds=config.SINGLE_FLIGHT_TIMEOUT_SECONDS)
+
+
+def get_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it if needed."""
+    global client
+    if client is None:
+        client = create_async_client()
+        if vs is not None:
+            vs.async_client = client
+    return client
+
+
+def load_vector_store() -> VectorStoreService:
+    """Open the vector store and ingest the help content (blocking, embeds any new or changed documents)."""
+    store = VectorStoreService()
+    store.upstream = upstream
+    store.load_help_content()
+    if store.use_reranker:
+        # Load the cross-encoder before serving, instead of inside the first request
+        store.warm_reranker()
+    return store
+
+
+def load_answer_store() -> tuple[AnswerStore, list[dict]]:
+    """Open the answer store and find the entries whose sources changed since they were built (blocking)."""
+    answers = AnswerStore(config.ANSWER_STORE_PATH, config.ANSWER_STORE_SIMILARITY)
+    loaded = answers.load()
+    stale = answers.refresh(source_hashes(config.HELP_CONTENT_PATH), config.EMBEDDING_MODEL)
+    if loaded:
+        print(f"📦 Answer store: {loaded - len(stale)} answers, {len(stale)} stale")
+    return answers, stale
+
+
+async def rebuild_stale_answers() -> None:
+    """
+    Re-run the pipeline for stale stored answers, in the background after startup.
+    Workers take turns (rebuild_lock): one that waited reloads what the previous one saved and only rebuilds what is still stale.
+    """
+    global answer_store
+    async with rebuild_lock(config.ANSWER_STORE_PATH):
+        answers, stale = await asyncio.to_thread(load_answer_store)
+        answers.hits, answers.misses = answer_store.hits, answer_store.misses
+        answer_store = answers
+        if not stale:
+            return
+        stats = await build_entries(answer_store, [{"question": entry["question"], "category": entry["category"]} for entry in stale], concurrency=2)
+    print(f"📦 Answer store rebuilt: {stats['stored']} updated, {stats['skipped']} removed, {stats['failed']} failed")
+
+
+def get_vector_store() -> VectorStoreService:
+    """
+    Return the loaded vector store.
+    Raises a 503 while the lifespan is still loading it (or failed to), without a lifespan it is loaded on first use.
+    """
+    global vs
+    if vs is None:
+        if readiness["status"] != "not_started":
+            raise HTTPException(status_code=503, detail=f"Service is not ready ({readiness['status']})", headers={"Retry-After": "5"})
+        vs = load_vector_store()
+        vs.async_client = client
+        readiness["status"] = "ready"
+    return vs
+
+
+async def initialise(raise_on_error: bool = True) -> None:
+    """Load the vector store off the event loop and record readiness."""
+    global vs, answer_store, answer_store_rebuild
+    readiness.update(status="starting", error=None)
+    started = time.perf_counter()
+    stale_answers: list[dict] = []
+    try:
+        store = await asyncio.to_thread(load_vector_store)
+        if config.ANSWER_STORE:
+            answer_store, stale_answers = await asyncio.to_thread(load_answer_store)
+        if config.CONTEXT_PACKING:
+            await asyncio.to_thread(count_tokens, "") # loads the tokenizer before serving
+        if config.GUARDRAILS:
+            await asyncio.to_thread(warm_classifier)
+        if config.MODEL_ROUTING:
+            routing_rules() # bad rules fail startup instead of every request
+    except Exception as e:
+        logger.exception(f"Startup failed: {e}")
+        readiness.update(status="failed", error=str(e))
+        if raise_on_error:
+            raise
+        return
+    store.async_client = client # Query embeddings share the same connection pool
+    vs = store
+    readiness.update(status="ready", startup_seconds=round(time.perf_counter() - started, 2))
+    print(f"✅ Ready in {readiness['startup_seconds']}s")
+    # Stale answers are already out of the lookup, rebuilding them doesn't hold up startup.
+    # A read-only index is deployed by a builder, which rebuilds the store too (python3 -m app.answer_store)
+    if stale_answers and config.ANSWER_STORE_REBUILD and not store.backend.read_only:
+        answer_store_rebuild = asyncio.create_task(rebuild_stale_answers())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the pooled OpenAI client and load the vector store on startup, close connections on shutdown.
+    With BACKGROUND_STARTUP the server starts answering /health straight away and reports ready once loading finishes.
+    """
+    global client
+    client = create_async_client()
+    startup_task: asyncio.Task | None = None
+    if config.BACKGROUND_STARTUP:
+        # A failure is logged and reported by /health/ready, the process stays up
+        startup_task = asyncio.create_task(initialise(raise_on_error=False))
+    else:
+        await initialise()
+    yield
+    if startup_task is not None and not startup_task.done():
+        startup_task.cancel()
+    if answer_store_rebuild is not None and not answer_store_rebuild.done():
+        answer_store_rebuild.cancel()
+    if vs is not None:
+        vs.save_embedding_cache()
+        vs.async_client = None
+    await client.close()
+    client = None
+
+
+app = FastAPI(lifespan=lifespan)
+# Per stage timings of every request in a Server-Timing header (used by app/benchmarks/suite.py)
+app.add_middleware(StageTimingMiddleware)
 
-vs = VectorStoreService()
-vs.load_help_content()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def validate_category(category: str | None) -> str | None:
+    """Normalise the optional category and reject values that don't exist in the help content."""
+    allowed_categories = get_vector_store().get_category_list()
+    category_lower: str | None = None
+    if category is not None:
+        category_lower = category.strip().lower()
+        if category_lower not in allowed_categories:
+            raise HTTPException(status_code=422, detail=f"Invalid category value. \nAllowed categories: {', '.join(allowed_categories)}") # Display allowed categories as comma seperated string
+    return category_lower
+
+
+def build_messages(user_query: str, search_results: list[dict[str, object]]) -> list[dict[str, str]]:
+    """Build the chat messages from the retrieved chunks, static instructions first so every request shares the same prefix."""
+    prompt = generate_prompt(user_query, format_context(search_results))
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def pack_results(search_results: list[dict[str, object]]) -> list[dict[str, object]]:
+    """Search results that go into the prompt (and the sources), see app/context.py."""
+    if not config.CONTEXT_PACKING or not search_results:
+        return search_results
+    packed, stats = pack_context(search_results, config.CONTEXT_TOKEN_BUDGET, config.CONTEXT_MIN_RELATIVE_SCORE)
+    CONTEXT_TOKENS.observe(stats["tokens_before"], packing="before")
+    CONTEXT_TOKENS.observe(stats["tokens_after"], packing="after")
+    print(f"📦 Context packed: {stats['chunks_before']} -> {stats['chunks_after']} chunks, {stats['tokens_before']} -> {stats['tokens_after']} tokens")
+    return packed
+
+
+def sources_and_confidence(search_results: list[dict[str, object]]) -> tuple[list[str], float | None]:
+    """Unique source ids (in rank order) and the confidence score for a set of search results."""
+    sources: list[str] = list(dict.fromkeys(entry["source_id"] for entry in search_results)) # Adding only unique source ids while maintaining order
+
+    # Take cosine similarity of top chunk as the score
+    raw_score: float | None = search_results[0].get("score") if search_results else None
+    score: float | None = (raw_score * 100) if raw_score is not None else None
+
+    # Tried - Weighted average for confidence scores (reciprocal)
+    # weighted_sum: float = 0.0
+    # weight_sum: float = 0.0
+    # score: Optional[float] = None
+    # for i, entry in enumerate(search_results):
+    #     weight = 1.0 / (i+1) # Rank 1 will have weight 1, rank 2 = 0.5, rank 3 = 0.33 and so on
+    #     weight_sum += weight # sum of weights
+    #     weighted_sum += weight * entry["score"] # sum of weighted scores
+
+    # if weight_sum>0:
+    #     score = weighted_sum/weight_sum
+    # else:
+    #     score = None # Omit score if no score is retrieved
+
+    return sources, score
+
+
+async def screen_query(query: str) -> str | None:
+    """Guardrail reason for the query alone (see app/guardrails.py), None when the gate is off or lets it through."""
+    if not config.GUARDRAILS:
+        return None
+    if config.GUARDRAIL_CLASSIFIER_MODEL:
+        return await asyncio.to_thread(check_query, query) # the classifier is CPU bound
+    return check_query(query)
+
+
+def gated_response(reason: str) -> HelpResponse:
+    """Canned answer for a query stopped by the guardrail gate, returned without an LLM call."""
+    GUARDRAIL_BLOCKS.inc(reason=reason)
+    print(f"🛡️ Guardrail ({reason}): answered without an LLM call")
+    return HelpResponse(answer=answer_for(reason), sources=[], confidence=None)
+
+
+def stored_response(entry: dict) -> HelpResponse:
+    print("⚡ Answer store hit")
+    return HelpResponse(answer=entry["answer"], sources=list(entry["sources"]), confidence=entry["confidence"])
+
+
+def lookup_stored_answer(query: str, category: str | None) -> HelpResponse | None:
+    """Precomputed answer for exactly this question (after normalize_query), found before the query is embedded."""
+    if answer_store is None:
+        return None
+    entry = answer_store.get_exact(query, category)
+    return stored_response(entry) if entry is not None else None
+
+
+def lookup_cached_answer(query_embedding: list[float], category: str | None) -> HelpResponse | None:
+    """Return a precomputed answer (answer store) or a copy of a cached answer for a semantically equivalent query."""
+    if answer_store is not None:
+        entry = answer_store.get(query_embedding, category)
+        if entry is not None:
+            return stored_response(entry)
+    vs = get_vector_store()
+    if vs.answer_cache is None:
+        return None
+    cached = vs.answer_cache.get(query_embedding, category)
+    if cached is None:
+        return None
+    print("⚡ Answer cache hit")
+    return cached.model_copy(deep=True)
+
+
+def store_cached_answer(query_embedding: list[float] | None, category: str | None, response: HelpResponse) -> None:
+    """Add a generated answer to the answer cache, tagged with its source ids for invalidation."""
+    # Lexical fast path answers have no query embedding to key on
+    vs = get_vector_store()
+    if vs.answer_cache is not None and query_embedding is not None:
+        vs.answer_cache.put(query_embedding, category, response.model_copy(deep=True), response.sources)
+
 
 @app.post("/help-assistant", response_model=HelpResponse)
-def help_assistant(query: TravelQuery) -> HelpResponse:
+async def help_assistant(query: TravelQuery) -> HelpResponse:
     """
     RAG-based help assistant endpoint.
     Candidates should implement:
@@ -29,77 +292,436 @@ def help_assistant(query: TravelQuery) -> HelpResponse:
     2) Prompting the model with retrieved context
     3) Returning grounded answers with sources & confidence
     """
+    if not config.SINGLE_FLIGHT:
+        return await _run_pipeline(query)
+    try:
+        # Waits for (and returns) the answer of an identical question that is already being answered
+        return await answer_flights.do(flight_key(query), lambda: _run_pipeline(query))
+    except TimeoutError:
+        ERRORS.inc(endpoint="help_assistant")
+        raise HTTPException(status_code=504, detail="Timed out while answering the question")
+
+
+def flight_key(query: TravelQuery) -> str:
+    """Single-flight key, questions that only differ in case, spacing or trailing punctuation are the same question."""
+    category = query.category.strip().lower() if query.category is not None else ""
+    return f"{category}\x1f{normalize_query(query.query)}"
+
+
+async def _run_pipeline(query: TravelQuery) -> HelpResponse:
+    with stage("queue"):
+        await request_slots.acquire()
+    try:
+        return await _answer_query(query)
+    finally:
+        request_slots.release()
+
+
+async def _answer_query(query: TravelQuery) -> HelpResponse:
+    """Run retrieval and generation for a single query."""
     try:
         print(f"🔍 Received help query: {query.query}")
 
         # Category validation
-        allowed_categories = vs.get_category_list()
-        category_lower: str | None = None
-        if query.category is not None:
-            category_lower = query.category.strip().lower()
-            if category_lower not in allowed_categories:
-                raise HTTPException(status_code=422, detail=f"Invalid category value. \nAllowed categories: {', '.join(allowed_categories)}") # Display allowed categories as comma seperated string
-        
-        # Retrieve relevant chunks from ChromaDB
-        search_results = vs.search(query = query.query, category = category_lower)
-
-        # Empty result check
-        if len(search_results)==0:
-            return HelpResponse(
-                answer="I don't have enough information in the provided help content to answer that.",
-                sources=[],
-                confidence=None
-            )
+        vs = get_vector_store()
+        with stage("validate"):
+            category_lower = validate_category(query.category)
+        with stage("guardrail"):
+            reason = await screen_query(query.query)
+        if reason is not None:
+            return gated_response(reason)
+
+        # The most frequent questions, asked word for word, are answered from the answer store straight away
+        with stage("cache"):
+            stored = lookup_stored_answer(query.query, category_lower)
+        if stored is not None:
+            return stored
+
+        # Lexical fast path, confident exact-term matches skip the query embedding (and so the semantic cache)
+        query_embedding: list[float] | None = None
+        with stage("lexical"):
+            search_results = vs.lexical_fast_path(query.query, category = category_lower)
 
-        retrieved_context = "\n\n---\n\n".join(entry["text"] for entry in search_results)
-        prompt = generate_prompt(query.query, retrieved_context)
-
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful support assistant. Answer only using provided context."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=250
-        )
-        content = completion.choices[0].message.content
-        print(f"📝 OpenAI Response: {content}")
-        
-        sources: list[str] = list(dict.fromkeys(entry["source_id"] for entry in search_results)) # Adding only unique source ids while maintaining order
-
-        # Take cosine similarity of top chunk as the score
-        raw_score: float | None = search_results[0].get("score")
-        score: float | None = (raw_score * 100) if raw_score is not None else None
-        
-        # Tried - Weighted average for confidence scores (reciprocal)
-        # weighted_sum: float = 0.0
-        # weight_sum: float = 0.0
-        # score: Optional[float] = None
-        # for i, entry in enumerate(search_results):
-        #     weight = 1.0 / (i+1) # Rank 1 will have weight 1, rank 2 = 0.5, rank 3 = 0.33 and so on
-        #     weight_sum += weight # sum of weights
-        #     weighted_sum += weight * entry["score"] # sum of weighted scores
-        
-        # if weight_sum>0:
-        #     score = weighted_sum/weight_sum
-        # else:
-        #     score = None # Omit score if no score is retrieved
-
-        return HelpResponse(answer=content, sources=sources, confidence=score)
+        if search_results is None:
+            # Semantic answer cache, a close enough earlier question with the same category skips retrieval and generation
+            with stage("embed"):
+                query_embedding = await vs.aembed_query(query.query)
+            with stage("cache"):
+                cached = lookup_cached_answer(query_embedding, category_lower)
+            if cached is not None:
+                return cached
+
+            # Retrieve relevant chunks from ChromaDB
+            with stage("retrieve"):
+                search_results = await vs.asearch(query = query.query, category = category_lower)
+
+        return await generate_answer(query.query, search_results, query_embedding, category_lower)
 
     except HTTPException:
         raise
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except CircuitOpenError:
+        return degraded_response()
+    except Exception as e:
+        logger.exception(f"Error: {e}")
+        ERRORS.inc(endpoint="help_assistant")
+        raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
+
+
+def overloaded_error(error: Overloaded) -> HTTPException:
+    """Fast 503 for a request whose OpenAI call couldn't be sent in time, instead of queueing it further."""
+    print(f"🚦 {error}")
+    return HTTPException(status_code=503, detail="The assistant is busy, please retry shortly", headers={"Retry-After": error.retry_after_header()})
+
+
+def degraded_response() -> HelpResponse:
+    """Fallback answer while the circuit breaker treats OpenAI as down, returned without calling it."""
+    FALLBACKS.inc(reason="circuit_open")
+    print("🔌 Circuit open: answered with the fallback")
+    return HelpResponse(answer=FALLBACK_ANSWER, sources=[], confidence=None)
+
+
+async def generate_answer(user_query: str, search_results: list[dict[str, object]], query_embedding: list[float] | None, category: str | None) -> HelpResponse:
+    """Generate a grounded answer from retrieved chunks and add it to the answer cache."""
+    # Empty result check
+    if len(search_results)==0:
+        FALLBACKS.inc(reason="no_results")
+        return HelpResponse(answer=FALLBACK_ANSWER, sources=[], confidence=None)
+    # Nothing relevant enough was retrieved, the model could only say so
+    reason = check_results(search_results) if config.GUARDRAILS else None
+    if reason is not None:
+        return gated_response(reason)
+
+    with stage("prompt"):
+        search_results = pack_results(search_results)
+        messages = build_messages(user_query, search_results)
+        route = route_for(search_results)
+    start = time.perf_counter()
+    with stage("generate"):
+        completion = await upstream.call("chat", lambda: get_client().chat.completions.create(
+            model=route["model"],
+            messages=messages,
+            max_tokens=route["max_tokens"]
+        ))
+    record_route(route, time.perf_counter() - start, completion.choices[0].finish_reason)
+    record_token_usage(completion.usage)
+    content = completion.choices[0].message.content
+    print(f"📝 OpenAI Response: {content}")
+
+    sources, score = sources_and_confidence(search_results)
+    response = HelpResponse(answer=content, sources=sources, confidence=score)
+    store_cached_answer(query_embedding, category, response)
+    return response
+
+
+def record_route(route: dict[str, object], seconds: float, finish_reason: str | None) -> None:
+    """Count an answer generated on a route, with its generation time and whether max_tokens cut it off."""
+    MODEL_ROUTES.inc(route=route["name"], model=route["model"])
+    ROUTE_SECONDS.observe(seconds, route=route["name"])
+    if finish_reason == "length":
+        TRUNCATED_ANSWERS.inc(route=route["name"])
+    print(f"🧭 Routed to {route['name']} ({route['model']}, max_tokens={route['max_tokens']}), {seconds * 1000:.0f}ms")
+
+
+def record_token_usage(usage) -> None:
+    """Add a completion's token usage (None when the API didn't report it) to the token counter."""
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens, type="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens, type="completion")
+
+
+@app.post("/help-assistant/batch", response_model=BatchHelpResponse)
+async def help_assistant_batch(batch: BatchTravelQuery) -> BatchHelpResponse:
+    """
+    Answer a list of queries in one request, results come back in the same order.
+    All queries are embedded in one embeddings call and retrieved with one multi-query search,
+    then LLM calls run concurrently (bounded by BATCH_MAX_CONCURRENCY and the global request limit).
+    Failures are reported per item instead of failing the whole batch.
+    """
+    print(f"📦 Received batch of {len(batch.queries)} help queries")
+    vs = get_vector_store() # Not ready is a 503 for the whole batch, not per item
+    items: list[BatchHelpItem | None] = [None] * len(batch.queries)
+
+    # Per item category validation, invalid items get a 422 entry and are skipped
+    # and queries stopped by the guardrail gate are answered before anything is embedded
+    pending: list[tuple[int, str | None]] = []
+    for i, query in enumerate(batch.queries):
+        try:
+            category_lower = validate_category(query.category)
+        except HTTPException as e:
+            items[i] = BatchHelpItem(index=i, status_code=e.status_code, error=str(e.detail))
+            continue
+        reason = await screen_query(query.query)
+        if reason is not None:
+            items[i] = BatchHelpItem(index=i, status_code=200, response=gated_response(reason))
+        else:
+            pending.append((i, category_lower))
+
+    try:
+        # One embeddings call for every uncached query in the batch
+        with stage("embed"):
+            query_embeddings = await vs.aembed_queries([batch.queries[i].query for i, _ in pending])
+
+        to_generate: list[tuple[int, str | None, list[float]]] = []
+        for (i, category_lower), query_embedding in zip(pending, query_embeddings):
+            cached = lookup_cached_answer(query_embedding, category_lower)
+            if cached is not None:
+                items[i] = BatchHelpItem(index=i, status_code=200, response=cached)
+            else:
+                to_generate.append((i, category_lower, query_embedding))
+
+        # One retrieval pass (one collection.query per distinct category)
+        with stage("retrieve"):
+            all_search_results = await vs.asearch_batch(
+                [batch.queries[i].query for i, _, _ in to_generate],
+                categories=[category_lower for _, category_lower, _ in to_generate]
+            )
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except CircuitOpenError:
+        # Nothing could be embedded, every remaining item gets the fallback
+        for i, _ in pending:
+            if items[i] is None:
+                items[i] = BatchHelpItem(index=i, status_code=200, response=degraded_response())
+        return BatchHelpResponse(results=items)
     except Exception as e:
         logger.exception(f"Error: {e}")
+        ERRORS.inc(endpoint="help_assistant_batch")
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
 
+    batch_slots = asyncio.Semaphore(config.BATCH_MAX_CONCURRENCY)
+
+    async def answer_item(i: int, category_lower: str | None, query_embedding: list[float], search_results: list[dict[str, object]]) -> None:
+        async with batch_slots, request_slots:
+            try:
+                response = await generate_answer(batch.queries[i].query, search_results, query_embedding, category_lower)
+                items[i] = BatchHelpItem(index=i, status_code=200, response=response)
+            except Overloaded as e:
+                items[i] = BatchHelpItem(index=i, status_code=503, error=str(overloaded_error(e).detail))
+            except CircuitOpenError:
+                items[i] = BatchHelpItem(index=i, status_code=200, response=degraded_response())
+            except Exception as e:
+                logger.exception(f"Error: {e}")
+                ERRORS.inc(endpoint="help_assistant_batch")
+                items[i] = BatchHelpItem(index=i, status_code=500, error=f"OpenAI API error: {str(e)}")
+
+    await asyncio.gather(*(
+        answer_item(i, category_lower, query_embedding, search_results)
+        for (i, category_lower, query_embedding), search_results in zip(to_generate, all_search_results)
+    ))
+
+    return BatchHelpResponse(results=items)
+
+
+def response_events(response: HelpResponse) -> list[str]:
+    """Complete event sequence for an answer that is already known (cached or canned)."""
+    return [
+        sse_event("context", {"sources": response.sources, "confidence": response.confidence}),
+        sse_event("token", {"delta": response.answer}),
+        sse_event("done", response.model_dump()),
+    ]
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/help-assistant/stream")
+async def help_assistant_stream(query: TravelQuery) -> StreamingResponse:
+    """
+    Streaming variant of /help-assistant using server-sent events.
+    Events, in order:
+    - context: {sources, confidence}, sent as soon as retrieval finishes
+    - token: {delta}, one per chunk of the answer as the model generates it
+    - done: the full HelpResponse
+    - error: {detail} (plus retry_after when OpenAI is overloaded), replaces the remaining events if something fails after the stream started
+    """
+    # Validated before the stream starts so invalid categories still get a 422 (and not ready a 503)
+    vs = get_vector_store()
+    with stage("validate"):
+        category_lower = validate_category(query.category)
+
+    async def event_stream():
+        async with request_slots:
+            try:
+                print(f"🔍 Received streaming help query: {query.query}")
+                reason = await screen_query(query.query)
+                if reason is not None:
+                    for event in response_events(gated_response(reason)):
+                        yield event
+                    return
+
+                stored = lookup_stored_answer(query.query, category_lower)
+                if stored is not None:
+                    for event in response_events(stored):
+                        yield event
+                    return
+
+                query_embedding: list[float] | None = None
+                search_results = vs.lexical_fast_path(query.query, category = category_lower)
+
+                if search_results is None:
+                    query_embedding = await vs.aembed_query(query.query)
+                    cached = lookup_cached_answer(query_embedding, category_lower)
+                    if cached is not None:
+                        for event in response_events(cached):
+                            yield event
+                        return
+
+                    search_results = await vs.asearch(query = query.query, category = category_lower)
+                reason = check_results(search_results) if config.GUARDRAILS else None
+                if reason is not None:
+                    for event in response_events(gated_response(reason)):
+                        yield event
+                    return
+                search_results = pack_results(search_results)
+                sources, score = sources_and_confidence(search_results)
+                yield sse_event("context", {"sources": sources, "confidence": score})
+
+                if len(search_results)==0:
+                    FALLBACKS.inc(reason="no_results")
+                    yield sse_event("token", {"delta": FALLBACK_ANSWER})
+                    yield sse_event("done", HelpResponse(answer=FALLBACK_ANSWER, sources=[], confidence=None).model_dump())
+                    return
+
+                route = route_for(search_results)
+                start = time.perf_counter()
+                answer_parts: list[str] = []
+                finish_reason: str | None = None
+                try:
+                    # Only opening the stream is retried, once tokens were sent a failure ends the stream.
+                    # The in-flight slot is held until the last chunk is read (or the client goes away)
+                    async with upstream.stream("chat", lambda: get_client().chat.completions.create(
+                        model=route["model"],
+                        messages=build_messages(query.query, search_results),
+                        max_tokens=route["max_tokens"],
+                        stream=True,
+                        stream_options={"include_usage": True} # usage arrives in a final chunk without choices
+                    )) as stream:
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                answer_parts.append(delta)
+                                yield sse_event("token", {"delta": delta})
+                            if chunk.choices and chunk.choices[0].finish_reason:
+                                finish_reason = chunk.choices[0].finish_reason
+                            if chunk.usage is not None:
+                                record_token_usage(chunk.usage)
+                except CircuitOpenError:
+                    # The context event is already sent, finish the answer with the fallback
+                    response = degraded_response()
+                    yield sse_event("token", {"delta": response.answer})
+                    yield sse_event("done", response.model_dump())
+                    return
+                record_route(route, time.perf_counter() - start, finish_reason)
+
+                content = "".join(answer_parts)
+                print(f"📝 OpenAI Response: {content}")
+                response = HelpResponse(answer=content, sources=sources, confidence=score)
+                store_cached_answer(query_embedding, category_lower, response)
+                yield sse_event("done", response.model_dump())
+
+            except Overloaded as e:
+                # Headers are already sent, the 503 and its Retry-After go in the error event
+                yield sse_event("error", {"detail": str(overloaded_error(e).detail), "retry_after": int(e.retry_after_header())})
+            except CircuitOpenError:
+                for event in response_events(degraded_response()):
+                    yield event
+            except Exception as e:
+                logger.exception(f"Error: {e}")
+                ERRORS.inc(endpoint="help_assistant_stream")
+                yield sse_event("error", {"detail": f"OpenAI API error: {str(e)}"})
+
+    async def shared_event_stream():
+        # An identical question already streaming is followed (from its first event) instead of generated again
+        try:
+            async for event in stream_flights.stream(flight_key(query), event_stream):
+                yield event
+        except TimeoutError:
+            ERRORS.inc(endpoint="help_assistant_stream")
+            yield sse_event("error", {"detail": "Timed out while answering the question"})
+
+    return StreamingResponse(
+        shared_event_stream() if config.SINGLE_FLIGHT else event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # Stop proxies from buffering the stream
+    )
+
 @app.get("/")
 def read_root() -> dict:
     return {"message": "Travel Assistant API is running"}
 
 @app.get("/health")
 def health_check() -> dict:
-    return {"status": "healthy"}
+    """Liveness (the process is up) plus the readiness state, always 200."""
+    return {"status": "healthy", "ready": readiness["status"] == "ready", "readiness": dict(readiness)}
+
+def collect_cache_metrics():
+    """Cache hit/miss counters, kept by the caches themselves, read at scrape time."""
+    if vs is None:
+        return
+    caches = {"embedding": vs.embedding_cache, "rerank": vs.rerank_cache, "answer": vs.answer_cache}
+    for name, cache in caches.items():
+        if cache is not None:
+            stats = cache.stats()
+            yield "help_assistant_cache_requests_total", {"cache": name, "result": "hit"}, stats["hits"]
+            yield "help_assistant_cache_requests_total", {"cache": name, "result": "miss"}, stats["misses"]
+    if answer_store is not None:
+        stats = answer_store.stats()
+        yield "help_assistant_cache_requests_total", {"cache": "answer_store", "result": "hit"}, stats["hits"]
+        yield "help_assistant_cache_requests_total", {"cache": "answer_store", "result": "miss"}, stats["misses"]
+
+
+def batcher_stat_collector(metric_name: str, stat: str, scale: float = 1.0):
+    """Collector for one micro-batcher statistic (per batcher)."""
+    def collect():
+        if vs is None:
+            return
+        for name, batcher in {"embedding": vs.embedding_batcher, "rerank": vs.rerank_batcher}.items():
+            if batcher is not None:
+                yield metric_name, {"batcher": name}, batcher.stats()[stat] * scale
+    return collect
+
+
+REGISTRY.register_collector("help_assistant_cache_requests_total", "counter", "Cache lookups by cache and result.", collect_cache_metrics)
+REGISTRY.register_collector(
+    "help_assistant_coalesced_requests_total", "counter", "Requests that shared the answer of an identical request already in flight.",
+    lambda: [("help_assistant_coalesced_requests_total", {"endpoint": name}, flights.coalesced)
+             for name, flights in (("help_assistant", answer_flights), ("help_assistant_stream", stream_flights))]
+)
+REGISTRY.register_collector(
+    "help_assistant_upstream_circuit_state", "gauge", "OpenAI circuit breaker state, 1 for the current one.",
+    lambda: [("help_assistant_upstream_circuit_state", {"state": state}, int(upstream.breaker.state == state)) for state in ("closed", "half_open", "open")]
+)
+REGISTRY.register_collector(
+    "help_assistant_upstream_in_flight", "gauge", "OpenAI calls currently in flight.",
+    lambda: [("help_assistant_upstream_in_flight", {}, upstream.in_flight)]
+)
+REGISTRY.register_collector(
+    "help_assistant_micro_batch_mean_size", "gauge", "Mean micro-batch size.",
+    batcher_stat_collector("help_assistant_micro_batch_mean_size", "mean_batch_size")
+)
+REGISTRY.register_collector(
+    "help_assistant_micro_batch_mean_queue_wait_seconds", "gauge", "Mean time items wait for their micro-batch.",
+    batcher_stat_collector("help_assistant_micro_batch_mean_queue_wait_seconds", "mean_queue_wait_ms", 1 / 1000)
+)
+REGISTRY.register_collector(
+    "help_assistant_ready", "gauge", "1 once the help content is loaded.",
+    lambda: [("help_assistant_ready", {}, 1.0 if readiness["status"] == "ready" else 0.0)]
+)
+
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    """Prometheus text format: per stage latency histograms, request/error/fallback counters, token usage and cache stats."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/ready")
+def readiness_check() -> JSONResponse:
+    """Readiness probe, 503 until the help content is loaded."""
+    ready = readiness["status"] == "ready"
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **readiness})
 
 # Two endpoint had the same name and function, commented this one 
 # @app.post("/help-assistant", response_model=HelpResponse)
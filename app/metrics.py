@@ -0,0 +1,168 @@
+"""
+Minimal Prometheus metrics (counters and histograms) rendered in the text exposition format on /metrics.
+Recording is a dict lookup plus a bisect, so it can sit on the hot path. Values that are already counted elsewhere
+(cache hit/miss stats, rerank fallbacks, micro-batch sizes) are read by collectors at scrape time instead.
+"""
+
+import bisect
+import threading
+from typing import Callable, Iterable
+
+# Latency buckets in seconds, from sub-millisecond lookups to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (metric name, labels, value) samples produced by a collector
+Sample = tuple[str, dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket histogram with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[tuple[str, ...], list[int]] = {} # per bucket counts (non cumulative), last slot is +Inf
+        self._sums: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[slot] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(tuple(str(labels[name]) for name in self.labelnames), []))
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key in sorted(self._counts):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), self._counts[key]):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the metrics and scrape time collectors, renders everything for /metrics."""
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: list[tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, name: str, metric_type: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        """Add a metric whose samples are produced by `collect` on every scrape (metric_type is counter or gauge)."""
+        self._collectors = [collector for collector in self._collectors if collector[0] != name] # re-registering replaces
+        self._collectors.append((name, metric_type, documentation, collect))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, metric_type, documentation, collect in self._collectors:
+            lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"])
+            for sample_name, labels, value in collect():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "help_assistant_stage_seconds", "Time spent in each pipeline stage.", ("stage",)
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "help_assistant_http_requests_total", "HTTP requests by route and status code.", ("route", "status")
+)
+ERRORS = REGISTRY.counter(
+    "help_assistant_errors_total", "Requests (or batch items) that failed with an upstream or internal error.", ("endpoint",)
+)
+FALLBACKS = REGISTRY.counter(
+    "help_assistant_fallbacks_total", "Answers served by a fallback instead of the normal pipeline.", ("reason",)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "help_assistant_llm_tokens_total", "Chat completion token usage reported by the API.", ("type",)
+)
+CONTEXT_TOKENS = REGISTRY.histogram(
+    "help_assistant_context_tokens", "Prompt context size in tokens, before and after context packing.", ("packing",),
+    buckets=(50, 100, 200, 400, 800, 1500, 3000, 6000, 12000)
+)
+GUARDRAIL_BLOCKS = REGISTRY.counter(
+    "help_assistant_guardrail_blocks_total", "Queries answered by the guardrail gate, each one an LLM call saved.", ("reason",)
+)
+MODEL_ROUTES = REGISTRY.counter(
+    "help_assistant_model_routes_total", "Generated answers by routing rule and model.", ("route", "model")
+)
+ROUTE_SECONDS = REGISTRY.histogram(
+    "help_assistant_route_generate_seconds", "Answer generation time by routing rule, until the last token for streamed answers.", ("route",)
+)
+TRUNCATED_ANSWERS = REGISTRY.counter(
+    "help_assistant_truncated_answers_total", "Answers cut off by their route's max_tokens budget.", ("route",)
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "help_assistant_upstream_retries_total", "OpenAI calls retried after a retryable error.", ("kind", "error")
+)
+UPSTREAM_REJECTIONS = REGISTRY.counter(
+    "help_assistant_upstream_rejections_total", "OpenAI calls not sent: rate limited, queue timeout or circuit open.", ("reason",)
+)
@@ -0,0 +1,297 @@
+"""
+Client-side resilience for the OpenAI calls made while serving requests (chat completions and query embeddings).
+Every call goes through one Upstream guard per process:
+- circuit breaker: after CIRCUIT_FAILURE_THRESHOLD failed attempts in a row calls fail fast (CircuitOpenError) for
+  CIRCUIT_RESET_SECONDS, then a single probe call decides whether it closes again. Handlers answer with the fallback
+- in-flight limit: at most OPENAI_MAX_IN_FLIGHT calls at once, a call that can't start within OPENAI_QUEUE_TIMEOUT_SECONDS
+  is rejected (Overloaded, a 503 with Retry-After) instead of piling up
+- token bucket per call kind, sized to the API quota (requests per minute). A call that would have to wait for a token
+  longer than the queue timeout is rejected straight away
+- retries with jittered exponential backoff (or the API's Retry-After) on rate limits, timeouts, connection errors and 5xx.
+  Rate limits (429) are back-pressure and don't count towards opening the circuit
+- streamed answers (Upstream.stream) hold their in-flight slot until the stream is read to the end or closed
+Ingestion has its own retries (embed_with_retries) and isn't limited here.
+"""
+
+import asyncio
+import math
+import random
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+import openai
+from app import config
+from app.metrics import UPSTREAM_REJECTIONS, UPSTREAM_RETRIES
+
+R = TypeVar("R")
+
+# Worth retrying: rate limits, timeouts, dropped connections and 5xx
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Delay asked for by the API (Retry-After header), if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class Overloaded(Exception):
+    """The call was not sent: no in-flight slot or rate limit token in time. retry_after is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Upstream overloaded ({reason}), retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open, the upstream is treated as down and the call was not sent."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Upstream circuit open, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to `capacity` tokens, refilled at `rate` tokens per second (rate <= 0 = unlimited).
+    Tokens are reserved ahead (the balance can go negative), so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def reserve(self, max_wait: float) -> float:
+        """Take a token, returns how long to wait before using it. Raises Overloaded when that's over max_wait."""
+        if self.rate <= 0:
+            return 0.0
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait:
+            raise Overloaded("rate_limit", wait)
+        self.tokens -= 1
+        return wait
+
+    async def acquire(self, max_wait: float) -> None:
+        wait = self.reserve(max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through, consecutive failures are counted. Open (after failure_threshold of them): calls are
+    refused for reset_seconds. Half open: one probe call goes through, success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = "closed"
+        self.failures: int = 0
+        self.opened_at: float = 0.0
+        self.opened: int = 0 # times the circuit opened
+        self._probing = False
+
+    def before_call(self) -> bool:
+        """Raises CircuitOpenError when the call must not be sent, returns True when the call is the half open probe."""
+        if self.failure_threshold <= 0 or self.state == "closed":
+            return False
+        remaining = self.opened_at + self.reset_seconds - self.clock()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        raise CircuitOpenError(max(remaining, 0.0) if self.state == "open" else self.reset_seconds)
+
+    def release_probe(self) -> None:
+        """The probe ended without telling anything about the upstream (never sent, or cancelled), let the next call probe."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or (self.state == "closed" and self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+            if self.state == "closed":
+                print(f"🔌 Circuit opened after {self.failures} failed upstream calls, failing fast for {self.reset_seconds:.0f}s")
+            self.state = "open"
+            self.opened_at = self.clock()
+            self.opened += 1
+
+
+class Upstream:
+    """One guard for every OpenAI call of the process: circuit breaker, in-flight limit, token buckets and retries."""
+
+    def __init__(self, rates_per_minute: dict[str, float], burst_seconds: float, max_in_flight: int, queue_timeout_seconds: float,
+                 max_retries: int, backoff_seconds: float, max_backoff_seconds: float, breaker: CircuitBreaker):
+        self.buckets = {kind: TokenBucket(rpm / 60, rpm / 60 * burst_seconds) for kind, rpm in rates_per_minute.items()}
+        self.max_in_flight = max_in_flight
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.breaker = breaker
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight: int = 0
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Delay before retry number `attempt` (from 1): the API's Retry-After, else exponential with jitter."""
+        delay = retry_after_seconds(error) or self.backoff_seconds * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+        return min(delay, self.max_backoff_seconds)
+
+    @asynccontextmanager
+    async def _slot(self, kind: str) -> AsyncIterator[bool]:
+        """Admission (breaker, in-flight slot, token), the slot is held until the block exits. Yields whether this is the half open probe."""
+        try:
+            probe = self.breaker.before_call()
+        except CircuitOpenError:
+            UPSTREAM_REJECTIONS.inc(reason="circuit_open")
+            raise
+        try:
+            await self._admit(kind)
+        except Overloaded as e:
+            UPSTREAM_REJECTIONS.inc(reason=e.reason)
+            if probe:
+                self.breaker.release_probe()
+            raise
+        except BaseException:
+            if probe:
+                self.breaker.release_probe()
+            raise
+        self.in_flight += 1
+        try:
+            yield probe
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def _record_error(self, probe: bool, error: BaseException) -> None:
+        """What a failed call tells the breaker about the upstream."""
+        if isinstance(error, openai.RateLimitError):
+            # A 429 is back-pressure on our quota, not the upstream failing: retried, but never opens the circuit
+            if probe:
+                self.breaker.release_probe()
+        elif isinstance(error, RETRYABLE_ERRORS):
+            self.breaker.record_failure()
+        elif isinstance(error, openai.APIStatusError):
+            self.breaker.record_success() # a 4xx is our request's fault, the upstream itself answered
+        elif probe:
+            self.breaker.release_probe()
+
+    async def _attempt(self, kind: str, call: Callable[[], Awaitable[R]]) -> R:
+        """One try: admission then the call, its outcome recorded by the breaker."""
+        async with self._slot(kind) as probe:
+            try:
+                result = await call()
+            except BaseException as e:
+                self._record_error(probe, e)
+                raise
+        self.breaker.record_success()
+        return result
+
+    async def _open(self, kind: str, call: Callable[[], Awaitable[R]]) -> tuple[R, bool, AsyncExitStack]:
+        """One try at opening a stream: (stream, probe, exit stack holding its in-flight slot)."""
+        held = AsyncExitStack()
+        probe = await held.enter_async_context(self._slot(kind))
+        try:
+            return await call(), probe, held
+        except BaseException as e:
+            await held.aclose()
+            self._record_error(probe, e)
+            raise
+
+    async def _admit(self, kind: str) -> None:
+        """Take an in-flight slot and a token of the kind's bucket within the queue timeout, or raise Overloaded."""
+        deadline = time.monotonic() + self.queue_timeout_seconds
+        if self._slots.locked():
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout_seconds)
+            except TimeoutError:
+                raise Overloaded("queue_timeout", self.queue_timeout_seconds) from None
+        else:
+            await self._slots.acquire()
+        bucket = self.buckets.get(kind)
+        try:
+            if bucket is not None:
+                await bucket.acquire(max(deadline - time.monotonic(), 0.0))
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _with_retries(self, kind: str, attempt_once: Callable[[], Awaitable[R]]) -> R:
+        attempt = 0
+        while True:
+            try:
+                return await attempt_once()
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                delay = self.backoff(attempt, e)
+                UPSTREAM_RETRIES.inc(kind=kind, error=type(e).__name__)
+                print(f"⏳ {kind} call failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def call(self, kind: str, call: Callable[[], Awaitable[R]]) -> R:
+        """
+        Run `call` (one OpenAI request of this kind, "chat" or "embeddings") with retries.
+        Raises Overloaded or CircuitOpenError when it can't be sent, or the last error once retries run out.
+        """
+        return await self._with_retries(kind, lambda: self._attempt(kind, call))
+
+    @asynccontextmanager
+    async def stream(self, kind: str, call: Callable[[], Awaitable[R]]) -> AsyncIterator[R]:
+        """
+        Like call, for a streaming response (`call` opens it): only opening is retried, and the in-flight slot is held
+        until the block exits, once the stream is exhausted or the consumer went away. The stream is closed on exit and
+        an error while reading it is recorded by the breaker like a failed call.
+        """
+        stream, probe, held = await self._with_retries(kind, lambda: self._open(kind, call))
+        async with held:
+            try:
+                yield stream
+            except BaseException as e:
+                self._record_error(probe, e)
+                raise
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    await close()
+        self.breaker.record_success()
+
+    def stats(self) -> dict[str, object]:
+        return {"in_flight": self.in_flight, "circuit_state": self.breaker.state, "circuit_opened": self.breaker.opened}
+
+
+def create_upstream() -> Upstream:
+    """The Upstream guard with the configured limits."""
+    return Upstream(
+        rates_per_minute={"chat": config.OPENAI_CHAT_RPM, "embeddings": config.OPENAI_EMBEDDING_RPM},
+        burst_seconds=config.OPENAI_RATE_BURST_SECONDS,
+        max_in_flight=config.OPENAI_MAX_IN_FLIGHT,
+        queue_timeout_seconds=config.OPENAI_QUEUE_TIMEOUT_SECONDS,
+        max_retries=config.OPENAI_MAX_RETRIES,
+        backoff_seconds=config.OPENAI_BACKOFF_SECONDS,
+        max_backoff_seconds=config.OPENAI_MAX_BACKOFF_SECONDS,
+        breaker=CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS),
+    )
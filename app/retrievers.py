@@ -0,0 +1,669 @@
+"""
+Retriever backends used by VectorStoreService.
+Every backend stores (id, document, metadata, embedding) rows and answers top-k cosine similarity queries,
+optionally filtered by category. Select one with RETRIEVER_BACKEND ("chroma", "numpy" or "shared").
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from abc import ABC, abstractmethod
+from typing import Callable
+import numpy as np
+
+
+class RetrieverBackend(ABC):
+    """Interface the vector store service goes through for storage and search."""
+
+    # Read-only backends are built ahead of time, the service never ingests into them
+    read_only: bool = False
+
+    @abstractmethod
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict[str, str]], embeddings: list[list[float]]) -> None:
+        """Add new rows or replace existing ones with the same id."""
+
+    @abstractmethod
+    def delete(self, ids: list[str]) -> None:
+        """Remove rows by id."""
+
+    @abstractmethod
+    def get_metadatas(self) -> dict[str, dict[str, str]]:
+        """Return id -> metadata for every stored row."""
+
+    @abstractmethod
+    def query(self, query_embeddings: list[list[float]], top_k: int, category: str | None = None) -> list[list[dict[str, object]]]:
+        """Return, for each query embedding, up to top_k {text, source_id, score} dicts ordered by cosine similarity."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored rows."""
+
+    @abstractmethod
+    def categories(self) -> set[str]:
+        """Distinct categories of the stored rows."""
+
+    @abstractmethod
+    def export(self) -> tuple[list[str], list[str], list[dict[str, str]], np.ndarray]:
+        """Every stored row as (ids, documents, metadatas, embeddings matrix), used to build the shared index."""
+
+    def flush(self) -> None:
+        """
+        End of a run of writes (an ingest): persist them and recompute what is derived from every row.
+        Writes are searchable straight away, flush only does the work that would be quadratic if repeated per batch.
+        """
+
+
+# Storage precision of the vectors searched in the first pass, see NumpyRetriever
+PRECISIONS = ("float32", "float16", "int8")
+
+# Quantized rows are converted back to float32 this many at a time, so BLAS does the multiply without a full float32 copy.
+# Small blocks stay in the CPU cache between the conversion and the multiply (8192 rows was 4x slower than 128 for int8)
+SCORE_BLOCK_ROWS = 128
+
+
+def quantize(vectors: np.ndarray, precision: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """
+    Compact copy of unit-normalised float32 vectors: (codes, per-vector scales or None).
+    float16 is a plain cast, int8 is symmetric per-vector quantization (vector ~= codes * scale).
+    """
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+    if precision == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127 if len(vectors) else np.zeros(0, dtype=np.float32)
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown vector precision '{precision}', expected one of {', '.join(PRECISIONS)}")
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Columns and scores of the k best scores per row, best first."""
+    # argpartition finds the k best in O(n), only those k are then sorted
+    if k < scores.shape[1]:
+        top_columns = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top_columns = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    top_scores = np.take_along_axis(scores, top_columns, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top_columns, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def _format_row(text: str, metadata: dict[str, str], cosine_sim: float) -> dict[str, object]:
+    """Result shape shared by every backend."""
+    return {
+        "text": text,
+        "source_id": metadata["source_id"],
+        "score": cosine_sim if cosine_sim>0 else 0 # Cosine has a range from -1 to 1, setting anything below 0 to 0.
+    }
+
+
+class ChromaRetriever(RetrieverBackend):
+    """Chroma persistent collection with an HNSW cosine index."""
+
+    def __init__(self, path: str, embedding_function=None, collection_name: str = "help_content"):
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=embedding_function,
+            # Chroma defaults to squared L2 distance, switching to cosine distances (which is 1 - cosine similarity in chroma, so lower is better)
+            configuration={
+                "hnsw": {"space": "cosine"}
+            }
+        )
+        self._categories: set[str] = set()
+        self._rescan_categories()
+
+    def _rescan_categories(self) -> None:
+        """Categories from every stored row's metadata, a full scan of the collection."""
+        self._categories = {meta["category"] for meta in self.get_metadatas().values() if meta.get("category")}
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict[str, str]], embeddings: list[list[float]]) -> None:
+        # Upsert in chroma will add new entries if ID is new and update if ID already exists
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        # Only the new metadata is added (a full rescan per batch made ingestion quadratic). A category left empty
+        # by rows moving to another one is dropped by the rescan in delete / flush
+        self._categories.update(meta["category"] for meta in metadatas if meta.get("category"))
+
+    def delete(self, ids: list[str]) -> None:
+        self.collection.delete(ids=ids)
+        self._rescan_categories()
+
+    def flush(self) -> None:
+        self._rescan_categories()
+
+    def get_metadatas(self) -> dict[str, dict[str, str]]:
+        # Only metadata is fetched (no documents or embeddings)
+        existing = self.collection.get(include=["metadatas"])
+        return {doc_id: (meta or {}) for doc_id, meta in zip(existing["ids"], existing["metadatas"])}
+
+    def query(self, query_embeddings: list[list[float]], top_k: int, category: str | None = None) -> list[list[dict[str, object]]]:
+        result = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            include=["documents", "distances", "metadatas"],
+            where={"category": {"$eq": category}} if category is not None else None # If category is passed, filter based on category
+        )
+
+        # Convert Chroma query shape (Dict[str, List[List[str]]]) into one list of results per query
+        formatted: list[list[dict[str, object]]] = []
+        for docs, metas, dists in zip(result["documents"], result["metadatas"], result["distances"]):
+            # Convert from cosine distance to cosine similarity (higher is more similar)
+            formatted.append([_format_row(doc, meta, 1-float(dist)) for doc, meta, dist in zip(docs, metas, dists)])
+        return formatted
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def categories(self) -> set[str]:
+        return set(self._categories)
+
+    def export(self) -> tuple[list[str], list[str], list[dict[str, str]], np.ndarray]:
+        rows = self.collection.get(include=["documents", "metadatas", "embeddings"])
+        return rows["ids"], rows["documents"], [meta or {} for meta in rows["metadatas"]], np.asarray(rows["embeddings"], dtype=np.float32)
+
+
+class NumpyRetriever(RetrieverBackend):
+    """
+    Exact (brute force) cosine search over a contiguous float32 matrix of pre-normalised vectors.
+    Queries are one matrix multiply plus argpartition top-k, category filters use precomputed boolean masks.
+    Persisted as vectors.npy + rows.json in `path` by flush (or memory only when path is None).
+
+    With precision "float16" or "int8" the first pass scores a quantized copy held in memory (2x / 4x smaller),
+    and its best top_k x rescore_factor candidates are rescored with the float32 vectors, which are then
+    memory-mapped from vectors.npy instead of loaded (only the candidate rows are read, in memory when path is None).
+    """
+
+    def __init__(self, path: str | None = None, precision: str = "float32", rescore_factor: int = 4):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown vector precision '{precision}', expected one of {', '.join(PRECISIONS)}")
+        self.path = path
+        self.precision = precision
+        self.rescore_factor = max(1, rescore_factor)
+        self._codes: np.ndarray | None = None # quantized vectors, None at float32
+        self._scales: np.ndarray | None = None # int8 per-vector scales
+        self._ids: list[str] = []
+        self._documents: list[str] = []
+        self._metadatas: list[dict[str, str]] = []
+        self._vectors: np.ndarray = np.zeros((0, 0), dtype=np.float32) # the first count() rows of _buffer once written to
+        self._buffer: np.ndarray | None = None # vectors plus spare rows, grown by half its size when full so appends are amortised O(1)
+        self._row_by_id: dict[str, int] = {}
+        self._category_masks: dict[str, np.ndarray] = {}
+        self._category_rows: dict[str, np.ndarray] = {} # row indexes per category, derived from the masks
+        self._lookups_stale = False # masks and quantized copy are rebuilt before the next search, not per upsert
+        self._unsaved = False # writes not yet persisted, see flush
+
+        if path is not None and os.path.exists(os.path.join(path, "vectors.npy")):
+            self._load()
+
+    @staticmethod
+    def _normalise(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32, copy=False)
+
+    def _rebuild_lookups(self) -> None:
+        """Recompute the id -> row map, per category masks and quantized copy after the rows change."""
+        self._row_by_id = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        categories = np.array([meta.get("category", "") for meta in self._metadatas], dtype=object)
+        self._category_masks = {
+            category: categories == category
+            for category in set(categories.tolist()) if category
+        }
+        self._category_rows = {category: np.flatnonzero(mask) for category, mask in self._category_masks.items()}
+        if self.precision != "float32":
+            self._codes, self._scales = self._quantized()
+        self._lookups_stale = False
+
+    def _refresh_lookups(self) -> None:
+        if self._lookups_stale:
+            self._rebuild_lookups()
+
+    def _reserve(self, rows: int) -> None:
+        """Make room for `rows` vectors in the buffer, copying the stored ones only when it has to grow."""
+        if rows > len(self._buffer):
+            grown = np.empty((max(rows, len(self._buffer) * 3 // 2, 1024), self._buffer.shape[1]), dtype=np.float32)
+            grown[:len(self._vectors)] = self._vectors
+            self._buffer = grown
+
+    def _quantized(self) -> tuple[np.ndarray, np.ndarray | None]:
+        return quantize(self._vectors, self.precision)
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict[str, str]], embeddings: list[list[float]]) -> None:
+        if not ids:
+            return
+        vectors = self._normalise(np.asarray(embeddings, dtype=np.float32))
+        if self._buffer is None:
+            # First write since opening (the stored vectors may be memory-mapped read-only), copied once into a growable buffer
+            self._buffer = np.array(self._vectors, dtype=np.float32) if self._vectors.size else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            self._vectors = self._buffer[:len(self._ids)]
+
+        stored = len(self._ids)
+        new_rows: list[int] = []
+        for i, doc_id in enumerate(ids):
+            row = self._row_by_id.get(doc_id)
+            if row is None:
+                new_rows.append(i)
+                self._row_by_id[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._documents.append(documents[i])
+                self._metadatas.append(metadatas[i])
+            else:
+                self._documents[row] = documents[i]
+                self._metadatas[row] = metadatas[i]
+                self._vectors[row] = vectors[i]
+
+        if new_rows:
+            self._reserve(len(self._ids))
+            self._buffer[stored:len(self._ids)] = vectors[new_rows]
+            self._vectors = self._buffer[:len(self._ids)]
+        self._lookups_stale = self._unsaved = True
+
+    def delete(self, ids: list[str]) -> None:
+        removed = {self._row_by_id[doc_id] for doc_id in ids if doc_id in self._row_by_id}
+        if not removed:
+            return
+        keep = [row for row in range(len(self._ids)) if row not in removed]
+        self._ids = [self._ids[row] for row in keep]
+        self._documents = [self._documents[row] for row in keep]
+        self._metadatas = [self._metadatas[row] for row in keep]
+        self._buffer = self._vectors = np.ascontiguousarray(self._vectors[keep], dtype=np.float32)
+        self._rebuild_lookups() # rows moved, the id -> row map is needed by the next upsert
+        self._unsaved = True
+
+    def flush(self) -> None:
+        """Rebuild the lookups and write the index to disk, once per ingest instead of per batch."""
+        self._refresh_lookups()
+        if self._unsaved:
+            self._save()
+            self._unsaved = False
+
+    def get_metadatas(self) -> dict[str, dict[str, str]]:
+        return dict(zip(self._ids, self._metadatas))
+
+    def _scores(self, queries: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """(num_queries, num_rows) cosine similarities against every row (or `rows`), approximate when quantized."""
+        if self._codes is None:
+            return queries @ (self._vectors if rows is None else self._vectors[rows]).T
+        codes = self._codes if rows is None else self._codes[rows]
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self._scales is not None:
+            scores *= self._scales if rows is None else self._scales[rows]
+        return scores
+
+    def query(self, query_embeddings: list[list[float]], top_k: int, category: str | None = None) -> list[list[dict[str, object]]]:
+        if not self._ids or not query_embeddings:
+            return [[] for _ in query_embeddings]
+
+        queries = self._normalise(np.asarray(query_embeddings, dtype=np.float32))
+        self._refresh_lookups()
+
+        row_ids: np.ndarray | None = None # maps score columns back to rows when only a subset is scored
+        if category is None:
+            scores = self._scores(queries)
+            available = len(self._ids)
+        else:
+            mask = self._category_masks.get(category)
+            if mask is None:
+                return [[] for _ in query_embeddings]
+            rows = self._category_rows[category]
+            available = len(rows)
+            if len(rows) * 2 < len(self._ids):
+                # Small category: only score its rows (gathering them is cheaper than scoring the whole matrix)
+                row_ids = rows
+                scores = self._scores(queries, rows)
+            else:
+                scores = self._scores(queries)
+                scores[:, ~mask] = -np.inf
+
+        k = min(top_k, available)
+        if self._codes is None:
+            top_columns, top_scores = _top_k(scores, k)
+            top_rows = row_ids[top_columns] if row_ids is not None else top_columns
+        else:
+            # Quantized scores only pick candidates, the final order and scores come from the float32 vectors
+            candidate_columns, _ = _top_k(scores, min(k * self.rescore_factor, available))
+            candidate_rows = row_ids[candidate_columns] if row_ids is not None else candidate_columns
+            exact_scores = np.einsum("qd,qcd->qc", queries, self._vectors[candidate_rows])
+            top_columns, top_scores = _top_k(exact_scores, k)
+            top_rows = np.take_along_axis(candidate_rows, top_columns, axis=1)
+
+        results: list[list[dict[str, object]]] = []
+        for rows, row_scores in zip(top_rows, top_scores):
+            results.append([
+                _format_row(self._documents[row], self._metadatas[row], float(score))
+                for row, score in zip(rows, row_scores)
+            ])
+        return results
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def categories(self) -> set[str]:
+        self._refresh_lookups()
+        return set(self._category_masks)
+
+    def export(self) -> tuple[list[str], list[str], list[dict[str, str]], np.ndarray]:
+        return list(self._ids), list(self._documents), list(self._metadatas), self._vectors
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        # Write to temp files then replace, so a crash mid-write keeps the previous index
+        vectors_tmp = os.path.join(self.path, "vectors.tmp.npy")
+        rows_tmp = os.path.join(self.path, "rows.json.tmp")
+        np.save(vectors_tmp, self._vectors)
+        with open(rows_tmp, "w") as f:
+            json.dump({"ids": self._ids, "documents": self._documents, "metadatas": self._metadatas}, f)
+        os.replace(vectors_tmp, os.path.join(self.path, "vectors.npy"))
+        os.replace(rows_tmp, os.path.join(self.path, "rows.json"))
+        if self.precision != "float32" and self._ids:
+            # Quantized search only reads candidate rows, so the float32 copy can stay on disk
+            self._vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+            self._buffer = None
+
+    def _load(self) -> None:
+        with open(os.path.join(self.path, "rows.json"), "r") as f:
+            rows = json.load(f)
+        self._ids = rows["ids"]
+        self._documents = rows["documents"]
+        self._metadatas = rows["metadatas"]
+        if self.precision != "float32" and self._ids: # mmap can't map an empty array
+            self._vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+        else:
+            self._vectors = np.ascontiguousarray(np.load(os.path.join(self.path, "vectors.npy")), dtype=np.float32)
+        self._rebuild_lookups()
+
+
+class _MappedDocuments:
+    """Document texts in a memory-mapped UTF-8 blob, decoded one row at a time when a result needs them."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets # row i is blob[offsets[i]:offsets[i + 1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return bytes(self.blob[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+
+class SharedIndexRetriever(NumpyRetriever):
+    """
+    Read-only exact search over an index built once by write_shared_index (python3 -m app.ingestion --build-shared-index).
+    Vectors and document texts are memory-mapped read-only, so every worker on a host shares one copy in the page cache,
+    and opening the index does no writes and no embedding calls. Only ids, metadata and category masks are per process.
+    The quantized vectors are written by the builder too, and mapped the same way.
+    `path` holds versioned builds and a CURRENT file naming the one to open.
+    """
+
+    read_only = True
+
+    def __init__(self, path: str, precision: str = "float32", rescore_factor: int = 4):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown vector precision '{precision}', expected one of {', '.join(PRECISIONS)}")
+        self.path = path
+        self.precision = precision
+        self.rescore_factor = max(1, rescore_factor)
+        self._codes: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._lookups_stale = self._unsaved = False
+        current_path = os.path.join(path, "CURRENT")
+        if not os.path.exists(current_path):
+            raise RuntimeError(f"No shared index at {path}, build it with: python3 -m app.ingestion --build-shared-index {path}")
+        with open(current_path, "r") as f:
+            self.build_path = os.path.join(path, f.read().strip())
+        with open(os.path.join(self.build_path, "manifest.json"), "r") as f:
+            self.manifest: dict[str, object] = json.load(f)
+        with open(os.path.join(self.build_path, "rows.json"), "r") as f:
+            rows = json.load(f)
+        self._ids = rows["ids"]
+        self._metadatas = rows["metadatas"]
+
+        # mmap can't map empty files, an empty index is simply loaded
+        mmap_mode = "r" if self._ids else None
+        self._vectors = np.load(os.path.join(self.build_path, "vectors.npy"), mmap_mode=mmap_mode)
+        offsets = np.load(os.path.join(self.build_path, "document_offsets.npy"))
+        blob_path = os.path.join(self.build_path, "documents.bin")
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if os.path.getsize(blob_path) else np.zeros(0, dtype=np.uint8)
+        self._documents = _MappedDocuments(blob, offsets)
+        self._rebuild_lookups()
+
+    def _quantized(self) -> tuple[np.ndarray, np.ndarray | None]:
+        codes_path = os.path.join(self.build_path, f"vectors_{self.precision}.npy")
+        if not self._ids or not os.path.exists(codes_path):
+            return quantize(np.asarray(self._vectors), self.precision) # empty, or a build from before quantization
+        scales_path = os.path.join(self.build_path, f"scales_{self.precision}.npy")
+        return np.load(codes_path, mmap_mode="r"), np.load(scales_path) if os.path.exists(scales_path) else None
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict[str, str]], embeddings: list[list[float]]) -> None:
+        raise RuntimeError("The shared index is read-only, rebuild it with python3 -m app.ingestion --build-shared-index")
+
+    def delete(self, ids: list[str]) -> None:
+        raise RuntimeError("The shared index is read-only, rebuild it with python3 -m app.ingestion --build-shared-index")
+
+    def export(self) -> tuple[list[str], list[str], list[dict[str, str]], np.ndarray]:
+        return list(self._ids), list(self._documents), list(self._metadatas), self._vectors
+
+
+def write_shared_index(path: str, backend: RetrieverBackend, embedding_model: str, keep_builds: int = 2) -> str:
+    """
+    Write every row of `backend` as a new shared index build under `path` and make it the current one.
+    Workers that already opened the previous build keep using it (deleting a mapped file doesn't unmap it),
+    workers started afterwards open the new one. Only the newest `keep_builds` builds are kept. Returns the build path.
+    """
+    ids, documents, metadatas, vectors = backend.export()
+    build_name = f"build-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}" # sorts oldest to newest
+    build_path = os.path.join(path, build_name)
+    os.makedirs(build_path)
+
+    # Pre-normalised contiguous float32, so readers search the mapped file as is
+    vectors = NumpyRetriever._normalise(np.asarray(vectors, dtype=np.float32)) if ids else np.zeros((0, 0), dtype=np.float32)
+    np.save(os.path.join(build_path, "vectors.npy"), np.ascontiguousarray(vectors))
+    # Every quantized form is written, so workers can pick their VECTOR_PRECISION without a rebuild
+    for precision in PRECISIONS[1:]:
+        codes, scales = quantize(vectors, precision)
+        np.save(os.path.join(build_path, f"vectors_{precision}.npy"), codes)
+        if scales is not None:
+            np.save(os.path.join(build_path, f"scales_{precision}.npy"), scales)
+    encoded = [document.encode("utf-8") for document in documents]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(document) for document in encoded])
+    with open(os.path.join(build_path, "documents.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(build_path, "document_offsets.npy"), offsets)
+    with open(os.path.join(build_path, "rows.json"), "w") as f:
+        json.dump({"ids": ids, "metadatas": metadatas}, f)
+    with open(os.path.join(build_path, "manifest.json"), "w") as f:
+        json.dump({
+            "embedding_model": embedding_model,
+            "rows": len(ids),
+            "dimensions": int(vectors.shape[1]) if ids else 0,
+            "categories": sorted({meta["category"] for meta in metadatas if meta.get("category")}),
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }, f, indent=2)
+
+    # Switching CURRENT is one atomic rename, a worker never sees a half-written build
+    current_tmp = os.path.join(path, "CURRENT.tmp")
+    with open(current_tmp, "w") as f:
+        f.write(build_name)
+    os.replace(current_tmp, os.path.join(path, "CURRENT"))
+
+    builds = sorted(name for name in os.listdir(path) if name.startswith("build-"))
+    for old_build in builds[:-keep_builds]:
+        shutil.rmtree(os.path.join(path, old_build), ignore_errors=True)
+    return build_path
+
+
+def partition_name(category: str) -> str:
+    """Storage safe, unique name for a category's partition (Chroma collection names are 3-63 of [a-zA-Z0-9._-])."""
+    slug = re.sub(r"[^a-z0-9]+", "_", category.lower()).strip("_")[:40] or "category"
+    return f"{slug}_{hashlib.sha1(category.encode('utf-8')).hexdigest()[:8]}"
+
+
+class PartitionedRetriever(RetrieverBackend):
+    """
+    The global index plus one sub-index (partition) per category, all of the same backend type.
+    Category filtered queries go straight to their partition, so they search a small index of matching rows
+    instead of filtering a search over the whole corpus (where a filtered HNSW walk loses recall and latency
+    as the category gets smaller). Unfiltered queries use the global index: fanning out to every partition and
+    merging is never cheaper while it exists (the same rows for exact search, one graph walk per partition for HNSW).
+    Writes go to the global index first, partitions that don't match it (an index built before partitioning,
+    or a crash between the two writes) are repaired from it when opened.
+    """
+
+    def __init__(self, global_backend: RetrieverBackend, open_partition: Callable[[str], RetrieverBackend]):
+        self.global_backend = global_backend
+        self.collection = getattr(global_backend, "collection", None) # the global Chroma collection, if any
+        self._open_partition = open_partition
+        self.partitions: dict[str, RetrieverBackend] = {} # the partition registry, category -> sub-index
+        self._category_by_id: dict[str, str] = {}
+        self._unflushed: set[str] = set() # partitions written to since the last flush
+        self._sync_partitions()
+
+    def _sync_partitions(self) -> None:
+        """Open a partition for every category of the global index and make its rows match."""
+        metadatas = self.global_backend.get_metadatas()
+        self._category_by_id = {doc_id: meta.get("category", "") for doc_id, meta in metadatas.items()}
+        expected: dict[str, dict[str, dict[str, str]]] = {}
+        for doc_id, meta in metadatas.items():
+            if meta.get("category"):
+                expected.setdefault(meta["category"], {})[doc_id] = meta
+
+        exported: dict[str, tuple[str, dict[str, str], np.ndarray]] | None = None
+        for category, rows in expected.items():
+            partition = self.partitions[category] = self._open_partition(category)
+            stored = partition.get_metadatas()
+            stale = [doc_id for doc_id, meta in rows.items() if stored.get(doc_id) != meta]
+            extra = [doc_id for doc_id in stored if doc_id not in rows]
+            if extra:
+                partition.delete(extra)
+            if stale:
+                if exported is None:
+                    ids, documents, export_metadatas, vectors = self.global_backend.export()
+                    exported = {doc_id: (document, meta, vector) for doc_id, document, meta, vector in zip(ids, documents, export_metadatas, vectors)}
+                partition.upsert(
+                    ids=stale,
+                    documents=[exported[doc_id][0] for doc_id in stale],
+                    metadatas=[exported[doc_id][1] for doc_id in stale],
+                    embeddings=[np.asarray(exported[doc_id][2], dtype=np.float32).tolist() for doc_id in stale],
+                )
+                print(f"🗂️ Partition '{category}' repaired: {len(stale)} rows copied from the global index")
+            if extra or stale:
+                partition.flush()
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict[str, str]], embeddings: list[list[float]]) -> None:
+        self.global_backend.upsert(ids, documents, metadatas, embeddings)
+        # Rows whose category changed leave their old partition
+        moved: dict[str, list[str]] = {}
+        for doc_id, meta in zip(ids, metadatas):
+            previous = self._category_by_id.get(doc_id)
+            if previous and previous != meta.get("category", ""):
+                moved.setdefault(previous, []).append(doc_id)
+        for category, moved_ids in moved.items():
+            self._delete_from_partition(category, moved_ids)
+
+        groups: dict[str, list[int]] = {}
+        for i, meta in enumerate(metadatas):
+            self._category_by_id[ids[i]] = meta.get("category", "")
+            if meta.get("category"):
+                groups.setdefault(meta["category"], []).append(i)
+        for category, rows in groups.items():
+            if category not in self.partitions:
+                self.partitions[category] = self._open_partition(category)
+            self._unflushed.add(category)
+            self.partitions[category].upsert(
+                [ids[i] for i in rows], [documents[i] for i in rows], [metadatas[i] for i in rows], [embeddings[i] for i in rows]
+            )
+
+    def _delete_from_partition(self, category: str, ids: list[str]) -> None:
+        partition = self.partitions.get(category)
+        if partition is None:
+            return
+        partition.delete(ids)
+        self._unflushed.add(category)
+        if partition.count() == 0:
+            del self.partitions[category] # an empty category is no longer a valid filter
+            partition.flush()
+            self._unflushed.discard(category)
+
+    def delete(self, ids: list[str]) -> None:
+        self.global_backend.delete(ids)
+        groups: dict[str, list[str]] = {}
+        for doc_id in ids:
+            category = self._category_by_id.pop(doc_id, "")
+            if category:
+                groups.setdefault(category, []).append(doc_id)
+        for category, category_ids in groups.items():
+            self._delete_from_partition(category, category_ids)
+
+    def flush(self) -> None:
+        # The registry and each partition's rows are kept up to date per write, only touched partitions have work left
+        self.global_backend.flush()
+        for category in self._unflushed:
+            if category in self.partitions:
+                self.partitions[category].flush()
+        self._unflushed.clear()
+
+    def get_metadatas(self) -> dict[str, dict[str, str]]:
+        return self.global_backend.get_metadatas()
+
+    def query(self, query_embeddings: list[list[float]], top_k: int, category: str | None = None) -> list[list[dict[str, object]]]:
+        if category is None:
+            return self.global_backend.query(query_embeddings, top_k=top_k)
+        partition = self.partitions.get(category)
+        if partition is None:
+            return [[] for _ in query_embeddings]
+        return partition.query(query_embeddings, top_k=top_k)
+
+    def count(self) -> int:
+        return self.global_backend.count()
+
+    def categories(self) -> set[str]:
+        return set(self.partitions)
+
+    def export(self) -> tuple[list[str], list[str], list[dict[str, str]], np.ndarray]:
+        return self.global_backend.export()
+
+
+def create_backend(
+    name: str,
+    path: str,
+    embedding_function=None,
+    precision: str = "float32",
+    rescore_factor: int = 4,
+    partitioned: bool = False,
+) -> RetrieverBackend:
+    """Build the retriever backend selected by name, wrapped in a PartitionedRetriever when partitioned."""
+    if name == "chroma":
+        if precision != "float32":
+            raise ValueError(f"Vector precision '{precision}' needs the numpy or shared backend, Chroma stores float32")
+        backend = ChromaRetriever(path=path, embedding_function=embedding_function)
+        open_partition = lambda category: ChromaRetriever(
+            path=path, embedding_function=embedding_function, collection_name=f"help_content__{partition_name(category)}"
+        )
+    elif name == "numpy":
+        backend = NumpyRetriever(path=path, precision=precision, rescore_factor=rescore_factor)
+        open_partition = lambda category: NumpyRetriever(
+            path=os.path.join(path, "partitions", partition_name(category)) if path is not None else None,
+            precision=precision, rescore_factor=rescore_factor
+        )
+    elif name == "shared":
+        if partitioned:
+            raise ValueError("The shared index is read-only and can't be partitioned (it already scores small categories on their own rows)")
+        return SharedIndexRetriever(path=path, precision=precision, rescore_factor=rescore_factor)
+    else:
+        raise ValueError(f"Unknown retriever backend '{name}', expected 'chroma', 'numpy' or 'shared'")
+    return PartitionedRetriever(backend, open_partition) if partitioned else backend
@@ -0,0 +1,121 @@
+"""
+Model routing: picks the chat model and the max_tokens budget for each answer from retrieval signals that are already known
+when the prompt is built, so a one-line lookup doesn't pay for the large model and a multi-source question gets room to answer.
+Signals (see route_signals):
+- top_score: cosine similarity of the best chunk (normalised BM25 for lexical fast path results, None when unknown)
+- sources: distinct source ids in the packed context
+- context_tokens: size of the packed context
+Rules are checked in order and the first one whose conditions all hold wins, the last rule should have no conditions.
+A rule is a dict: {"name", "model", "max_tokens", and any of "min_top_score", "max_top_score", "min_sources",
+"max_sources", "min_context_tokens", "max_context_tokens"}. Missing model / max_tokens use CHAT_MODEL / MAX_TOKENS.
+Custom rules are a JSON list of these dicts in ROUTING_RULES_PATH.
+"""
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Iterator
+from app import config
+from app.context import count_tokens, format_context
+
+# Single source, close match, small context: a lookup the small model answers as well, with a short answer.
+# Three or more sources: a multi-part answer, the large model with a bigger budget. Everything else keeps the old behaviour
+DEFAULT_RULES: list[dict[str, object]] = [
+    {"name": "lookup", "model": "gpt-4o-mini", "max_tokens": 150, "min_top_score": 0.5, "max_sources": 1, "max_context_tokens": 600},
+    {"name": "multi_source", "max_tokens": 400, "min_sources": 3},
+    {"name": "default"},
+]
+
+# Condition key -> (signal, compare), compare(signal value, rule value) must hold for the rule to match
+CONDITIONS = {
+    "min_top_score": ("top_score", lambda value, bound: value >= bound),
+    "max_top_score": ("top_score", lambda value, bound: value <= bound),
+    "min_sources": ("sources", lambda value, bound: value >= bound),
+    "max_sources": ("sources", lambda value, bound: value <= bound),
+    "min_context_tokens": ("context_tokens", lambda value, bound: value >= bound),
+    "max_context_tokens": ("context_tokens", lambda value, bound: value <= bound),
+}
+
+_request_route: ContextVar[dict[str, object] | None] = ContextVar("request_route", default=None)
+
+
+def validate_rules(rules: list[dict[str, object]]) -> list[dict[str, object]]:
+    """Rules with model and max_tokens filled in, raises ValueError for unknown keys, unnamed or duplicate rules."""
+    names: set[str] = set()
+    validated: list[dict[str, object]] = []
+    for rule in rules:
+        unknown = set(rule) - set(CONDITIONS) - {"name", "model", "max_tokens"}
+        if unknown:
+            raise ValueError(f"Unknown routing rule keys {sorted(unknown)} in {rule}")
+        if not rule.get("name") or rule["name"] in names:
+            raise ValueError(f"Routing rules need a unique name: {rule}")
+        names.add(str(rule["name"]))
+        validated.append({**rule, "model": rule.get("model") or config.CHAT_MODEL, "max_tokens": int(rule.get("max_tokens") or config.MAX_TOKENS)})
+    if not validated:
+        raise ValueError("No routing rules")
+    return validated
+
+
+@lru_cache(maxsize=1)
+def routing_rules() -> list[dict[str, object]]:
+    """The configured rules (ROUTING_RULES_PATH, or DEFAULT_RULES), loaded once. Raises ValueError for an unknown ROUTING_FORCE_ROUTE."""
+    if config.ROUTING_RULES_PATH:
+        with open(config.ROUTING_RULES_PATH, "r", encoding="utf-8") as f:
+            rules = validate_rules(json.load(f))
+    else:
+        rules = validate_rules(DEFAULT_RULES)
+    if config.ROUTING_FORCE_ROUTE:
+        choose_route({}, rules, config.ROUTING_FORCE_ROUTE)
+    return rules
+
+
+def route_signals(search_results: list[dict[str, object]]) -> dict[str, float | int | None]:
+    """Signals for the packed search results that go into the prompt."""
+    top_score = search_results[0].get("score") if search_results else None
+    return {
+        "top_score": float(top_score) if top_score is not None else None,
+        "sources": len({entry["source_id"] for entry in search_results}),
+        "context_tokens": count_tokens(format_context(search_results)),
+    }
+
+
+def matches(rule: dict[str, object], signals: dict[str, float | int | None]) -> bool:
+    """Every condition of the rule holds, a condition on an unknown signal doesn't."""
+    for key, (signal, compare) in CONDITIONS.items():
+        if key in rule and (signals[signal] is None or not compare(signals[signal], rule[key])):
+            return False
+    return True
+
+
+def choose_route(signals: dict[str, float | int | None], rules: list[dict[str, object]], force: str | None = None) -> dict[str, object]:
+    """First matching rule (the rule named `force` when set), the last rule when none match."""
+    if force:
+        for rule in rules:
+            if rule["name"] == force:
+                return rule
+        raise ValueError(f"Unknown route {force!r}, routes are {[rule['name'] for rule in rules]}")
+    return next((rule for rule in rules if matches(rule, signals)), rules[-1])
+
+
+def route_for(search_results: list[dict[str, object]]) -> dict[str, object]:
+    """Model and max_tokens for an answer built from these (packed) search results, per the current settings."""
+    if not config.MODEL_ROUTING:
+        route = {"name": "default", "model": config.CHAT_MODEL, "max_tokens": config.MAX_TOKENS}
+    else:
+        route = choose_route(route_signals(search_results), routing_rules(), config.ROUTING_FORCE_ROUTE)
+    chosen = _request_route.get()
+    if chosen is not None:
+        chosen.update(route=route["name"], model=route["model"])
+    return route
+
+
+@contextmanager
+def collect_route() -> Iterator[dict[str, object]]:
+    """Collect the route chosen for the answer generated inside the block (empty when none was, e.g. a cache hit)."""
+    chosen: dict[str, object] = {}
+    token = _request_route.set(chosen)
+    try:
+        yield chosen
+    finally:
+        _request_route.reset(token)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from app import config
 
 
 class TravelQuery(BaseModel):
@@ -16,4 +17,23 @@ class HelpResponse(BaseModel):
     sources: List[str] = Field(..., description="IDs of help content used to generate the answer")
     confidence: Optional[float] = Field(None, description="Confidence score of the response")
 
+
+class BatchTravelQuery(BaseModel):
+    """Request body for answering several queries in one call."""
+    queries: List[TravelQuery] = Field(..., min_length=1, max_length=config.BATCH_MAX_SIZE)
+
+
+class BatchHelpItem(BaseModel):
+    """Result for one query of a batch, either a response or an error."""
+    index: int = Field(..., description="Position of the query in the request")
+    status_code: int = Field(..., description="HTTP status the query would have returned on /help-assistant")
+    response: Optional[HelpResponse] = None
+    error: Optional[str] = None
+
+
+class BatchHelpResponse(BaseModel):
+    """Per query results, in the same order as the request."""
+    results: List[BatchHelpItem]
+
+
 # Legacy schema removed to keep the test focused on help-only RAG
@@ -0,0 +1,84 @@
+"""
+Answer store test file
+Run from repo root: pytest
+"""
+
+import asyncio
+import os
+from app.answer_store import AnswerStore, mine_questions, rebuild_lock, source_hash
+
+def make_entry(question: str, embedding: list[float], sources: dict[str, str], category: str | None = None) -> dict:
+    return {
+        "question": question,
+        "category": category,
+        "embedding_model": "test-embedding-model",
+        "embedding": embedding,
+        "answer": f"answer to {question}",
+        "sources": list(sources),
+        "confidence": 0.9,
+        "source_hashes": sources,
+    }
+
+def test_lookup_by_exact_question_and_by_embedding(tmp_path):
+    """ Test to check stored answers are found by normalised question or a close embedding with the same category, and survive a reload."""
+    store = AnswerStore(str(tmp_path / "store.json"), similarity_threshold=0.95)
+    store.put(make_entry("What is the baggage allowance?", [1.0, 0.0], {"baggage_001": "h1"}))
+    store.put(make_entry("How do I contact you?", [0.0, 1.0], {"contact_001": "h2"}, category="contact"))
+    store.save()
+
+    reloaded = AnswerStore(str(tmp_path / "store.json"), similarity_threshold=0.95)
+    assert reloaded.load() == 2
+    assert reloaded.get_exact("what is the  baggage allowance", None)["sources"] == ["baggage_001"]
+    assert reloaded.get_exact("What is the baggage allowance?", "baggage") is None
+    assert reloaded.get([0.99, 0.05], None)["question"] == "What is the baggage allowance?"
+    assert reloaded.get([0.0, 1.0], None) is None # only stored with the contact category
+    assert reloaded.get([0.7, 0.7], None) is None # below the similarity threshold
+    assert reloaded.stats()["hits"] == 2
+
+def test_changed_or_removed_sources_make_entries_stale():
+    """ Test to check entries are stale (and not served) when a source changed or is gone, or the embedding model changed."""
+    store = AnswerStore("unused.json", similarity_threshold=0.95)
+    record = {"id": "baggage_001", "category": "baggage", "title": "Baggage", "content": "23kg"}
+    store.put(make_entry("baggage?", [1.0, 0.0], {"baggage_001": source_hash(record)}))
+    store.put(make_entry("meals?", [0.0, 1.0], {"meals_001": "old"}))
+    store.put(make_entry("contact?", [0.6, 0.8], {"contact_001": "h"}))
+
+    stale = store.refresh({"baggage_001": source_hash(record), "meals_001": "new"}, "test-embedding-model")
+    assert sorted(entry["question"] for entry in stale) == ["contact?", "meals?"]
+    assert store.get_exact("meals?", None) is None and store.get([0.0, 1.0], None) is None
+    assert store.get_exact("baggage?", None) is not None
+
+    assert len(store.refresh({"baggage_001": source_hash({**record, "content": "20kg"})}, "test-embedding-model")) == 3
+    assert len(store.refresh({"baggage_001": source_hash(record), "meals_001": "old", "contact_001": "h"}, "other-model")) == 3
+
+def test_mine_questions_picks_most_frequent(tmp_path):
+    """ Test to check log mining counts questions after normalisation and keeps the most frequent ones."""
+    log = tmp_path / "queries.txt"
+    log.write_text("What is the phone number?\nwhat is the phone number\nBaggage allowance?\n\nWhat is the phone number ?\nmeals\nbaggage allowance\n")
+    assert [item["question"] for item in mine_questions(str(log), top=2)] == ["What is the phone number?", "Baggage allowance?"]
+
+def test_categories_are_normalised_and_saves_leave_no_temp_files(tmp_path):
+    """ Test to check an entry stored under a lowercase category is found and removed with the raw category, and save only leaves the store file."""
+    store = AnswerStore(str(tmp_path / "store.json"), similarity_threshold=0.95)
+    store.put(make_entry("Bag size?", [1.0, 0.0], {"baggage_001": "h"}, category="baggage"))
+    assert store.get_exact("bag size", " Baggage") is not None
+    store.remove("Bag size?", "Baggage")
+    assert store.entries == {}
+    store.save()
+    store.save()
+    assert os.listdir(tmp_path) == ["store.json"]
+
+def test_rebuild_lock_lets_one_builder_in_at_a_time(tmp_path):
+    """ Test to check two builders of the same store take turns instead of rebuilding at the same time."""
+    path = str(tmp_path / "store.json")
+    events: list[str] = []
+    async def builder(name: str) -> None:
+        async with rebuild_lock(path, poll_seconds=0.01):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.05)
+            events.append(f"{name} end")
+    async def both() -> None:
+        await asyncio.gather(builder("a"), builder("b"))
+    asyncio.run(both())
+    assert events == ["a start", "a end", "b start", "b end"]
+
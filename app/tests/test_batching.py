@@ -0,0 +1,87 @@
+"""
+Micro-batcher test file
+Run from repo root: pytest
+"""
+
+import asyncio
+import pytest
+from app.batching import MicroBatcher
+
+def test_concurrent_submits_share_one_batch_in_order():
+    """ Test to check concurrent submits are processed in a single call and each caller gets its own result."""
+    calls: list[list[int]] = []
+
+    async def double(items: list[int]) -> list[int]:
+        calls.append(items)
+        return [item * 2 for item in items]
+
+    async def run() -> list[int]:
+        batcher = MicroBatcher(double, max_batch_size=64, max_wait_ms=5)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        assert batcher.stats()["batches"] == 1
+        assert batcher.stats()["mean_batch_size"] == 10
+        return results
+
+    assert asyncio.run(run()) == [i * 2 for i in range(10)]
+    assert calls == [list(range(10))]
+
+def test_full_batch_flushes_without_waiting():
+    """ Test to check batches are capped at max_batch_size and a full batch doesn't wait for the window."""
+    async def identity(items: list[int]) -> list[int]:
+        return items
+
+    async def run() -> dict[str, float]:
+        batcher = MicroBatcher(identity, max_batch_size=4, max_wait_ms=10_000)
+        assert await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(8))), timeout=1) == list(range(8))
+        return batcher.stats()
+
+    stats = asyncio.run(run())
+    assert stats["batches"] == 2
+    assert stats["largest_batch"] == 4
+
+def test_batch_errors_reach_every_caller():
+    """ Test to check an exception in the batch call is raised to every waiting caller."""
+    async def fail(items: list[int]) -> list[int]:
+        raise RuntimeError("model unavailable")
+
+    async def run() -> None:
+        batcher = MicroBatcher(fail, max_batch_size=8, max_wait_ms=1)
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    asyncio.run(run())
+
+def test_cancelled_caller_does_not_break_the_batch():
+    """ Test to check a caller that gives up (e.g. latency budget) doesn't stop the others getting results."""
+    async def slow_identity(items: list[int]) -> list[int]:
+        await asyncio.sleep(0.05)
+        return items
+
+    async def run() -> None:
+        batcher = MicroBatcher(slow_identity, max_batch_size=8, max_wait_ms=1)
+        impatient = asyncio.ensure_future(asyncio.wait_for(batcher.submit(1), timeout=0.01))
+        patient = asyncio.ensure_future(batcher.submit(2))
+        with pytest.raises(asyncio.TimeoutError):
+            await impatient
+        assert await patient == 2
+
+    asyncio.run(run())
+
+def test_running_batches_are_held_until_done():
+    """ Test to check the batch task is kept referenced while it runs, so it isn't garbage collected when every caller has given up."""
+    release = asyncio.Event()
+
+    async def blocked_identity(items: list[int]) -> list[int]:
+        await release.wait()
+        return items
+
+    async def run() -> None:
+        batcher = MicroBatcher(blocked_identity, max_batch_size=1, max_wait_ms=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(batcher.submit(1), timeout=0.01)
+        assert len(batcher._tasks) == 1
+        release.set()
+        await asyncio.sleep(0.01)
+        assert not batcher._tasks
+
+    asyncio.run(run())
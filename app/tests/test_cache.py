@@ -0,0 +1,84 @@
+"""
+Cache test file
+Run from repo root: pytest
+"""
+
+import time
+from app.cache import LRUTTLCache, SemanticAnswerCache, normalize_query
+
+def test_normalize_query_ignores_case_whitespace_and_punctuation():
+    """ Test to check equivalent questions normalise to the same cache key."""
+    assert normalize_query("  What is the   Baggage allowance? ") == normalize_query("what is the baggage allowance")
+
+def test_cache_hit_and_miss_stats():
+    """ Test to check hits and misses are counted."""
+    cache: LRUTTLCache[list[float]] = LRUTTLCache(max_size=10)
+    assert cache.get("q") is None
+    cache.put("q", [0.1, 0.2])
+    assert cache.get("q") == [0.1, 0.2]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+def test_cache_evicts_least_recently_used():
+    """ Test to check the least recently used entry is evicted when the cache is full."""
+    cache: LRUTTLCache[int] = LRUTTLCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a") # "b" is now least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_expires_entries_after_ttl():
+    """ Test to check entries older than the TTL are treated as misses."""
+    cache: LRUTTLCache[int] = LRUTTLCache(max_size=10, ttl_seconds=60)
+    cache.put("old", 1, stored_at=time.time() - 120)
+    assert cache.get("old") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_cache_save_and_load_round_trip(tmp_path):
+    """ Test to check the cache survives a save/load cycle."""
+    path = str(tmp_path / "embedding_cache.json")
+    cache: LRUTTLCache[list[float]] = LRUTTLCache(max_size=10)
+    cache.put("q", [0.5, 0.25])
+    cache.save(path)
+
+    restored: LRUTTLCache[list[float]] = LRUTTLCache(max_size=10)
+    assert restored.load(path) == 1
+    assert restored.get("q") == [0.5, 0.25]
+
+def test_answer_cache_hits_similar_query_same_category():
+    """ Test to check a near-identical embedding with the same category returns the cached answer."""
+    cache = SemanticAnswerCache(max_size=10, similarity_threshold=0.95)
+    cache.put([1.0, 0.0, 0.0], "contact", "answer", ["contact_001"])
+
+    assert cache.get([0.99, 0.05, 0.0], "contact") == "answer"
+    assert cache.get([0.99, 0.05, 0.0], "baggage") is None # different category filter
+    assert cache.get([0.0, 1.0, 0.0], "contact") is None # not similar enough
+    assert cache.stats()["hits"] == 1
+
+def test_answer_cache_invalidates_by_source_id():
+    """ Test to check re-ingested source ids remove the answers built from them."""
+    cache = SemanticAnswerCache(max_size=10, similarity_threshold=0.95)
+    cache.put([1.0, 0.0], None, "a", ["baggage_001", "baggage_002"])
+    cache.put([0.0, 1.0], None, "b", ["contact_001"])
+
+    assert cache.invalidate_sources(["baggage_002"]) == 1
+    assert cache.get([1.0, 0.0], None) is None
+    assert cache.get([0.0, 1.0], None) == "b"
+
+def test_answer_cache_evicts_when_full():
+    """ Test to check the least recently used answer is evicted when the cache is full."""
+    cache = SemanticAnswerCache(max_size=2, similarity_threshold=0.95)
+    cache.put([1.0, 0.0, 0.0], None, "a", [])
+    cache.put([0.0, 1.0, 0.0], None, "b", [])
+    cache.put([0.0, 0.0, 1.0], None, "c", [])
+
+    assert len(cache) == 2
+    assert cache.get([1.0, 0.0, 0.0], None) is None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,90 @@
+"""
+Single-flight coalescing test file
+Run from repo root: pytest
+"""
+
+import asyncio
+import pytest
+from app.coalescing import SingleFlight
+
+def test_identical_concurrent_calls_run_once():
+    """ Test to check concurrent calls with the same key share one run, and a different key runs on its own."""
+    calls: list[str] = []
+
+    async def answer(key: str) -> str:
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return f"answer to {key}"
+
+    async def run() -> tuple[list[str], dict[str, float]]:
+        flights: SingleFlight[str] = SingleFlight(timeout_seconds=1)
+        results = await asyncio.gather(*(flights.do(key, lambda key=key: answer(key)) for key in ["a"] * 5 + ["b"]))
+        return results, flights.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == ["answer to a"] * 5 + ["answer to b"]
+    assert sorted(calls) == ["a", "b"]
+    assert stats["flights"] == 2 and stats["coalesced"] == 4 and stats["in_flight"] == 0
+
+def test_errors_and_timeouts_reach_every_caller():
+    """ Test to check a failing or slow shared call raises in every waiting caller, and the key can be retried afterwards."""
+    async def fail() -> str:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def hang() -> str:
+        await asyncio.sleep(10)
+        return "too late"
+
+    async def run() -> SingleFlight[str]:
+        flights: SingleFlight[str] = SingleFlight(timeout_seconds=0.05)
+        failed = await asyncio.gather(*(flights.do("q", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in failed)
+        timed_out = await asyncio.gather(*(flights.do("q", hang) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, TimeoutError) for result in timed_out)
+
+        async def ok() -> str:
+            return "ok"
+        assert await flights.do("q", ok) == "ok"
+        return flights
+
+    stats = asyncio.run(run()).stats()
+    assert stats["errors"] == 2 and stats["timeouts"] == 1 and stats["flights"] == 3
+
+def test_late_stream_subscriber_gets_every_event():
+    """ Test to check a subscriber joining a running stream first gets the events already sent, then the rest."""
+    generated: list[int] = []
+
+    async def events():
+        for i in range(4):
+            generated.append(i)
+            yield f"event {i}"
+            await asyncio.sleep(0.01)
+
+    async def collect(flights: SingleFlight[str], delay: float) -> list[str]:
+        await asyncio.sleep(delay)
+        return [event async for event in flights.stream("q", events)]
+
+    async def run() -> list[list[str]]:
+        flights: SingleFlight[str] = SingleFlight(timeout_seconds=1)
+        return await asyncio.gather(collect(flights, 0), collect(flights, 0.025))
+
+    first, late = asyncio.run(run())
+    assert first == late == [f"event {i}" for i in range(4)]
+    assert generated == [0, 1, 2, 3]
+
+def test_stream_error_reaches_subscribers():
+    """ Test to check an exception in a shared stream is raised in its subscribers after the events sent before it."""
+    async def events():
+        yield "event 0"
+        raise RuntimeError("stream failed")
+
+    async def run() -> list[str]:
+        flights: SingleFlight[str] = SingleFlight()
+        received: list[str] = []
+        with pytest.raises(RuntimeError):
+            async for event in flights.stream("q", events):
+                received.append(event)
+        return received
+
+    assert asyncio.run(run()) == ["event 0"]
@@ -0,0 +1,42 @@
+"""
+Context packing test file
+Run from repo root: pytest
+"""
+
+from app.context import count_tokens, format_context, pack_context
+from app.ingestion import chunk_record
+
+def entry(source_id: str, text: str, score: float | None) -> dict:
+    return {"source_id": source_id, "text": text, "score": score}
+
+BAGGAGE = "Baggage Allowance\n\n" + " ".join(f"Economy passengers may bring bag number {i}." for i in range(30))
+
+def test_low_scores_are_cut_relative_to_the_top_result():
+    """ Test to check results far below the top score are dropped, and results without a score are kept."""
+    entries = [entry("a", "Title A\n\nfirst", 0.8), entry("b", "Title B\n\nsecond", 0.3), entry("c", "Title C\n\nthird", None)]
+    packed, stats = pack_context(entries, token_budget=1000, min_relative_score=0.5)
+    assert [item["source_id"] for item in packed] == ["a", "c"]
+    assert stats["chunks_before"] == 3 and stats["chunks_after"] == 2
+
+def test_overlapping_chunks_of_a_source_are_trimmed():
+    """ Test to check neighbouring chunks don't repeat their overlap, and a chunk inside another is dropped."""
+    title, content = BAGGAGE.split("\n\n", 1)
+    chunks = chunk_record({"id": "baggage_001", "title": title, "category": "baggage", "content": content}, chunk_size=400, overlap=100)
+    first, second = (entry("baggage_001", document, 0.9) for _, document, _ in chunks[:2])
+    contained = entry("baggage_001", f"{title}\n\n{content[50:150]}", 0.8)
+    packed, stats = pack_context([first, second, contained], token_budget=10000, min_relative_score=0.0)
+
+    assert len(packed) == 2
+    bodies = [item["text"].split("\n\n", 1)[1] for item in packed]
+    assert " ".join(bodies) == content[:chunks[1][2]["chunk_end"]]
+    assert stats["tokens_after"] < stats["tokens_before"]
+
+def test_context_fits_the_token_budget():
+    """ Test to check packed context stays within the budget, keeping a truncated top chunk rather than none."""
+    entries = [entry(f"doc_{i}", BAGGAGE, 0.9) for i in range(5)]
+    packed, stats = pack_context(entries, token_budget=300, min_relative_score=0.5)
+    assert stats["tokens_after"] <= 300
+    assert count_tokens(format_context(packed)) == stats["tokens_after"]
+
+    packed, _ = pack_context(entries, token_budget=20, min_relative_score=0.5)
+    assert len(packed) == 1 and packed[0]["source_id"] == "doc_0"
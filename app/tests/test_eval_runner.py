@@ -0,0 +1,87 @@
+"""
+Eval runner test file
+Run from repo root: pytest
+"""
+
+import asyncio
+import json
+from app import config
+from app.evaluation.eval import source_contexts
+from app.evaluation.runner import config_hash, load_recorded, pipeline_config, record_responses, recorded_for
+
+QUESTIONS = ["What is the customer support number?", "What is the baggage allowance?", "Can I change my flight?"]
+
+class FakePipeline:
+    """ Pipeline that answers with the question, fails once for `fail_on`, and tracks how many calls overlap."""
+    def __init__(self, fail_on: str | None = None):
+        self.fail_on = fail_on
+        self.calls: list[str] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, question: str) -> dict:
+        self.calls.append(question)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if question == self.fail_on:
+            self.fail_on = None
+            raise RuntimeError("upstream error")
+        return {"answer": f"answer to {question}", "sources": ["contact_001"], "confidence": 0.9}
+
+def test_record_responses_resumes_and_retries_failures(tmp_path):
+    """ Test to check recorded questions are skipped on the next run and failed ones are retried."""
+    path = str(tmp_path / "responses.jsonl")
+    pipeline = FakePipeline(fail_on=QUESTIONS[1])
+
+    stats = asyncio.run(record_responses(QUESTIONS, pipeline, path, "cfg", concurrency=2))
+    assert stats["recorded"] == 2 and stats["failed"] == 1
+    assert pipeline.max_running == 2
+
+    pipeline.calls.clear()
+    stats = asyncio.run(record_responses(QUESTIONS, pipeline, path, "cfg", concurrency=2))
+    assert pipeline.calls == [QUESTIONS[1]]
+    assert stats["already_recorded"] == 2 and stats["recorded"] == 1
+
+    records, missing = recorded_for(QUESTIONS, load_recorded(path), "cfg")
+    assert missing == []
+    assert [record["question"] for record in records] == QUESTIONS
+    assert all(record["latency_ms"] >= 10 for record in records)
+
+def test_responses_are_kept_per_config_and_truncated_lines_skipped(tmp_path):
+    """ Test to check another config doesn't reuse responses, and a half written last line is ignored."""
+    path = tmp_path / "responses.jsonl"
+    asyncio.run(record_responses(QUESTIONS[:1], FakePipeline(), str(path), "cfg_a"))
+    with open(path, "a") as f:
+        f.write('{"key": "trunc')
+
+    _, missing = recorded_for(QUESTIONS[:1], load_recorded(str(path)), "cfg_b")
+    assert missing == QUESTIONS[:1]
+    records, missing = recorded_for(QUESTIONS[:1], load_recorded(str(path)), "cfg_a")
+    assert missing == [] and records[0]["answer"] == f"answer to {QUESTIONS[0]}"
+
+def test_config_hash_changes_with_pipeline_settings():
+    """ Test to check a setting that changes answers (reranker on/off) gives a different config hash."""
+    settings = pipeline_config()
+    assert config_hash(settings) == config_hash(dict(settings))
+    assert config_hash(settings) != config_hash({**settings, "use_reranker": not settings["use_reranker"]})
+
+def test_config_hash_covers_guardrail_settings(monkeypatch):
+    """ Test to check changing the guardrail score gate gives a different config hash, so refusals aren't replayed across settings."""
+    before = config_hash()
+    monkeypatch.setattr(config, "GUARDRAIL_MIN_SCORE", config.GUARDRAIL_MIN_SCORE + 0.1)
+    assert config_hash() != before
+
+def test_config_hash_covers_context_packing_settings(monkeypatch):
+    """ Test to check changing the context token budget gives a different config hash, since it changes the prompt the LLM sees."""
+    before = config_hash()
+    monkeypatch.setattr(config, "CONTEXT_TOKEN_BUDGET", config.CONTEXT_TOKEN_BUDGET // 2)
+    assert config_hash() != before
+
+def test_source_contexts_come_from_the_configured_content(tmp_path):
+    """ Test to check the contexts RAGAS scores against are read from the given help content file (JSONL too), not the seed data."""
+    path = tmp_path / "content.jsonl"
+    path.write_text(json.dumps({"id": " custom_001 ", "category": "custom", "title": "Custom", "content": "Only in this file."}) + "\n")
+    assert source_contexts(str(path)) == {"custom_001": "Custom\n\nOnly in this file."}
+
@@ -0,0 +1,74 @@
+"""
+Streaming ingestion test file
+Run from repo root: pytest
+"""
+
+import json
+import httpx
+import openai
+from app.ingestion import chunk_record, chunk_spans, embed_with_retries, iter_records
+
+RECORDS = [
+    {"id": "baggage_001", "title": "Baggage", "category": "Baggage", "content": "One checked bag up to 23kg."},
+    {"id": "contact_001", "title": "Contact", "category": "contact", "content": "Call +44 344 874 7747, [open] 24/7."},
+]
+
+def test_iter_records_streams_json_array_and_jsonl(tmp_path):
+    """ Test to check both file formats give the same records, with a read size smaller than one record."""
+    array_path = tmp_path / "content.json"
+    array_path.write_text(json.dumps(RECORDS, indent=2))
+    jsonl_path = tmp_path / "content.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(record) for record in RECORDS) + "\n")
+
+    assert list(iter_records(str(array_path), read_size=7)) == RECORDS
+    assert list(iter_records(str(jsonl_path))) == RECORDS
+
+def test_chunk_spans_cover_text_with_overlap():
+    """ Test to check chunks respect the size limit, overlap their neighbour and together cover the whole text."""
+    text = " ".join(f"word{i}" for i in range(400))
+    spans = chunk_spans(text, chunk_size=300, overlap=60)
+
+    assert len(spans) > 1
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(end - start <= 300 for start, end in spans)
+    assert all(next_start < end for (_, end), (next_start, _) in zip(spans, spans[1:]))
+
+def test_chunk_record_keeps_parent_source_id_and_offsets():
+    """ Test to check short content keeps its id, long content gets chunk ids pointing back to the parent source id."""
+    short = chunk_record(RECORDS[0], chunk_size=1000, overlap=100)
+    assert [chunk_id for chunk_id, _, _ in short] == ["baggage_001"]
+    assert short[0][2]["category"] == "baggage"
+
+    long_record = dict(RECORDS[0], content=" ".join(["Bags over 32kg are not accepted."] * 50))
+    chunks = chunk_record(long_record, chunk_size=300, overlap=50)
+    assert [chunk_id for chunk_id, _, _ in chunks] == [f"baggage_001#{i}" for i in range(len(chunks))]
+    for _, document, metadata in chunks:
+        assert metadata["source_id"] == "baggage_001"
+        assert document.endswith(long_record["content"][metadata["chunk_start"]:metadata["chunk_end"]].strip())
+
+class FlakyEmbeddings:
+    """ Embeddings client that is rate limited for the first `failures` calls."""
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+        self.embeddings = self
+
+    def create(self, model, input):
+        self.calls += 1
+        if self.calls <= self.failures:
+            response = httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request("POST", "http://stub/v1/embeddings"))
+            raise openai.RateLimitError("rate limited", response=response, body=None)
+        return openai.types.CreateEmbeddingResponse(
+            object="list",
+            model=model,
+            data=[{"object": "embedding", "index": i, "embedding": [float(i)]} for i in range(len(input))],
+            usage={"prompt_tokens": 5, "total_tokens": 5},
+        )
+
+def test_embed_with_retries_recovers_from_rate_limits():
+    """ Test to check rate limited calls are retried and results come back in input order with token usage."""
+    client = FlakyEmbeddings(failures=2)
+    embeddings, tokens = embed_with_retries(client, ["a", "b"], max_retries=3, backoff_seconds=0)
+    assert embeddings == [[0.0], [1.0]]
+    assert tokens == 5
+    assert client.calls == 3
@@ -0,0 +1,76 @@
+"""
+Lexical (BM25) index test file
+Run from repo root: pytest
+"""
+
+from app.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+def make_index() -> BM25Index:
+    index = BM25Index()
+    index.upsert(
+        ["contact_001", "seating_001", "baggage_001"],
+        [
+            "Customer Service Contact. Call +44 344 874 7747 for UK customers.",
+            "Seat Selection. Exit row seats cost £35 and have age restrictions.",
+            "Baggage Allowance. One checked bag up to 23kg.",
+        ],
+        [
+            {"source_id": "contact_001", "category": "contact"},
+            {"source_id": "seating_001", "category": "seating"},
+            {"source_id": "baggage_001", "category": "baggage"},
+        ],
+    )
+    return index
+
+def test_tokenize_keeps_exact_terms():
+    """ Test to check phone prefixes, prices and units stay single tokens and stopwords are dropped."""
+    assert tokenize("What is the +44 number for 23kg bags at £35?") == ["+44", "number", "23kg", "bags", "£35"]
+
+def test_bm25_ranks_exact_term_match_first():
+    """ Test to check an exact term query ranks the matching document first with full coverage."""
+    results = make_index().search("exit row", top_k=3)
+    assert results[0]["source_id"] == "seating_001"
+    assert results[0]["coverage"] == 1.0
+    assert results[0]["score"] is None
+
+def test_bm25_category_filter_and_incremental_updates():
+    """ Test to check category filtering, and that upsert/delete only change the affected documents."""
+    index = make_index()
+    assert index.search("23kg", top_k=3, category="contact") == []
+
+    index.upsert(["contact_001"], ["Contact. Luggage up to 23kg at the desk."], [{"source_id": "contact_001", "category": "contact"}])
+    assert [r["source_id"] for r in index.search("23kg", top_k=3, category="contact")] == ["contact_001"]
+
+    index.delete(["baggage_001"])
+    assert len(index) == 2
+    assert all(r["source_id"] != "baggage_001" for r in index.search("23kg", top_k=3))
+
+def test_idf_is_recomputed_once_per_query_after_writes(monkeypatch):
+    """ Test to check a run of writes recomputes IDF once, on the next query, with the same scores as an index built in one go."""
+    built = make_index()
+    index = BM25Index()
+    for doc_id, text in [("contact_001", built._documents["contact_001"]), ("seating_001", built._documents["seating_001"]), ("baggage_001", built._documents["baggage_001"])]:
+        index.upsert([doc_id], [text], [built._metadatas[doc_id]])
+    index.upsert(["extra_001"], ["Extra legroom seats."], [{"source_id": "extra_001", "category": "seating"}])
+    index.delete(["extra_001"])
+
+    recomputes = 0
+    recompute = index._recompute_idf
+    def counting_recompute() -> None:
+        nonlocal recomputes
+        recomputes += 1
+        recompute()
+    monkeypatch.setattr(index, "_recompute_idf", counting_recompute)
+
+    assert index.search("exit row seats", top_k=3) == built.search("exit row seats", top_k=3)
+    assert index.max_score("exit row seats") == built.max_score("exit row seats")
+    assert recomputes == 1
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """ Test to check a result ranked well in both lists beats one ranked first in only one list."""
+    dense = [{"text": "a", "source_id": "a", "score": 0.9}, {"text": "b", "source_id": "b", "score": 0.8}]
+    lexical = [{"text": "c", "source_id": "c", "score": None}, {"text": "b", "source_id": "b", "score": None}]
+
+    fused = reciprocal_rank_fusion([dense, lexical], top_k=3)
+    assert fused[0]["source_id"] == "b"
+    assert fused[0]["score"] == 0.8 # dense cosine score is kept
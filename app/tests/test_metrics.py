@@ -0,0 +1,43 @@
+"""
+Metrics exposition test file
+Run from repo root: pytest
+"""
+
+from app.metrics import MetricsRegistry
+
+def test_counter_renders_labelled_samples():
+    """ Test to check counters add up per label set and render in the text format."""
+    registry = MetricsRegistry()
+    errors = registry.counter("test_errors_total", "Errors.", ("endpoint",))
+    errors.inc(endpoint="batch")
+    errors.inc(2, endpoint="batch")
+    errors.inc(endpoint="stream")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_errors_total counter" in lines
+    assert 'test_errors_total{endpoint="batch"} 3' in lines
+    assert 'test_errors_total{endpoint="stream"} 1' in lines
+
+def test_histogram_buckets_are_cumulative():
+    """ Test to check observations land in the right bucket, and bucket counts, sum and count are cumulative."""
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage="generate")
+
+    lines = registry.render().splitlines()
+    assert 'test_seconds_bucket{stage="generate",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="generate",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{stage="generate",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{stage="generate"} 3.65' in lines
+    assert 'test_seconds_count{stage="generate"} 4' in lines
+    assert latency.count(stage="generate") == 4
+
+def test_collectors_are_read_at_scrape_time():
+    """ Test to check collector samples reflect the value at render time."""
+    registry = MetricsRegistry()
+    state = {"ready": 0}
+    registry.register_collector("test_ready", "gauge", "Ready.", lambda: [("test_ready", {}, state["ready"])])
+    assert "test_ready 0" in registry.render().splitlines()
+    state["ready"] = 1
+    assert "test_ready 1" in registry.render().splitlines()
@@ -0,0 +1,169 @@
+"""
+Resilience layer test file, against the fault-injecting stub server
+Run from repo root: pytest
+"""
+
+import asyncio
+import openai
+import pytest
+from app.benchmarks import stub_openai
+from app.resilience import CircuitBreaker, CircuitOpenError, Overloaded, TokenBucket, Upstream
+
+STUB_PORT = 8931
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture(scope="module")
+def stub():
+    """ Fault-injecting OpenAI stub, failure settings are reset after every test."""
+    server = stub_openai.start_in_thread(STUB_PORT)
+    yield stub_openai
+    server.should_exit = True
+
+@pytest.fixture(autouse=True)
+def reset_stub(monkeypatch):
+    monkeypatch.setattr(stub_openai, "FAIL_NEXT", 0)
+    monkeypatch.setattr(stub_openai, "FAILURE_STATUS", 500)
+    monkeypatch.setattr(stub_openai, "CHAT_LATENCY_MS", 0)
+
+def make_upstream(**overrides) -> Upstream:
+    settings = {
+        "rates_per_minute": {}, "burst_seconds": 1.0, "max_in_flight": 8, "queue_timeout_seconds": 1.0,
+        "max_retries": 2, "backoff_seconds": 0.001, "max_backoff_seconds": 0.1, "breaker": CircuitBreaker(5, 30.0),
+    }
+    return Upstream(**{**settings, **overrides})
+
+def chat(client: openai.AsyncOpenAI):
+    return lambda: client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "hi"}], max_tokens=50)
+
+def run_with_client(test):
+    """Run test(client) on a fresh event loop with a non-retrying client pointed at the stub."""
+    async def run():
+        client = openai.AsyncOpenAI(api_key="stub", base_url=f"http://127.0.0.1:{STUB_PORT}/v1", max_retries=0)
+        try:
+            return await test(client)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+def test_token_bucket_allows_bursts_then_rejects_long_waits():
+    """ Test to check the bucket serves its burst at once, spaces later calls at the rate and rejects waits past max_wait."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock)
+    assert bucket.reserve(max_wait=0) == 0 and bucket.reserve(max_wait=0) == 0
+    with pytest.raises(Overloaded) as rejected:
+        bucket.reserve(max_wait=0.1)
+    assert rejected.value.reason == "rate_limit" and rejected.value.retry_after == pytest.approx(0.5)
+    assert rejected.value.retry_after_header() == "1"
+    assert bucket.reserve(max_wait=1) == pytest.approx(0.5) # reserved ahead, the next caller queues behind it
+    assert bucket.reserve(max_wait=1) == pytest.approx(1.0)
+    clock.now = 10
+    assert bucket.reserve(max_wait=0) == 0
+    assert TokenBucket(rate=0, capacity=0).reserve(max_wait=0) == 0 # no quota configured
+
+def test_circuit_breaker_opens_probes_and_closes():
+    """ Test to check the breaker opens after consecutive failures, lets a single probe through after the reset time, and closes on success."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_success() # not consecutive
+    breaker.record_failure()
+    assert breaker.before_call() is False and breaker.state == "closed"
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 10
+    assert breaker.before_call() is True # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call() # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.opened == 2
+
+    clock.now = 20
+    assert breaker.before_call() is True
+    breaker.release_probe() # probe never sent, the next call probes instead
+    assert breaker.before_call() is True
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.before_call() is False
+
+def test_transient_failures_are_retried(stub):
+    """ Test to check 500s and 429s (with Retry-After) from the stub are retried until the call succeeds, and 429s don't count as breaker failures."""
+    upstream = make_upstream()
+    before = stub.request_counts["chat"]
+    stub.FAIL_NEXT = 2
+    completion = run_with_client(lambda client: upstream.call("chat", chat(client)))
+    assert completion.choices[0].message.content
+    assert stub.request_counts["chat"] - before == 3
+
+    stub.FAILURE_STATUS = 429
+    stub.FAIL_NEXT = 3 # one more than max_retries
+    with pytest.raises(openai.RateLimitError):
+        run_with_client(lambda client: upstream.call("chat", chat(client)))
+    assert upstream.breaker.failures == 0 and upstream.breaker.state == "closed"
+
+def test_rate_limits_never_open_the_circuit(stub):
+    """ Test to check a run of 429s longer than the failure threshold is retried without opening the circuit."""
+    upstream = make_upstream(max_retries=5, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=30))
+    stub.FAILURE_STATUS = 429
+    stub.FAIL_NEXT = 4
+    assert run_with_client(lambda client: upstream.call("chat", chat(client))).choices[0].message.content
+    assert upstream.breaker.state == "closed" and upstream.breaker.opened == 0
+
+def test_stream_holds_its_slot_until_read(stub):
+    """ Test to check a streamed answer keeps its in-flight slot while tokens are read, and frees it once the stream is done."""
+    upstream = make_upstream(max_in_flight=1, queue_timeout_seconds=0.05)
+
+    async def stream_and_call(client):
+        open_stream = lambda: client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "hi"}], max_tokens=50, stream=True)
+        async with upstream.stream("chat", open_stream) as stream:
+            assert upstream.in_flight == 1
+            with pytest.raises(Overloaded):
+                await upstream.call("chat", chat(client))
+            chunks = [chunk async for chunk in stream]
+        assert chunks and upstream.in_flight == 0
+        return await upstream.call("chat", chat(client))
+    assert run_with_client(stream_and_call).choices[0].message.content
+
+def test_degraded_upstream_opens_the_circuit(stub):
+    """ Test to check repeated failures open the circuit, after which calls fail fast without reaching the stub, and a probe closes it again."""
+    upstream = make_upstream(max_retries=5, breaker=CircuitBreaker(failure_threshold=3, reset_seconds=0.2))
+    before = stub.request_counts["chat"]
+    stub.FAIL_NEXT = 100
+    with pytest.raises(CircuitOpenError):
+        run_with_client(lambda client: upstream.call("chat", chat(client)))
+    assert stub.request_counts["chat"] - before == 3 # retries stop once the circuit opens
+    with pytest.raises(CircuitOpenError):
+        run_with_client(lambda client: upstream.call("chat", chat(client)))
+    assert stub.request_counts["chat"] - before == 3
+
+    stub.FAIL_NEXT = 0
+    async def after_reset(client):
+        await asyncio.sleep(0.25)
+        return await upstream.call("chat", chat(client))
+    assert run_with_client(after_reset).choices[0].message.content
+    assert upstream.breaker.state == "closed"
+
+def test_excess_load_is_rejected_fast(stub):
+    """ Test to check calls beyond the in-flight limit or the rate limit are rejected as overloaded instead of queueing."""
+    stub.CHAT_LATENCY_MS = 300
+    upstream = make_upstream(max_in_flight=1, queue_timeout_seconds=0.05)
+
+    async def two_at_once(client):
+        return await asyncio.gather(upstream.call("chat", chat(client)), upstream.call("chat", chat(client)), return_exceptions=True)
+    results = run_with_client(two_at_once)
+    rejected = [result for result in results if isinstance(result, Overloaded)]
+    assert len(rejected) == 1 and rejected[0].reason == "queue_timeout"
+    assert upstream.in_flight == 0 and upstream.breaker.state == "closed"
+
+    stub.CHAT_LATENCY_MS = 0
+    upstream = make_upstream(rates_per_minute={"chat": 60}, burst_seconds=1.0, queue_timeout_seconds=0.1)
+    async def burst(client):
+        return await asyncio.gather(*(upstream.call("chat", chat(client)) for _ in range(3)), return_exceptions=True)
+    results = run_with_client(burst)
+    assert [type(result).__name__ for result in results].count("Overloaded") == 2 # one token, refilled once a second
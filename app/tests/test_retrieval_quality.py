@@ -0,0 +1,36 @@
+"""
+Retrieval quality benchmark test file
+Run from repo root: pytest
+"""
+
+import pytest
+from app import config
+from app.benchmarks.retrieval_quality import build_store, evaluate_config, load_embedder, load_labels, ndcg_at_k, ranked_sources, recall_at_k, reciprocal_rank
+
+def test_ranking_metrics():
+    """ Test to check recall@k, MRR and nDCG@k on a ranking with the relevant source second."""
+    ranked = ranked_sources([{"source_id": "a"}, {"source_id": "b"}, {"source_id": "b"}, {"source_id": "c"}])
+    assert ranked == ["a", "b", "c"]
+    assert recall_at_k(ranked, {"b"}, 1) == 0.0
+    assert recall_at_k(ranked, {"b", "d"}, 3) == 0.5
+    assert reciprocal_rank(ranked, {"b"}) == 0.5
+    assert reciprocal_rank(ranked, {"d"}) == 0.0
+    assert ndcg_at_k(["b", "a"], {"b"}, 3) == 1.0
+    assert ndcg_at_k(ranked, {"b"}, 3) == pytest.approx(0.6309, abs=1e-4)
+
+def test_labelled_queries_are_retrieved_offline(monkeypatch, tmp_path):
+    """ Test to check the labelled queries find their sources with no network (regression gate for retrieval changes)."""
+    monkeypatch.setattr(config, "OPENAI_API_KEY", config.OPENAI_API_KEY or "offline-test")
+    monkeypatch.setattr(config, "RETRIEVER_BACKEND", "numpy")
+    monkeypatch.setattr(config, "NUMPY_INDEX_PATH", str(tmp_path / "numpy_index"))
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_PATH", None)
+
+    labels = load_labels()
+    embed, _ = load_embedder(None)
+    vs = build_store("numpy", embed)
+    for label in labels:
+        vs.embedding_cache.put(vs._embedding_cache_key(label["query"]), embed(label["query"]))
+
+    result = evaluate_config(vs, labels, ks=[5], use_category=True)
+    assert result["recall@5"] >= 0.95
+    assert result["mrr"] >= 0.9
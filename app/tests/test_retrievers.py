@@ -0,0 +1,185 @@
+"""
+Retriever backend test file
+Run from repo root: pytest
+"""
+
+import os
+import numpy as np
+import pytest
+from app.benchmarks.synthetic import make_corpus, make_queries
+from app.retrievers import ChromaRetriever, NumpyRetriever, PartitionedRetriever, SharedIndexRetriever, create_backend, quantize, write_shared_index
+
+def make_retriever(path=None) -> NumpyRetriever:
+    retriever = NumpyRetriever(path=path)
+    retriever.upsert(
+        ids=["a", "b", "c"],
+        documents=["doc a", "doc b", "doc c"],
+        metadatas=[
+            {"source_id": "a", "category": "baggage"},
+            {"source_id": "b", "category": "baggage"},
+            {"source_id": "c", "category": "contact"},
+        ],
+        embeddings=[[1.0, 0.0, 0.0], [0.8, 0.6, 0.0], [0.0, 0.0, 1.0]],
+    )
+    return retriever
+
+def test_numpy_query_returns_exact_top_k_in_score_order():
+    """ Test to check results are ordered by cosine similarity and limited to top_k."""
+    results = make_retriever().query([[1.0, 0.1, 0.0]], top_k=2)[0]
+    assert [r["source_id"] for r in results] == ["a", "b"]
+    assert results[0]["score"] >= results[1]["score"]
+    assert set(results[0].keys()) == {"text", "source_id", "score"}
+
+def test_numpy_query_category_filter():
+    """ Test to check category filtering only returns rows from that category."""
+    retriever = make_retriever()
+    results = retriever.query([[1.0, 0.0, 0.0]], top_k=5, category="contact")[0]
+    assert [r["source_id"] for r in results] == ["c"]
+    assert retriever.query([[1.0, 0.0, 0.0]], top_k=5, category="missing")[0] == []
+
+def test_numpy_upsert_replaces_and_delete_removes():
+    """ Test to check upsert replaces an existing id and delete removes it from search and categories."""
+    retriever = make_retriever()
+    retriever.upsert(["a"], ["doc a v2"], [{"source_id": "a", "category": "meals"}], [[0.0, 1.0, 0.0]])
+    assert retriever.count() == 3
+    assert retriever.categories() == {"baggage", "contact", "meals"}
+
+    retriever.delete(["c"])
+    assert retriever.count() == 2
+    assert "contact" not in retriever.categories()
+    assert all(r["source_id"] != "c" for r in retriever.query([[0.0, 0.0, 1.0]], top_k=5)[0])
+
+def test_chroma_categories_are_kept_without_rescanning(tmp_path):
+    """ Test to check Chroma categories grow with upserts, and a category emptied by a move is dropped at flush or delete."""
+    retriever = ChromaRetriever(path=str(tmp_path))
+    retriever.upsert(["a", "b"], ["doc a", "doc b"], [{"source_id": "a", "category": "baggage"}, {"source_id": "b", "category": "contact"}], [[1.0, 0.0], [0.0, 1.0]])
+    assert retriever.categories() == {"baggage", "contact"}
+    retriever.upsert(["a"], ["doc a v2"], [{"source_id": "a", "category": "contact"}], [[1.0, 0.0]])
+    assert "contact" in retriever.categories()
+    retriever.flush()
+    assert retriever.categories() == {"contact"}
+    retriever.delete(["b"])
+    assert retriever.categories() == {"contact"} and retriever.count() == 1
+
+def test_numpy_index_persists(tmp_path):
+    """ Test to check the index is written to disk by flush (not per upsert) and reloaded from it."""
+    retriever = make_retriever(path=str(tmp_path))
+    assert not os.path.exists(tmp_path / "vectors.npy")
+    retriever.flush()
+    reloaded = NumpyRetriever(path=str(tmp_path))
+    assert reloaded.count() == 3
+    assert reloaded.get_metadatas()["c"]["category"] == "contact"
+
+def test_shared_index_is_memory_mapped_and_matches_numpy(tmp_path):
+    """ Test to check the shared index returns the same results as the index it was built from, from read-only mapped files."""
+    source = make_retriever()
+    write_shared_index(str(tmp_path), source, "test-embedding-model")
+    shared = SharedIndexRetriever(str(tmp_path))
+
+    assert isinstance(shared._vectors, np.memmap) and not shared._vectors.flags.writeable
+    assert shared.manifest["rows"] == 3 and shared.manifest["categories"] == ["baggage", "contact"]
+    for category in (None, "baggage", "contact"):
+        assert shared.query([[1.0, 0.2, 0.1]], top_k=3, category=category) == source.query([[1.0, 0.2, 0.1]], top_k=3, category=category)
+    with pytest.raises(RuntimeError):
+        shared.upsert(["d"], ["doc d"], [{"source_id": "d"}], [[1.0, 0.0, 0.0]])
+
+def test_shared_index_rebuild_switches_current_and_keeps_open_readers(tmp_path):
+    """ Test to check a rebuild becomes current for new readers, old builds are pruned, and an open reader keeps working."""
+    source = make_retriever()
+    write_shared_index(str(tmp_path), source, "test-embedding-model")
+    old_reader = SharedIndexRetriever(str(tmp_path))
+
+    source.delete(["c"])
+    for _ in range(2):
+        write_shared_index(str(tmp_path), source, "test-embedding-model", keep_builds=2)
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("build-")]) == 2
+    assert not os.path.exists(old_reader.build_path) # pruned while still open
+    assert SharedIndexRetriever(str(tmp_path)).count() == 2
+    assert old_reader.query([[0.0, 0.0, 1.0]], top_k=1)[0][0]["text"] == "doc c"
+
+def test_shared_index_missing_raises(tmp_path):
+    """ Test to check opening a path without a build fails with a hint instead of serving an empty index."""
+    with pytest.raises(RuntimeError, match="--build-shared-index"):
+        SharedIndexRetriever(str(tmp_path))
+
+def test_quantized_search_rescoring_matches_float32(tmp_path):
+    """ Test to check float16/int8 search returns the float32 top-k with float32 scores, and keeps the float32 vectors on disk."""
+    corpus = make_corpus(2000, dim=64, num_categories=3)
+    queries, _ = make_queries(corpus, 20)
+    exact = NumpyRetriever()
+    exact.upsert(corpus["ids"], corpus["documents"], corpus["metadatas"], corpus["embeddings"].tolist())
+
+    for precision in ("float16", "int8"):
+        quantized = NumpyRetriever(path=str(tmp_path / precision), precision=precision)
+        quantized.upsert(corpus["ids"], corpus["documents"], corpus["metadatas"], corpus["embeddings"].tolist())
+        quantized.flush()
+        assert isinstance(quantized._vectors, np.memmap)
+        assert quantized._codes.nbytes == exact._vectors.nbytes // (2 if precision == "float16" else 4)
+        for category in (None, "category_2"):
+            expected = exact.query(queries.tolist(), top_k=5, category=category)
+            found = quantized.query(queries.tolist(), top_k=5, category=category)
+            for expected_rows, found_rows in zip(expected, found):
+                assert [r["source_id"] for r in found_rows] == [r["source_id"] for r in expected_rows]
+                assert [r["score"] for r in found_rows] == pytest.approx([r["score"] for r in expected_rows], abs=1e-6)
+
+def test_int8_quantization_error_is_small():
+    """ Test to check int8 codes times the per-vector scale reconstruct unit vectors closely, including all-zero vectors."""
+    vectors = NumpyRetriever._normalise(np.random.default_rng(0).standard_normal((100, 256)).astype(np.float32))
+    vectors[0] = 0.0
+    codes, scales = quantize(vectors, "int8")
+    assert codes.dtype == np.int8 and scales.shape == (100,)
+    assert np.abs(codes * scales[:, None] - vectors).max() <= scales.max() / 2 + 1e-6
+
+def test_shared_index_maps_prebuilt_quantized_vectors(tmp_path):
+    """ Test to check the shared index serves int8 search from the quantized file written by the builder."""
+    write_shared_index(str(tmp_path), make_retriever(), "test-embedding-model")
+    shared = SharedIndexRetriever(str(tmp_path), precision="int8")
+    assert isinstance(shared._codes, np.memmap) and shared._codes.dtype == np.int8
+    assert [r["source_id"] for r in shared.query([[1.0, 0.1, 0.0]], top_k=2)[0]] == ["a", "b"]
+
+def test_partitioned_category_queries_match_filtered_search():
+    """ Test to check category queries are answered by their partition with the same results as a filtered global search."""
+    filtered = make_retriever()
+    ids, documents, metadatas, vectors = filtered.export()
+    partitioned = create_backend("numpy", None, partitioned=True)
+    partitioned.upsert(ids, documents, metadatas, vectors.tolist())
+
+    assert partitioned.categories() == {"baggage", "contact"}
+    assert partitioned.partitions["contact"].count() == 1
+    for category in (None, "baggage", "contact"):
+        assert partitioned.query([[0.9, 0.3, 0.1]], top_k=3, category=category) == filtered.query([[0.9, 0.3, 0.1]], top_k=3, category=category)
+    assert partitioned.query([[1.0, 0.0, 0.0]], top_k=3, category="missing") == [[]]
+
+def test_partitioned_moves_and_deletes_keep_registry_in_sync():
+    """ Test to check a row changing category moves partition, and a partition emptied by deletes leaves the registry."""
+    partitioned = create_backend("numpy", None, partitioned=True)
+    partitioned.upsert(["a", "b"], ["doc a", "doc b"], [{"source_id": "a", "category": "baggage"}, {"source_id": "b", "category": "contact"}], [[1.0, 0.0], [0.0, 1.0]])
+    partitioned.upsert(["a"], ["doc a v2"], [{"source_id": "a", "category": "contact"}], [[1.0, 0.0]])
+    assert partitioned.categories() == {"contact"}
+    assert [r["text"] for r in partitioned.query([[1.0, 0.0]], top_k=2, category="contact")[0]] == ["doc a v2", "doc b"]
+
+    partitioned.delete(["a", "b"])
+    assert partitioned.categories() == set() and partitioned.count() == 0
+
+def test_partitions_are_rebuilt_from_existing_global_index(tmp_path):
+    """ Test to check opening a global index that was built without partitions fills them from it, without new embeddings."""
+    make_retriever(path=str(tmp_path)).flush()
+    partitioned = create_backend("numpy", str(tmp_path), partitioned=True)
+    assert isinstance(partitioned, PartitionedRetriever)
+    assert partitioned.categories() == {"baggage", "contact"}
+    assert [r["source_id"] for r in partitioned.query([[1.0, 0.0, 0.0]], top_k=5, category="baggage")[0]] == ["a", "b"]
+    # Partitions are persisted next to the global index, so the next start has nothing to repair
+    assert NumpyRetriever(path=str(tmp_path / "partitions" / os.listdir(tmp_path / "partitions")[0])).count() > 0
+def test_partitioned_writes_are_persisted_by_flush(tmp_path, capsys):
+    """ Test to check partitioned writes reach disk at flush, and reopening finds the partitions in sync with nothing to repair."""
+    partitioned = create_backend("numpy", str(tmp_path), partitioned=True)
+    ids, documents, metadatas, vectors = make_retriever().export()
+    partitioned.upsert(ids, documents, metadatas, vectors.tolist())
+    assert not os.path.exists(tmp_path / "partitions")
+    partitioned.flush()
+
+    reopened = create_backend("numpy", str(tmp_path), partitioned=True)
+    assert reopened.categories() == {"baggage", "contact"}
+    assert "repaired" not in capsys.readouterr().out
+    assert [r["source_id"] for r in reopened.query([[1.0, 0.0, 0.0]], top_k=5, category="baggage")[0]] == ["a", "b"]
+
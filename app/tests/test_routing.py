@@ -0,0 +1,51 @@
+"""
+Model routing test file
+Run from repo root: pytest
+"""
+
+import pytest
+from app import config
+from app.routing import DEFAULT_RULES, choose_route, collect_route, route_for, route_signals, validate_rules
+
+def result(source_id: str, score: float | None, text: str = "Baggage\n\nOne checked bag up to 23kg.") -> dict:
+    return {"source_id": source_id, "score": score, "text": text}
+
+def test_default_rules_route_on_retrieval_signals():
+    """ Test to check single close source lookups get the small model, multi-source questions the bigger budget, and the rest the default."""
+    rules = validate_rules(DEFAULT_RULES)
+    lookup = route_signals([result("contact_001", 0.71), result("contact_001", 0.52)])
+    assert lookup == {"top_score": 0.71, "sources": 1, "context_tokens": lookup["context_tokens"]}
+    assert choose_route(lookup, rules)["name"] == "lookup"
+    assert choose_route(route_signals([result("a", 0.6), result("b", 0.5), result("c", 0.4)]), rules)["name"] == "multi_source"
+    assert choose_route(route_signals([result("a", 0.45)]), rules)["name"] == "default" # not close enough for the small model
+    assert choose_route(route_signals([result("a", None)]), rules)["name"] == "default" # unknown score never passes a score condition
+    assert choose_route(route_signals([result("a", 0.9, "word " * 3000)]), rules)["name"] == "default" # context too big
+
+def test_rules_are_validated():
+    """ Test to check rules get CHAT_MODEL / MAX_TOKENS when they don't set them, and bad rules or forced routes are rejected."""
+    rules = validate_rules([{"name": "only"}])
+    assert rules == [{"name": "only", "model": config.CHAT_MODEL, "max_tokens": config.MAX_TOKENS}]
+    with pytest.raises(ValueError):
+        validate_rules([{"name": "short", "min_score": 0.5}])
+    with pytest.raises(ValueError):
+        validate_rules([{"name": "same"}, {"name": "same"}])
+    with pytest.raises(ValueError):
+        choose_route({}, rules, force="missing")
+
+def test_route_for_follows_settings_and_is_collected(monkeypatch):
+    """ Test to check routing can be turned off or forced onto one rule, and the chosen route is reported to collect_route."""
+    results = [result("contact_001", 0.8)]
+    monkeypatch.setattr(config, "MODEL_ROUTING", True)
+    monkeypatch.setattr(config, "ROUTING_FORCE_ROUTE", None)
+    with collect_route() as chosen:
+        route = route_for(results)
+    assert chosen == {"route": route["name"], "model": route["model"]}
+
+    monkeypatch.setattr(config, "ROUTING_FORCE_ROUTE", "multi_source")
+    assert route_for(results)["name"] == "multi_source"
+
+    monkeypatch.setattr(config, "MODEL_ROUTING", False)
+    assert route_for(results) == {"name": "default", "model": config.CHAT_MODEL, "max_tokens": config.MAX_TOKENS}
+    with collect_route() as chosen:
+        pass
+    assert chosen == {}
@@ -0,0 +1,41 @@
+"""
+Stage timing test file
+Run from repo root: pytest
+"""
+
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.timing import StageTimingMiddleware, parse_server_timing, server_timing_header, stage
+
+def make_app() -> FastAPI:
+    timed_app = FastAPI()
+    timed_app.add_middleware(StageTimingMiddleware)
+
+    @timed_app.get("/work")
+    async def work() -> dict:
+        with stage("retrieve"):
+            time.sleep(0.01)
+        with stage("generate"):
+            pass
+        return {"ok": True}
+
+    return timed_app
+
+def test_server_timing_header_round_trip():
+    """ Test to check the header format parses back to the same stage timings."""
+    timings = {"embed": 52.1, "retrieve": 3.4}
+    assert parse_server_timing(server_timing_header(timings)) == timings
+
+def test_middleware_reports_stages_and_total():
+    """ Test to check every stage run by the request is reported, and total covers them."""
+    response = TestClient(make_app()).get("/work")
+    timings = parse_server_timing(response.headers["server-timing"])
+    assert list(timings) == ["retrieve", "generate", "total"]
+    assert timings["retrieve"] >= 10
+    assert timings["total"] >= timings["retrieve"]
+
+def test_stage_outside_a_request_is_a_no_op():
+    """ Test to check stage() can be used from scripts without a request in progress."""
+    with stage("retrieve"):
+        pass
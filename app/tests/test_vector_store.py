@@ -3,6 +3,10 @@ Chroma vector store test file
 Run from repo root: pytest
 """
 
+import asyncio
+import time
+from app import config
+from app.guardrails import check_results
 from app.vector_store import VectorStoreService
 
 def test_vector_store_initialisation():
@@ -18,6 +22,17 @@ def test_load_help_content_works():
     count = vs.collection.count()
     assert count > 0
 
+def test_load_help_content_skips_unchanged_documents():
+    """ Test to check a second ingestion of the same content re-embeds nothing."""
+    vs = VectorStoreService()
+    vs.load_help_content()
+
+    report = vs.load_help_content()
+    assert report["added"] == []
+    assert report["updated"] == []
+    assert report["deleted"] == []
+    assert len(report["unchanged"]) == vs.collection.count()
+
 def test_get_category_list_sorted_and_lowercase():
     """ Test to check category list is sorted and lowercase."""
     vs = VectorStoreService()
@@ -88,4 +103,70 @@ def test_search_with_very_large_top_k():
     vs.load_help_content()
 
     results = vs.search("What is the customer support number?", top_k=1000000)
-    assert isinstance(results, list)
\ No newline at end of file
+    assert isinstance(results, list)
+
+def test_async_search_matches_search_shape():
+    """ Test to check async search returns the same result shape as search."""
+    vs = VectorStoreService()
+    vs.load_help_content()
+
+    results = asyncio.run(vs.asearch("What is the customer support number?", top_k=3))
+    assert isinstance(results, list)
+    for r in results:
+        assert set(r.keys()) == {"text", "source_id", "score"}
+
+
+class FakeCrossEncoder:
+    """ Stand-in cross-encoder that scores longer texts higher, optionally slowly."""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def predict(self, pairs):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [float(len(text)) for _, text in pairs]
+
+RERANK_INPUT = [
+    {"text": "short", "source_id": "a", "score": 0.9},
+    {"text": "a much longer chunk", "source_id": "b", "score": 0.8},
+]
+
+def test_rerank_results_uses_pair_score_cache():
+    """ Test to check reranking reorders results and repeated queries reuse cached pair scores."""
+    vs = VectorStoreService()
+    vs._reranker = FakeCrossEncoder()
+
+    first = vs.rerank_results("What is the baggage allowance?", RERANK_INPUT)
+    second = vs.rerank_results("what is the baggage allowance", RERANK_INPUT)
+    assert [r["source_id"] for r in first] == ["b", "a"]
+    assert second == first
+    assert vs._reranker.calls == 1
+
+def test_rerank_results_falls_back_to_vector_order_over_budget(monkeypatch):
+    """ Test to check vector order is returned when the cross-encoder exceeds the latency budget."""
+    monkeypatch.setattr(config, "RERANK_BUDGET_MS", 10)
+    vs = VectorStoreService()
+    vs._reranker = FakeCrossEncoder(delay=0.2)
+
+    results = vs.rerank_results("What is the baggage allowance?", RERANK_INPUT)
+    assert [r["source_id"] for r in results] == ["a", "b"]
+    assert vs.rerank_fallbacks == 1
+
+def test_lexical_fast_path_results_are_scored(monkeypatch):
+    """ Test to check fast path results carry a 0-1 score (normalised BM25) for confidence, and the cosine score gate skips them."""
+    vs = VectorStoreService()
+    vs.use_lexical_fast_path = True
+    vs.lexical_index.upsert(
+        ["contact_001", "seating_001", "baggage_001"],
+        ["Contact. Call +44 344 874 7747.", "Seat Selection. Exit row seats cost £35.", "Baggage. One checked bag up to 23kg, seats not included."],
+        [{"source_id": "contact_001", "category": "contact"}, {"source_id": "seating_001", "category": "seating"}, {"source_id": "baggage_001", "category": "baggage"}],
+    )
+    results = vs.lexical_fast_path("exit row seats")
+    assert results[0]["source_id"] == "seating_001"
+    assert 0 < results[0]["score"] <= 1
+    assert all(0 <= r["score"] < results[0]["score"] for r in results[1:])
+
+    monkeypatch.setattr(config, "GUARDRAIL_MIN_SCORE", 0.99)
+    assert check_results(results) is None
+
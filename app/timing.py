@@ -0,0 +1,84 @@
+"""
+Per-request stage timings.
+Handlers wrap each stage in `with stage("retrieve"):`. Every stage is observed in the help_assistant_stage_seconds histogram,
+and the timings of the current request are collected in a context variable and returned in a Server-Timing response header,
+e.g. `embed;dur=52.1, retrieve;dur=3.4, generate;dur=803.2, total;dur=861.0`.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from app.metrics import HTTP_REQUESTS, STAGE_SECONDS
+
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block, observe it in the stage histogram and add it (in ms) to the current request's timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed * 1000
+
+
+@contextmanager
+def collect_timings() -> Iterator[dict[str, float]]:
+    """Collect the stage timings (in ms) of everything run inside the block, e.g. one pipeline call outside HTTP."""
+    timings: dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def server_timing_header(timings: dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings.items())
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """Inverse of server_timing_header, used by the benchmarks."""
+    timings: dict[str, float] = {}
+    for part in filter(None, (part.strip() for part in header.split(","))):
+        name, _, duration = part.partition(";dur=")
+        timings[name] = float(duration) if duration else 0.0
+    return timings
+
+
+class StageTimingMiddleware:
+    """
+    ASGI middleware that starts a timings dict per HTTP request, adds the Server-Timing header to the response
+    and counts requests per route and status code.
+    Streaming responses send their headers first, so they only report the stages finished before the stream started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_timings() as timings:
+            start = time.perf_counter()
+
+            async def send_with_timings(message):
+                if message["type"] == "http.response.start":
+                    timings["total"] = (time.perf_counter() - start) * 1000
+                    # Route template (not the raw path) so unknown URLs can't create unbounded label values
+                    route = scope.get("route")
+                    HTTP_REQUESTS.inc(route=getattr(route, "path", "unmatched"), status=str(message["status"]))
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing_header(timings).encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timings)
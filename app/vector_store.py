@@ -38,13 +38,21 @@ class VectorStoreService:
         pass
 """
 
-import chromadb
-from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
-import os
-from dotenv import load_dotenv
-from app.data import help_content
+import asyncio
+import concurrent.futures
+import hashlib
+from typing import Iterable
+from openai import AsyncOpenAI, OpenAI
+from app import config
+from app.batching import MicroBatcher
+from app.cache import LRUTTLCache, SemanticAnswerCache, normalize_query
+from app.ingestion import Chunk, IngestProgress, embed_with_retries, iter_chunks, iter_records
+from app.lexical import BM25Index, reciprocal_rank_fusion
+from app.metrics import FALLBACKS
+from app.resilience import Upstream, create_upstream
+from app.retrievers import RetrieverBackend, create_backend
+from app.timing import stage
 
-load_dotenv()
 
 class VectorStoreService:
     """
@@ -52,96 +60,249 @@ class VectorStoreService:
     
     Candidates should implement this class with their chosen vector database.
 
-    Chosen Vector DB - Chroma
+    Chosen Vector DB - Chroma (default), or the in-process NumPy exact search backend.
+    Storage and search go through a RetrieverBackend (app/retrievers.py), selected with RETRIEVER_BACKEND.
     """
     
     def __init__(self):
         # TODO: Initialize vector store (ChromaDB, FAISS, etc.)
         # Get OpenAi key from .env file
-        api_key = os.getenv("OPENAI_API_KEY")
+        api_key = config.OPENAI_API_KEY
         if not api_key:
             raise RuntimeError("No OpenAI key set. Enter key into .env file")
         
-        # Category set for validation later
-        self._categories: set[str] = set()
-
         # Optional reranker
         self._reranker = None # reranker model
-        self.use_reranker: bool = False # reranker switch
-
-        self.client = chromadb.PersistentClient(path="./chroma_data")
-        self.collection = self.client.get_or_create_collection(
-            name="help_content",
-            embedding_function=OpenAIEmbeddingFunction(
-                model_name="text-embedding-3-small",
-                api_key=api_key
-            ),
-            # Chroma defaults to squared L2 distance, switching to cosine distances (which is 1 - cosine similarity in chroma, so lower is better)
-            configuration={
-                "hnsw": {"space": "cosine"} 
-            }
-            )
+        self.use_reranker: bool = config.USE_RERANKER # reranker switch
+        self.rerank_cache: LRUTTLCache[float] = LRUTTLCache(max_size=config.RERANK_CACHE_SIZE) # (query, chunk) -> cross-encoder score
+        self.rerank_fallbacks: int = 0 # times the latency budget ran out and vector order was returned
+        # One worker, cross-encoder calls are CPU bound so running several at once only slows each one down
+        self._rerank_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+
+        # Cross-request micro-batching of query embeddings and rerank pair scoring
+        self.embedding_batcher: MicroBatcher[str, list[float]] | None = None
+        self.rerank_batcher: MicroBatcher[tuple[str, str, str], float] | None = None
+        if config.MICRO_BATCHING:
+            self.embedding_batcher = MicroBatcher(self._embed_batch, max_batch_size=config.MICRO_BATCH_MAX_SIZE, max_wait_ms=config.MICRO_BATCH_WINDOW_MS)
+            self.rerank_batcher = MicroBatcher(self._score_pair_batch, max_batch_size=config.MICRO_BATCH_MAX_SIZE, max_wait_ms=config.MICRO_BATCH_WINDOW_MS)
+
+        # Shared async client for query embeddings, set by the FastAPI lifespan (created on first use otherwise)
+        self.async_client: AsyncOpenAI | None = None
+        # Rate limits, retries and circuit breaker shared with the chat calls, set by app/main.py (created on first use otherwise)
+        self.upstream: Upstream | None = None
+
+        # Query embeddings are cached so repeated questions skip the embeddings API call
+        self.embedding_cache: LRUTTLCache[list[float]] = LRUTTLCache(
+            max_size=config.EMBEDDING_CACHE_SIZE,
+            ttl_seconds=config.EMBEDDING_CACHE_TTL_SECONDS
+        )
+        if config.EMBEDDING_CACHE_PATH:
+            self.embedding_cache.load(config.EMBEDDING_CACHE_PATH)
+
+        # Full answer cache, lives here so re-ingesting a source can invalidate answers built from it
+        self.answer_cache: SemanticAnswerCache | None = SemanticAnswerCache(
+            max_size=config.ANSWER_CACHE_SIZE,
+            similarity_threshold=config.ANSWER_CACHE_SIMILARITY
+        ) if config.ANSWER_CACHE_ENABLED else None
+
+        # Imported here, chromadb is slow to import and only needed once the service is built
+        from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+        self.embedding_function = OpenAIEmbeddingFunction(
+            model_name=config.EMBEDDING_MODEL,
+            api_key=api_key,
+            api_base=config.OPENAI_BASE_URL
+        )
+
+        # Blocking client for ingestion embeddings (created on first ingestion) and the last run's throughput
+        self._ingest_client: OpenAI | None = None
+        self.ingest_stats: dict[str, float] = {}
+
+        # BM25 index over the same documents, rebuilt incrementally by load_help_content
+        self.lexical_index = BM25Index()
+        self.use_hybrid: bool = config.HYBRID_SEARCH # fuse BM25 and dense rankings in search
+        self.use_lexical_fast_path: bool = config.LEXICAL_FAST_PATH
+
+        backend_path = {"chroma": config.CHROMA_PATH, "shared": config.SHARED_INDEX_PATH}.get(config.RETRIEVER_BACKEND, config.NUMPY_INDEX_PATH)
+        self.backend: RetrieverBackend = create_backend(
+            config.RETRIEVER_BACKEND, backend_path, self.embedding_function,
+            precision=config.VECTOR_PRECISION, rescore_factor=config.RESCORE_FACTOR, partitioned=config.CATEGORY_PARTITIONS
+        )
+        # Direct access to the Chroma collection (None for other backends)
+        self.collection = getattr(self.backend, "collection", None)
     
-    def load_help_content(self):
-        """Load and process help content into vector store."""
-        # TODO: Load from app/seed_data/help_content.json
-
-        # Help content has a small amount of json data and the content isn't long enough for chunking to make sense. 
-        # So, 1 json entry = 1 chunk right now
-
-        # Modifying shape of data to fit chromadb's collection requirements
-        ids: list[str] = []
-        documents: list[str] = []
-        metadatas: list[dict[str, str]] = []
-
-        for entry in help_content:
-            source_id = str(entry["id"]).strip()
-            title = str(entry["title"]).strip()
-            category = str(entry["category"]).strip().lower() # Keeping all category values lowercase
-            self._categories.add(category)
-            content = str(entry["content"]).strip()
-
-            documents.append(f"{title}\n\n{content}") # Text/documents will be title + content
-            ids.append(source_id)
-
-            # ID is included in metadata as well in case chunking strategy changes later
-            metadatas.append(
-                {
-                    "source_id": source_id,
-                    "title": title,
-                    "category": category
-                }
-            )
-
-        if not ids:
-            return None
-        
-        # Upsert in chroma will add new entries if ID is new and update if ID already exists
-        self.collection.upsert(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
+    def load_help_content(self) -> dict[str, list[str]]:
+        """
+        Load and process help content (HELP_CONTENT_PATH) into vector store.
+        Returns the chunk ids that were added, updated, deleted and left unchanged, see ingest_records.
+        A read-only backend (the shared index) is only opened: nothing is embedded or written, see open_read_only.
+        """
+        if self.backend.read_only:
+            return self.open_read_only()
+        return self.ingest_records(iter_records(config.HELP_CONTENT_PATH))
+
+    def open_read_only(self) -> dict[str, list[str]]:
+        """Serve a prebuilt read-only index as is, only the in-memory BM25 index is built from its rows."""
+        manifest = getattr(self.backend, "manifest", {})
+        if manifest.get("embedding_model", config.EMBEDDING_MODEL) != config.EMBEDDING_MODEL:
+            raise RuntimeError(f"Index was built with {manifest['embedding_model']}, EMBEDDING_MODEL is {config.EMBEDDING_MODEL}: rebuild it")
+        ids, documents, metadatas, _ = self.backend.export() # the mapped vectors aren't copied
+        self.lexical_index.upsert(ids, documents, metadatas)
+        print(f"📚 Read-only index opened: {len(ids)} chunks, built {manifest.get('built_at', 'unknown')}")
+        return {"added": [], "updated": [], "unchanged": ids, "deleted": []}
+
+    def ingest_records(
+        self,
+        records: Iterable[dict],
+        delete_missing: bool = True,
+        index_lexical: bool = True,
+        batch_size: int | None = None,
+        concurrency: int | None = None,
+        show_progress: bool = False,
+    ) -> dict[str, list[str]]:
+        """
+        Chunk, embed and store a stream of help content records.
+        Ingestion is incremental: each chunk's content hash is kept in its metadata, unchanged chunks are skipped,
+        new/changed ones are (re-)embedded in batches of `batch_size` with up to `concurrency` embeddings calls in flight,
+        and with delete_missing, indexed chunks that aren't in `records` are deleted.
+        Returns the chunk ids that were added, updated, deleted and left unchanged, throughput is kept in self.ingest_stats.
+        """
+        batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        concurrency = concurrency or config.INGEST_CONCURRENCY
+        if self._ingest_client is None:
+            # Retries are done per batch by embed_with_retries (with backoff shared by the whole batch)
+            from app.llm import create_client
+            self._ingest_client = create_client(max_retries=0)
+
+        # Compare against what is already persisted, only metadata is fetched (no documents or embeddings)
+        existing: dict[str, dict[str, str]] = self.backend.get_metadatas()
+
+        report: dict[str, list[str]] = {"added": [], "updated": [], "unchanged": [], "deleted": []}
+        stale_sources: set[str] = set() # parent source ids whose cached answers may now be out of date
+        seen_ids: set[str] = set()
+        to_embed: list[Chunk] = []
+        to_index_lexically: list[Chunk] = []
+        in_flight: dict[concurrent.futures.Future, list[Chunk]] = {}
+        progress = IngestProgress(enabled=show_progress)
+
+        def store(limit: int) -> None:
+            """Wait until at most `limit` batches are in flight, storing each finished batch."""
+            while len(in_flight) > limit:
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    embeddings, tokens = future.result()
+                    self.backend.upsert(
+                        ids=[chunk_id for chunk_id, _, _ in batch],
+                        documents=[document for _, document, _ in batch],
+                        metadatas=[metadata for _, _, metadata in batch],
+                        embeddings=embeddings
+                    )
+                    progress.embedded += len(batch)
+                    progress.tokens += tokens
+
+        def index_lexically() -> None:
+            if to_index_lexically:
+                self.lexical_index.upsert(*map(list, zip(*to_index_lexically)))
+                to_index_lexically.clear()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest") as executor:
+            for chunk in iter_chunks(records, progress, config.CHUNK_SIZE, config.CHUNK_OVERLAP):
+                chunk_id, _, metadata = chunk
+                seen_ids.add(chunk_id)
+                previous = existing.get(chunk_id)
+                if previous is None:
+                    report["added"].append(chunk_id)
+                elif previous.get("content_hash") != metadata["content_hash"]:
+                    report["updated"].append(chunk_id)
+                    stale_sources.add(str(metadata["source_id"]))
+                else:
+                    report["unchanged"].append(chunk_id)
+
+                changed = previous is None or previous.get("content_hash") != metadata["content_hash"]
+                if changed:
+                    to_embed.append(chunk)
+                # Lexical index lives in memory, so on startup every chunk is new to it, after that only changed ones
+                if index_lexical and (changed or chunk_id not in self.lexical_index):
+                    to_index_lexically.append(chunk)
+
+                if len(to_embed) >= batch_size:
+                    store(concurrency - 1) # bounded, so only `concurrency` batches are ever held in memory
+                    in_flight[executor.submit(
+                        embed_with_retries, self._ingest_client, [document for _, document, _ in to_embed],
+                        config.INGEST_MAX_RETRIES, config.INGEST_BACKOFF_SECONDS
+                    )] = to_embed
+                    to_embed = []
+                if len(to_index_lexically) >= batch_size:
+                    index_lexically()
+
+            if to_embed:
+                in_flight[executor.submit(
+                    embed_with_retries, self._ingest_client, [document for _, document, _ in to_embed],
+                    config.INGEST_MAX_RETRIES, config.INGEST_BACKOFF_SECONDS
+                )] = to_embed
+            store(0)
+        index_lexically()
+
+        if delete_missing:
+            report["deleted"] = [existing_id for existing_id in existing if existing_id not in seen_ids]
+        if report["deleted"]:
+            self.backend.delete(report["deleted"])
+            self.lexical_index.delete(report["deleted"])
+            stale_sources.update(str(existing[chunk_id].get("source_id", chunk_id)) for chunk_id in report["deleted"])
+        self.backend.flush() # once per ingest, not per batch
+
+        # Cached answers that used changed or removed sources may now be out of date
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate_sources(sorted(stale_sources))
+
+        self.ingest_stats = progress.stats()
+        if show_progress:
+            print(progress.summary())
+        print(
+            f"📚 Help content ingested: {len(report['added'])} added, {len(report['updated'])} updated, "
+            f"{len(report['deleted'])} deleted, {len(report['unchanged'])} unchanged"
         )
-        # TODO: Implement chunking with overlap; embed and persist with source IDs
-        # Not required with such small chunks, will only add complications without add any benefits
-        # If chunking is necessary or if the documents get long, we could use the RecursiveCharacterTextSplitter function from langchain.
-        return None
+        return report
 
+    def count(self) -> int:
+        """Number of indexed chunks."""
+        return self.backend.count()
 
-    # Reranker is switched off currently due to having very little improvement for the RAGAS metrics. Could be tested later with larger dataset
-    def rerank_results(self, query: str, results: list[dict[str, object]]) -> list[dict[str, object]]:
-        """Rerank retrieved results using a cross-encoder model."""
-        from sentence_transformers import CrossEncoder
 
-        if not results:
-            return results
-        
+    # Reranker is switched off by default due to having very little improvement for the RAGAS metrics. Could be tested later with larger dataset
+    def _get_reranker(self):
+        """Load the cross-encoder on first use (sentence_transformers is only imported when the reranker is used)."""
         if self._reranker is None:
-            self._reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-        
-        pairs = [(query, entry["text"]) for entry in results]
-        scores = self._reranker.predict(pairs)
+            from sentence_transformers import CrossEncoder
+            self._reranker = CrossEncoder(config.RERANKER_MODEL)
+        return self._reranker
+
+    def warm_reranker(self) -> None:
+        """Load the reranker and run one prediction so the first request doesn't pay model load/first-call cost."""
+        self._get_reranker().predict([("warm up query", "warm up document")])
+        print("🔥 Reranker loaded and warmed")
 
+    def _rerank_cache_key(self, query_hash: str, text: str) -> str:
+        # The chunk text identifies a chunk (source_id alone isn't unique once documents are chunked), and edited content gets a new key
+        return f"{query_hash}:{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+
+    def _cached_rerank_scores(self, query: str, results: list[dict[str, object]]) -> tuple[list[str], list[float | None]]:
+        query_hash = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+        keys = [self._rerank_cache_key(query_hash, str(entry["text"])) for entry in results]
+        return keys, [self.rerank_cache.get(key) for key in keys]
+
+    def _score_pairs(self, query: str, results: list[dict[str, object]], keys: list[str], scores: list[float | None]) -> list[float]:
+        """Score the (query, chunk) pairs missing from the cache with the cross-encoder and cache them."""
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            predicted = self._get_reranker().predict([(query, results[i]["text"]) for i in missing])
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+                self.rerank_cache.put(keys[i], float(score))
+        return scores
+
+    @staticmethod
+    def _order_by_scores(results: list[dict[str, object]], scores: list[float]) -> list[dict[str, object]]:
         scored_results: list[tuple[dict[str, object], float]] = []
         for result, score in zip(results, scores):
             scored_results.append((result, float(score)))
@@ -153,43 +314,249 @@ class VectorStoreService:
         reranked_results: list[dict[str, object]] = []
         for result, _ in scored_results:
             reranked_results.append(dict(result))
-            
+
         return reranked_results
-    
+
+    def rerank_results(self, query: str, results: list[dict[str, object]]) -> list[dict[str, object]]:
+        """
+        Rerank retrieved results using a cross-encoder model.
+        Pair scores come from the rerank cache when possible. If scoring the rest takes longer than RERANK_BUDGET_MS,
+        the vector order is returned instead (the scoring still finishes in the background and fills the cache).
+        """
+        if not results:
+            return results
+
+        keys, scores = self._cached_rerank_scores(query, results)
+        if all(score is not None for score in scores):
+            return self._order_by_scores(results, scores)
+
+        future = self._rerank_executor.submit(self._score_pairs, query, results, keys, scores)
+        try:
+            return self._order_by_scores(results, future.result(timeout=config.RERANK_BUDGET_MS / 1000))
+        except concurrent.futures.TimeoutError:
+            self.rerank_fallbacks += 1
+            FALLBACKS.inc(reason="rerank_budget")
+            return results
+
+    async def arerank_results(self, query: str, results: list[dict[str, object]]) -> list[dict[str, object]]:
+        """Async variant of rerank_results, waits for the cross-encoder without holding the event loop."""
+        if not results:
+            return results
+
+        keys, scores = self._cached_rerank_scores(query, results)
+        if all(score is not None for score in scores):
+            return self._order_by_scores(results, scores)
+
+        try:
+            scores = await asyncio.wait_for(self._ascore_pairs(query, results, keys, scores), config.RERANK_BUDGET_MS / 1000)
+            return self._order_by_scores(results, scores)
+        except asyncio.TimeoutError:
+            self.rerank_fallbacks += 1
+            FALLBACKS.inc(reason="rerank_budget")
+            return results
+
+    async def _ascore_pairs(self, query: str, results: list[dict[str, object]], keys: list[str], scores: list[float | None]) -> list[float]:
+        """Score uncached pairs, through the micro-batcher so concurrent requests share one CrossEncoder.predict call."""
+        if self.rerank_batcher is None:
+            return await asyncio.wrap_future(self._rerank_executor.submit(self._score_pairs, query, results, keys, scores))
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        predicted = await asyncio.gather(*(
+            self.rerank_batcher.submit((query, str(results[i]["text"]), keys[i])) for i in missing
+        ))
+        for i, score in zip(missing, predicted):
+            scores[i] = score
+        return scores
+
+    async def _score_pair_batch(self, items: list[tuple[str, str, str]]) -> list[float]:
+        """Micro-batch handler: one CrossEncoder.predict for (query, text, cache key) items from many requests."""
+        loop = asyncio.get_running_loop()
+        pairs = [(query, text) for query, text, _ in items]
+        predicted = await loop.run_in_executor(self._rerank_executor, self._get_reranker().predict, pairs)
+        scores = [float(score) for score in predicted]
+        # Cached here, so scores still land in the cache if the request that asked for them gave up
+        for (_, _, key), score in zip(items, scores):
+            self.rerank_cache.put(key, score)
+        return scores
+
     def search(self, query: str, top_k: int = 3, category: str | None = None) -> list[dict[str, object]]:
         """Search for relevant context based on user query."""
         # TODO: Convert query to embedding and perform similarity search
 
-        result = self.collection.query(
-            query_texts=[query],
-            n_results=min(max(1, top_k), 50), # Setting the range of top_k between 1 and 50
-            include=["documents", "distances","metadatas"],
-            where={"category": {"$eq": category.strip().lower()}} if category is not None else None # If category is passed, filter based on category
-        )
+        top_k = self._clamp_top_k(top_k)
+        category = self._normalise_category(category)
+        with stage("embed"):
+            query_embedding = self.embed_query(query)
+        with stage("vector_search"):
+            formatted_result = self.backend.query(
+                [query_embedding],
+                top_k=self._candidate_k(top_k),
+                category=category
+            )[0]
+        with stage("fusion"):
+            formatted_result = self._fuse_lexical(query, formatted_result, top_k, category)
+
+        if self.use_reranker and formatted_result:
+            with stage("rerank"):
+                formatted_result = self.rerank_results(query, formatted_result)
+
+        return formatted_result[:top_k]
+
+    def _embedding_cache_key(self, query: str) -> str:
+        # Model name is part of the key so a model change can't return stale vectors from a persisted cache
+        return f"{config.EMBEDDING_MODEL}:{normalize_query(query)}"
+
+    def embed_query(self, query: str) -> list[float]:
+        """Embed a single query, using the embedding cache when possible."""
+        key = self._embedding_cache_key(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = [float(value) for value in self.embedding_function([query])[0]]
+            self.embedding_cache.put(key, embedding)
+        return embedding
+
+    async def aembed_query(self, query: str) -> list[float]:
+        """Embed a single query with the shared async OpenAI client, using the embedding cache when possible."""
+        return (await self.aembed_queries([query]))[0]
+
+    async def aembed_queries(self, queries: list[str]) -> list[list[float]]:
+        """Embed several queries, cache misses are sent together in one embeddings API call."""
+        keys = [self._embedding_cache_key(query) for query in queries]
+        embeddings: list[list[float] | None] = [self.embedding_cache.get(key) for key in keys]
+
+        # Unique uncached keys in first-seen order, duplicates in the same batch are only embedded once
+        missing: dict[str, str] = {}
+        for key, query, embedding in zip(keys, queries, embeddings):
+            if embedding is None and key not in missing:
+                missing[key] = query
+
+        if missing:
+            texts = list(missing.values())
+            if self.embedding_batcher is not None and len(texts) < self.embedding_batcher.max_batch_size:
+                # Small requests share an embeddings call with other concurrent requests
+                new_list = await asyncio.gather(*(self.embedding_batcher.submit(text) for text in texts))
+            else:
+                # Already a full batch (e.g. /help-assistant/batch), send it as is
+                new_list = await self._embed_batch(texts)
+
+            new_embeddings = dict(zip(missing, new_list))
+            for key, embedding in new_embeddings.items():
+                self.embedding_cache.put(key, embedding)
+            embeddings = [embedding if embedding is not None else new_embeddings[key] for key, embedding in zip(keys, embeddings)]
+
+        return embeddings
+
+    async def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """One embeddings API call for a list of texts, results in input order."""
+        if self.async_client is None:
+            from app.llm import create_async_client
+            self.async_client = create_async_client()
+
+        if self.upstream is None:
+            self.upstream = create_upstream()
+
+        client = self.async_client
+        response = await self.upstream.call("embeddings", lambda: client.embeddings.create(model=config.EMBEDDING_MODEL, input=texts))
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def save_embedding_cache(self) -> None:
+        """Persist the query embedding cache if a cache path is configured."""
+        if config.EMBEDDING_CACHE_PATH:
+            self.embedding_cache.save(config.EMBEDDING_CACHE_PATH)
+
+    async def asearch(self, query: str, top_k: int = 3, category: str | None = None) -> list[dict[str, object]]:
+        """Async variant of search, the embedding call is awaited and the local HNSW lookup runs in a worker thread."""
+        return (await self.asearch_batch([query], top_k=top_k, categories=[category]))[0]
+
+    async def asearch_batch(self, queries: list[str], top_k: int = 3, categories: list[str | None] | None = None) -> list[list[dict[str, object]]]:
+        """
+        Search for several queries at once, results are returned in the same order as queries.
+        All queries are embedded in one API call, and each distinct category filter is one multi-query backend query.
+        """
+        top_k = self._clamp_top_k(top_k)
+        categories = [self._normalise_category(category) for category in categories] if categories is not None else [None] * len(queries)
+        with stage("embed"):
+            query_embeddings = await self.aembed_queries(queries)
+
+        # Category filters apply to the whole query call, so group queries by category
+        groups: dict[str | None, list[int]] = {}
+        for i, category in enumerate(categories):
+            groups.setdefault(category, []).append(i)
+
+        results: list[list[dict[str, object]]] = [[] for _ in queries]
+        for category, indexes in groups.items():
+            # Backends are sync but the lookup is local and short, so it doesn't hold a thread for long
+            with stage("vector_search"):
+                group_results = await asyncio.to_thread(
+                    self.backend.query,
+                    [query_embeddings[i] for i in indexes],
+                    top_k=self._candidate_k(top_k),
+                    category=category
+                )
+            with stage("fusion"):
+                for i, formatted_result in zip(indexes, group_results):
+                    results[i] = self._fuse_lexical(queries[i], formatted_result, top_k, category)
 
-        # Early check for empty result
-        if len(result["documents"][0])==0:
-            return []
-
-        # Convert Chroma query shape (Dict[str, List[List[str]]]) into requested output shape
-        formatted_result: list[dict[str, object]] = []
-
-        # Return list of {text: str, source_id: str, score: float}
-        for doc, meta, dist in zip(result["documents"][0], result["metadatas"][0], result["distances"][0]):
-            # Convert from cosine distance to cosine similarity (higher is more similar)
-            cosine_sim = 1-float(dist)
-            formatted_result.append(
-                {
-                    "text": doc,
-                    "source_id": meta["source_id"],
-                    "score": cosine_sim if cosine_sim>0 else 0 # Cosine has a range from -1 to 1, setting anything below 0 to 0.
-                }
-            )
         if self.use_reranker:
-            formatted_result = self.rerank_results(query, formatted_result)
+            with stage("rerank"):
+                results = list(await asyncio.gather(*(
+                    self.arerank_results(query, formatted_result) for query, formatted_result in zip(queries, results)
+                )))
+
+        return [formatted_result[:top_k] for formatted_result in results]
+
+    def _candidate_k(self, top_k: int) -> int:
+        """Results to fetch before trimming to top_k, hybrid search and the reranker over-fetch so they have better candidates to promote."""
+        candidate_k = top_k
+        if self.use_hybrid:
+            candidate_k = max(candidate_k, config.HYBRID_CANDIDATES)
+        if self.use_reranker:
+            candidate_k = max(candidate_k, config.RERANK_CANDIDATES)
+        return candidate_k
+
+    def _fuse_lexical(self, query: str, dense_results: list[dict[str, object]], top_k: int, category: str | None) -> list[dict[str, object]]:
+        """
+        Reciprocal rank fusion of dense and BM25 results (dense only when hybrid search is off).
+        Keeps every candidate when the reranker is on, since it picks the final top_k.
+        """
+        keep = self._candidate_k(top_k) if self.use_reranker else top_k
+        if not self.use_hybrid:
+            return dense_results[:keep]
+        lexical_results = self.lexical_index.search(query, top_k=self._candidate_k(top_k), category=category)
+        return reciprocal_rank_fusion([dense_results, lexical_results], top_k=keep, k=config.RRF_K)
+
+    def lexical_fast_path(self, query: str, top_k: int = 3, category: str | None = None) -> list[dict[str, object]] | None:
+        """
+        Answer high confidence exact-term matches from the BM25 index alone, without embedding the query.
+        Confident means the top document contains every query term and clearly outscores the runner up.
+        There is no cosine similarity, so the score is the BM25 score over its maximum for the query (0-1). Results are
+        marked "lexical", the cosine-tuned guardrail score gate skips them (coverage and margin already vouch for them).
+        Returns None when the fast path is off or the match isn't confident, the caller then runs the normal search.
+        """
+        if not self.use_lexical_fast_path:
+            return None
+
+        results = self.lexical_index.search(query, top_k=self._clamp_top_k(top_k), category=self._normalise_category(category))
+        if not results or results[0]["coverage"] < 1.0:
+            return None
+        if len(results) > 1 and results[0]["bm25"] < config.LEXICAL_FAST_PATH_MARGIN * results[1]["bm25"]:
+            return None
+
+        print("⚡ Lexical fast path")
+        max_score = self.lexical_index.max_score(query)
+        return [
+            {"text": entry["text"], "source_id": entry["source_id"], "score": float(entry["bm25"]) / max_score, "lexical": True}
+            for entry in results
+        ]
+
+    @staticmethod
+    def _clamp_top_k(top_k: int) -> int:
+        return min(max(1, top_k), 50) # Setting the range of top_k between 1 and 50
+
+    @staticmethod
+    def _normalise_category(category: str | None) -> str | None:
+        return category.strip().lower() if category is not None else None # If category is passed, filter based on category
 
-        return formatted_result
-    
     def get_category_list(self) -> list[str]:
-        """Return allowed categories for validation"""
-        return sorted(self._categories)
\ No newline at end of file
+        """Return allowed categories for validation (the partition registry when categories are partitioned)"""
+        return sorted(self.backend.categories())
\ No newline at end of file